@@ -1,65 +1,237 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+import os
+
+if __name__ == '__main__':
+    # Executado direto: o .env precisa valer antes de config.py ser lido
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from flask import Blueprint, Flask, Response, render_template, request, jsonify, redirect, url_for, session, g, has_app_context, current_app, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
-from flask_socketio import SocketIO, emit, join_room, leave_room
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
+from flask_migrate import Migrate
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from jinja2 import TemplateError
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime, timedelta
+import click
 import requests
-import json
-import os
+import logging
+import math
+import time
 from functools import wraps
-from dotenv import load_dotenv
+from config import config
+from fixtures import FixturePoller, FINISHED_STATUSES
+from live import LiveMatchTracker, match_room, team_room, parse_live_room
+from chat_queue import ChatWriteBehind
+from chat_history import RoomHistoryCache, decode_cursor
+from chat_archive import ChatArchive, ChatArchiver
+from fan_counts import FanCounts, fan_room, interest_deltas
+from fragments import init_template_caches
+from query_plans import hot_queries, check_query_plans
+from upserts import interest_rows, upsert_interests
+from geo import EstablishmentIndex, KM_PER_DEGREE
+from cache import TTLCache, make_backend, cache_response, invalidate, all_stats
+from upstream import UpstreamClient, set_client
+from socket_queue import make_client_manager
+from socket_context import ConnectionContexts, PROFILE_SYNC_ROOM
+from presence import RoomPresence
+from ratelimit import RateLimiter, QuickMessageMerger
+from metrics import registry, COUNT_BUCKETS
+from passwords import PasswordHasher
+from http_cache import StaticFingerprints, finalize_response
+from teams import DEFAULT_TEAM_COLORS, Teams
+
+# Extensões sem aplicação; create_app as liga à configuração escolhida
+db = SQLAlchemy()
+migrate = Migrate()
+socketio = SocketIO()
+
+# Rotas, hooks e comandos da aplicação (registrados por create_app)
+main = Blueprint('main', __name__, cli_group=None)
 
-# Carregar variáveis de ambiente
-load_dotenv()
+# Mesmo logger de app.logger (a aplicação leva o nome do módulo)
+logger = logging.getLogger(__name__)
+
+# Gerenciador da fila do Socket.IO quando SOCKETIO_MESSAGE_QUEUE está definida
+socketio_queue = None
+
+# Métricas (formato Prometheus em /metrics)
+http_latency = registry.histogram(
+    'http_request_duration_seconds', 'Latência das rotas HTTP', ('method', 'route', 'status'))
+socketio_latency = registry.histogram(
+    'socketio_event_duration_seconds', 'Latência dos handlers Socket.IO', ('event',))
+db_query_latency = registry.histogram('db_query_duration_seconds', 'Duração das consultas ao banco')
+db_queries_per_handler = registry.histogram(
+    'db_queries_per_request', 'Consultas ao banco por requisição ou evento', ('handler',), buckets=COUNT_BUCKETS)
+db_time_per_handler = registry.histogram(
+    'db_time_per_request_seconds', 'Tempo no banco por requisição ou evento', ('handler',))
+db_slow_queries = registry.counter('db_slow_queries_total', 'Consultas acima de SLOW_QUERY_MS', ('handler',))
+upstream_latency = registry.histogram(
+    'upstream_request_duration_seconds', 'Latência das chamadas às APIs externas', ('endpoint', 'outcome'))
+emit_recipients = registry.histogram(
+    'socketio_emit_recipients', 'Clientes locais que recebem cada emit', buckets=COUNT_BUCKETS)
+
+# Consultas executadas pelo processo (benchmark e /db/stats)
+db_stats = {'queries': 0}
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_query(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    db_stats['queries'] += 1
+    db_query_latency.observe(elapsed)
+    
+    handler = None
+    if has_app_context() and 'metrics_handler' in g:
+        handler = g.metrics_handler
+        g.db_queries += 1
+        g.db_time += elapsed
+    
+    # Fora do app context (raro) vale o padrão de config.py
+    slow_query_ms = current_app.config['SLOW_QUERY_MS'] if has_app_context() else config['default'].SLOW_QUERY_MS
+    if elapsed * 1000 >= slow_query_ms:
+        db_slow_queries.inc(handler=handler or 'background')
+        logger.warning('Consulta lenta (%.0f ms) em %s: %s',
+                       elapsed * 1000, handler or 'segundo plano', statement)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def start_metrics(handler):
+    """Começa a medir uma requisição ou evento (latência e consultas)"""
+    g.metrics_handler = handler
+    g.metrics_started = time.perf_counter()
+    g.db_queries = 0
+    g.db_time = 0.0
 
-db = SQLAlchemy(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+def finish_metrics():
+    """Registra as consultas do handler e retorna a duração em segundos"""
+    db_queries_per_handler.observe(g.db_queries, handler=g.metrics_handler)
+    db_time_per_handler.observe(g.db_time, handler=g.metrics_handler)
+    return time.perf_counter() - g.metrics_started
 
-# APIs Configuration - Usando variáveis de ambiente
-GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
-API_FUTEBOL_KEY = os.environ.get('API_FUTEBOL_KEY')
+@main.before_app_request
+def before_request_metrics():
+    start_metrics(request.endpoint or 'unmatched')
+
+@main.after_app_request
+def after_request_metrics(response):
+    if 'metrics_started' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_latency.observe(finish_metrics(), method=request.method, route=route,
+                             status=response.status_code)
+    return response
+
+def instrumented(event_name):
+    """Mede latência e consultas de um handler Socket.IO"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            start_metrics(f'socket:{event_name}')
+            try:
+                return f(*args, **kwargs)
+            finally:
+                socketio_latency.observe(finish_metrics(), event=event_name)
+        return decorated_function
+    return decorator
 
 # Brazilian Serie A Championship ID
 BRASILEIRAO_ID = 10  # ID do Campeonato Brasileiro na API-Futebol.com.br
 
+# Máximo de jogos em um envio de interesses (uma rodada tem 10)
+MAX_INTEREST_BATCH = 50
+
+# Raio da busca de estabelecimentos próximos
+NEARBY_RADIUS_KM = 2
+
+# Regras de rate limit e a chave da config com o limite "usuário,ip" de cada uma
+RATE_LIMIT_SETTINGS = {
+    'socket:message': 'RATELIMIT_CHAT_MESSAGE',
+    'socket:join': 'RATELIMIT_CHAT_JOIN',
+    'http:matches': 'RATELIMIT_MATCHES',
+    'http:nearby': 'RATELIMIT_NEARBY',
+    'http:location': 'RATELIMIT_LOCATION',
+    'http:interest': 'RATELIMIT_INTEREST'
+}
+
 # Models
+class Team(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    api_team_id = db.Column(db.Integer, unique=True)
+    primary_color = db.Column(db.String(7), nullable=False, default=DEFAULT_TEAM_COLORS['primary'])
+    secondary_color = db.Column(db.String(7), nullable=False, default=DEFAULT_TEAM_COLORS['secondary'])
+    # Outras grafias do nome (API, sem acento...), separadas por vírgula
+    aliases = db.Column(db.String(255))
+
+# Os nomes dos times vêm do registro em memória (teams), sem consulta
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     user_type = db.Column(db.String(20), nullable=False)
-    favorite_team = db.Column(db.String(50))
+    favorite_team_id = db.Column(db.Integer, db.ForeignKey('team.id'))
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
     establishment_name = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def favorite_team(self):
+        return teams.name(self.favorite_team_id)
 
 class Match(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     api_match_id = db.Column(db.Integer, unique=True)
-    home_team = db.Column(db.String(50), nullable=False)
-    away_team = db.Column(db.String(50), nullable=False)
-    match_date = db.Column(db.DateTime, nullable=False)
+    home_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    away_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    match_date = db.Column(db.DateTime, nullable=False, index=True)
     status = db.Column(db.String(20), default='scheduled')
     home_score = db.Column(db.Integer, default=0)
     away_score = db.Column(db.Integer, default=0)
     round_number = db.Column(db.Integer)
+    
+    @property
+    def home_team(self):
+        return teams.name(self.home_team_id)
+    
+    @property
+    def away_team(self):
+        return teams.name(self.away_team_id)
 
 class UserMatchInterest(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'match_id', name='uq_user_match_interest_user_match'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     match_id = db.Column(db.Integer, db.ForeignKey('match.id'), nullable=False)
-    supporting_team = db.Column(db.String(50), nullable=False)
+    supporting_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
     ranking = db.Column(db.Integer, default=1)
     establishment_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    
+    @property
+    def supporting_team(self):
+        return teams.name(self.supporting_team_id)
+
+# Torcedores por jogo, estabelecimento (0 = em casa) e time, mantido pela
+# gravação dos interesses; "flask rebuild-fan-counts" recalcula
+class MatchFanCount(db.Model):
+    match_id = db.Column(db.Integer, db.ForeignKey('match.id'), primary_key=True)
+    establishment_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    supporting_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), primary_key=True)
+    fans = db.Column(db.Integer, nullable=False, default=0)
 
 class ChatMessage(db.Model):
+    __table_args__ = (
+        db.Index('ix_chat_message_room_timestamp_id', 'room_id', 'timestamp', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     room_id = db.Column(db.String(100), nullable=False)
@@ -68,39 +240,161 @@ class ChatMessage(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref='messages')
 
-# Brazilian teams colors
-TEAM_COLORS = {
-    'Flamengo': {'primary': '#E60026', 'secondary': '#000000'},
-    'Corinthians': {'primary': '#000000', 'secondary': '#FFFFFF'},
-    'Palmeiras': {'primary': '#006B3F', 'secondary': '#FFFFFF'},
-    'São Paulo': {'primary': '#FF0000', 'secondary': '#000000'},
-    'Santos': {'primary': '#000000', 'secondary': '#FFFFFF'},
-    'Vasco': {'primary': '#000000', 'secondary': '#FFFFFF'},
-    'Botafogo': {'primary': '#000000', 'secondary': '#FFFFFF'},
-    'Fluminense': {'primary': '#7F0000', 'secondary': '#FFFFFF'},
-    'Grêmio': {'primary': '#0080FF', 'secondary': '#000000'},
-    'Internacional': {'primary': '#FF0000', 'secondary': '#FFFFFF'},
-    'Atlético-MG': {'primary': '#000000', 'secondary': '#FFFFFF'},
-    'Cruzeiro': {'primary': '#0080FF', 'secondary': '#FFFFFF'},
-    'Bahia': {'primary': '#0080FF', 'secondary': '#FF0000'},
-    'Sport': {'primary': '#FF0000', 'secondary': '#000000'},
-    'Ceará': {'primary': '#000000', 'secondary': '#FFFFFF'},
-    'Fortaleza': {'primary': '#FF0000', 'secondary': '#0080FF'},
-    'Athletico-PR': {'primary': '#FF0000', 'secondary': '#000000'},
-    'Coritiba': {'primary': '#00FF00', 'secondary': '#FFFFFF'},
-    'Bragantino': {'primary': '#FF0000', 'secondary': '#FFFFFF'},
-    'Cuiabá': {'primary': '#FFD700', 'secondary': '#00FF00'},
-    'Atlético-GO': {'primary': '#FF0000', 'secondary': '#000000'},
-    'Vitória': {'primary': '#FF0000', 'secondary': '#000000'},
-    'Criciúma': {'primary': '#FFD700', 'secondary': '#000000'},
-    'Juventude': {'primary': '#00FF00', 'secondary': '#FFFFFF'}
-}
+# Times, apelidos e cores: tabela Team, lida uma vez por processo
+teams = Teams(db, Team)
+
+# Contagem de torcedores por jogo, enviada à sala do jogo (FAN_COUNTS_*)
+fan_counts = FanCounts(db, MatchFanCount, UserMatchInterest, team_name=teams.name, room_for=fan_room)
+
+# As configurações de cada objeto abaixo vêm de app.config, no create_app
+upstream = UpstreamClient(
+    sleep=lambda seconds: socketio.sleep(seconds),
+    observer=lambda endpoint, seconds, outcome: upstream_latency.observe(
+        seconds, endpoint=endpoint, outcome=outcome)
+)
+set_client(upstream)
+
+fixture_poller = FixturePoller(
+    db, Match, teams,
+    api_key=None,
+    championship_id=BRASILEIRAO_ID,
+    http=upstream
+)
+
+live_tracker = LiveMatchTracker(socketio)
+fixture_poller.add_listener(live_tracker.publish)
+fixture_poller.add_listener(lambda matches: invalidate('matches'))
+
+chat_writer = ChatWriteBehind(db, ChatMessage)
+
+# Histórico antigo fora do banco (diretório e ritmo vêm de CHAT_ARCHIVE_*)
+chat_archive = ChatArchive()
+
+chat_history = RoomHistoryCache(
+    db, ChatMessage,
+    colors_for=teams.colors,
+    archive=chat_archive
+)
+
+def chat_rooms_to_archive():
+    """Salas com mensagens a arquivar, como pares (sala, arquivar antes de):
+    salas de jogos encerrados há CHAT_ARCHIVE_MATCH_GRACE_HOURS inteiras e,
+    com CHAT_ARCHIVE_MAX_AGE_DAYS, as mensagens antigas de qualquer sala"""
+    now = datetime.utcnow()
+    # Salas distintas saem do índice (room_id, timestamp, id), sem ler a tabela
+    rooms = [room_id for (room_id,) in db.session.query(ChatMessage.room_id).distinct()]
+    due = {}
+    
+    match_rooms = {int(room_id[6:]): room_id for room_id in rooms
+                   if room_id.startswith('match-') and room_id[6:].isdigit()}
+    if match_rooms:
+        grace = timedelta(hours=current_app.config['CHAT_ARCHIVE_MATCH_GRACE_HOURS'])
+        finished = db.session.query(Match.api_match_id).filter(
+            Match.api_match_id.in_(list(match_rooms)),
+            Match.status.in_(FINISHED_STATUSES),
+            Match.match_date < now - grace
+        )
+        for (api_match_id,) in finished:
+            due[match_rooms[api_match_id]] = now
+    
+    max_age_days = current_app.config['CHAT_ARCHIVE_MAX_AGE_DAYS']
+    if max_age_days:
+        for room_id in rooms:
+            due.setdefault(room_id, now - timedelta(days=max_age_days))
+    
+    return list(due.items())
+
+chat_archiver = ChatArchiver(db, ChatMessage, chat_archive, due_rooms=chat_rooms_to_archive)
+
+connection_contexts = ConnectionContexts(
+    loader=lambda user_id: User.query.get(user_id),
+    colors_for=teams.colors
+)
+
+@event.listens_for(User, 'after_update')
+def on_user_updated(mapper, connection, user):
+    """Nome ou time alterados: os contextos das conexões ficam inválidos após o commit"""
+    state = inspect(user)
+    if any(state.attrs[name].history.has_changes() for name in ('username', 'favorite_team_id')):
+        state.session.info.setdefault('profiles_changed', set()).add(user.id)
+
+@event.listens_for(db.session, 'after_commit')
+def on_profiles_committed(db_session):
+    for user_id in db_session.info.pop('profiles_changed', ()):
+        connection_contexts.invalidate_user(user_id)
+        # Conexões do usuário em outros workers
+        if socketio_queue:
+            socketio.emit('profile_updated', {'user_id': user_id}, to=PROFILE_SYNC_ROOM)
+
+presence = RoomPresence()
+
+rate_limiter = RateLimiter()
+# Mensagens rápidas iguais na mesma sala dentro da janela viram uma só (0 desliga)
+quick_merger = QuickMessageMerger()
+
+# Hash de senha fora do hub do eventlet (método, salt e pool vêm da config)
+password_hasher = PasswordHasher()
+
+static_fingerprints = StaticFingerprints()
+
+establishment_index = EstablishmentIndex(cell_km=NEARBY_RADIUS_KM / 2)
+
+# Trechos de HTML iguais para todos os torcedores de um time (TTL e
+# liga/desliga vêm de FRAGMENT_CACHE_*)
+fragment_cache = TTLCache(make_backend('memory://', max_entries=512), name='fragments')
+
+# Backend (memory:// ou redis://) e TTL vêm de PLACES_CACHE_*
+places_cache = TTLCache(make_backend('memory://'), name='places')
+
+def ensure_establishment_index():
+    """Carrega (ou recarrega, após o TTL) o índice de estabelecimentos"""
+    if establishment_index.is_stale(current_app.config['ESTABLISHMENT_INDEX_TTL']):
+        establishment_index.load(
+            db.session.query(User.id, User.establishment_name, User.latitude, User.longitude)
+            .filter(User.user_type == 'estabelecimento',
+                    User.latitude.isnot(None), User.longitude.isnot(None))
+        )
+
+def on_queue_emit(message):
+    """Emits vindos da fila (de qualquer worker): placares invalidam o cache
+    de jogos, perfis alterados invalidam os contextos das conexões, a
+    presença dos outros workers é somada e mensagens de chat entram no
+    histórico"""
+    event_name = message.get('event')
+    data = message['data'][0] if isinstance(message.get('data'), (list, tuple)) else message.get('data')
+    
+    if event_name == 'match_update':
+        invalidate('matches')
+        return
+    
+    if event_name == 'profile_updated':
+        connection_contexts.invalidate_user(data['user_id'])
+        return
+    
+    if event_name == 'presence_sync':
+        presence.merge(data['worker'], data['room'], data['teams'])
+        return
+    
+    if event_name != 'message' or not isinstance(message.get('room'), str):
+        return
+    
+    if not isinstance(data, dict) or 'sent_at' not in data:
+        return
+    
+    chat_history.append_if_cached(message['room'], {
+        'user_id': data['user_id'],
+        'username': data['username'],
+        'message': data['message'],
+        'type': data['type'],
+        'timestamp': datetime.fromisoformat(data['sent_at']),
+        'team_colors': data['team_colors']
+    })
 
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -108,10 +402,10 @@ def validate_api_keys():
     """Valida se as chaves de API estão configuradas"""
     missing_keys = []
     
-    if not GOOGLE_MAPS_API_KEY:
+    if not current_app.config['GOOGLE_MAPS_API_KEY']:
         missing_keys.append('GOOGLE_MAPS_API_KEY')
     
-    if not API_FUTEBOL_KEY:
+    if not current_app.config['API_FUTEBOL_KEY']:
         missing_keys.append('API_FUTEBOL_KEY')
     
     if missing_keys:
@@ -121,14 +415,42 @@ def validate_api_keys():
     print("✅ Chaves de API configuradas")
     return True
 
+# Cache HTTP: estáticos com hash na URL, 304 condicional e compressão
+@main.app_url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """url_for('static', ...) ganha ?v=<hash do arquivo>"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        digest = static_fingerprints.get(current_app.static_folder, values['filename'])
+        if digest:
+            values['v'] = digest
+
+@main.after_app_request
+def http_caching(response):
+    if request.endpoint == 'static' and 'v' in request.args:
+        # A URL muda junto com o conteúdo: o navegador pode guardar para sempre
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['STATIC_MAX_AGE']
+        response.cache_control.immutable = True
+    return finalize_response(response, request,
+                             min_size=current_app.config['COMPRESS_MIN_SIZE'],
+                             level=current_app.config['COMPRESS_LEVEL'])
+
 # Routes
-@app.route('/')
+@main.route('/sw.js')
+def service_worker():
+    """Service worker servido na raiz para controlar as páginas e a API"""
+    response = send_from_directory(os.path.join(current_app.static_folder, 'js'), 'sw.js', max_age=0)
+    response.cache_control.no_cache = True
+    return response
+
+@main.route('/')
 def index():
     if 'user_id' in session:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@main.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         data = request.get_json()
@@ -137,12 +459,19 @@ def register():
         if existing_user:
             return jsonify({'success': False, 'message': 'Email já cadastrado'})
         
+        favorite_team = teams.resolve(data['favorite_team']) if data.get('favorite_team') else None
+        if data.get('favorite_team') and favorite_team is None:
+            return jsonify({'success': False, 'message': 'Time não encontrado'})
+        
+        # A conexão volta ao pool antes do hash, que pode esperar vaga no pool de hash
+        db.session.rollback()
+        
         user = User(
             username=data['username'],
             email=data['email'],
-            password_hash=generate_password_hash(data['password']),
+            password_hash=password_hasher.hash(data['password']),
             user_type=data['user_type'],
-            favorite_team=data.get('favorite_team'),
+            favorite_team_id=favorite_team.id if favorite_team else None,
             establishment_name=data.get('establishment_name')
         )
         
@@ -152,15 +481,22 @@ def register():
         session['user_id'] = user.id
         return jsonify({'success': True})
     
-    return render_template('register.html', teams=list(TEAM_COLORS.keys()))
+    return render_template('register.html', teams=teams.names())
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         data = request.get_json()
-        user = User.query.filter_by(email=data['email']).first()
+        user = db.session.query(User.id, User.password_hash).filter_by(email=data['email']).first()
+        # A conexão volta ao pool antes do hash, que pode esperar vaga no pool de hash
+        db.session.rollback()
+        valid, new_hash = password_hasher.verify_and_update(user.password_hash, data['password']) if user else (False, None)
         
-        if user and check_password_hash(user.password_hash, data['password']):
+        if valid:
+            # Hash gravado com método ou custo antigos: troca pelo atual
+            if new_hash:
+                User.query.filter_by(id=user.id).update({'password_hash': new_hash})
+                db.session.commit()
             session['user_id'] = user.id
             return jsonify({'success': True})
         
@@ -168,54 +504,52 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/logout')
+@main.route('/logout')
 def logout():
     session.clear()
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/dashboard')
+@main.route('/dashboard')
 @login_required
 def dashboard():
     user = User.query.get(session['user_id'])
-    team_colors = TEAM_COLORS.get(user.favorite_team, {'primary': '#007BFF', 'secondary': '#FFFFFF'})
+    team_colors = teams.colors(user.favorite_team_id)
     return render_template('dashboard.html', user=user, team_colors=team_colors)
 
-@app.route('/location', methods=['POST'])
+@main.route('/location', methods=['POST'])
 @login_required
+@rate_limiter.limit('http:location')
 def update_location():
     data = request.get_json()
     user = User.query.get(session['user_id'])
     user.latitude = data['latitude']
     user.longitude = data['longitude']
     db.session.commit()
-    return jsonify({'success': True})
-
-@app.route('/nearby-establishments')
-@login_required
-def nearby_establishments():
-    user = User.query.get(session['user_id'])
-    if not user.latitude or not user.longitude:
-        return jsonify({'establishments': []})
     
-    # Verificar se Google Maps API está configurada
-    if not GOOGLE_MAPS_API_KEY:
-        return jsonify({'establishments': [], 'error': 'Google Maps API não configurada'})
+    if user.user_type == 'estabelecimento':
+        establishment_index.upsert(user.id, user.establishment_name, user.latitude, user.longitude)
     
-    # Google Places API call
-    places_url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    return jsonify({'success': True})
+
+def fetch_places(latitude, longitude, radius, place_type):
+    """Busca estabelecimentos no Google Places; retorna (estabelecimentos, erro)"""
+    places_url = f"{current_app.config['GOOGLE_PLACES_URL']}/nearbysearch/json"
     params = {
-        'location': f"{user.latitude},{user.longitude}",
-        'radius': 2000,
-        'type': 'bar',
-        'key': GOOGLE_MAPS_API_KEY
+        'location': f"{latitude},{longitude}",
+        'radius': radius,
+        'type': place_type,
+        'key': current_app.config['GOOGLE_MAPS_API_KEY']
     }
     
     try:
-        response = requests.get(places_url, params=params, timeout=10)
-        places_data = response.json()
+        places_data = upstream.get_json(places_url, params=params, timeout=10,
+                                        endpoint='google_places.nearbysearch')
+        
+        if places_data.get('status') == 'ZERO_RESULTS':
+            return [], None
         
         if places_data.get('status') != 'OK':
-            return jsonify({'establishments': [], 'error': f"Google API Error: {places_data.get('status')}"})
+            return [], f"Google API Error: {places_data.get('status')}"
         
         establishments = []
         for place in places_data.get('results', []):
@@ -226,215 +560,709 @@ def nearby_establishments():
                 'place_id': place['place_id']
             })
         
-        return jsonify({'establishments': establishments})
+        return establishments, None
     except requests.exceptions.RequestException as e:
-        return jsonify({'establishments': [], 'error': f'Erro de rede: {str(e)}'})
+        return [], f'Erro de rede: {str(e)}'
     except Exception as e:
-        return jsonify({'establishments': [], 'error': f'Erro: {str(e)}'})
+        return [], f'Erro: {str(e)}'
+
+def search_places(latitude, longitude, radius=NEARBY_RADIUS_KM * 1000, place_type='bar'):
+    """Busca no Google Places com cache compartilhado por célula geográfica.
+    
+    Quem está na mesma célula de PLACES_CELL_KM recebe o mesmo resultado,
+    buscado a partir do centro da célula.
+    """
+    cell_deg = current_app.config['PLACES_CELL_KM'] / KM_PER_DEGREE
+    cell_lat = math.floor(latitude / cell_deg)
+    cell_lon = math.floor(longitude / cell_deg)
+    key = f'{cell_lat}:{cell_lon}:{radius}:{place_type}'
+    
+    return places_cache.get_or_set(
+        key,
+        lambda: fetch_places((cell_lat + 0.5) * cell_deg, (cell_lon + 0.5) * cell_deg, radius, place_type),
+        cacheable=lambda result: result[1] is None
+    )
 
-@app.route('/matches/today')
+@main.route('/nearby-establishments')
 @login_required
-def matches_today():
-    today = datetime.now()
+@rate_limiter.limit('http:nearby')
+def nearby_establishments():
+    user = User.query.get(session['user_id'])
+    if not user.latitude or not user.longitude:
+        return jsonify({'establishments': []})
+    
+    # Estabelecimentos cadastrados, pelo índice em memória
+    ensure_establishment_index()
+    establishments = [{
+        'name': establishment['name'],
+        'address': '',
+        'rating': 0,
+        'place_id': f"local-{establishment['id']}",
+        'distance_km': establishment['distance_km']
+    } for establishment in establishment_index.nearby(user.latitude, user.longitude, NEARBY_RADIUS_KM)]
     
+    if len(establishments) >= current_app.config['NEARBY_MIN_LOCAL_RESULTS']:
+        return jsonify({'establishments': establishments})
+    
+    # Pouca cobertura local: completa com o Google Places
+    if not current_app.config['GOOGLE_MAPS_API_KEY']:
+        return jsonify({'establishments': establishments, 'error': 'Google Maps API não configurada'})
+    
+    places, error = search_places(user.latitude, user.longitude)
+    
+    known_names = {establishment['name'].lower() for establishment in establishments}
+    establishments += [place for place in places if place['name'].lower() not in known_names]
+    
+    response = {'establishments': establishments}
+    if error:
+        response['error'] = error
+    return jsonify(response)
+
+@main.route('/matches/today')
+@login_required
+@rate_limiter.limit('http:matches')
+@cache_response(tags=('matches',))
+def matches_today():
     # Verificar se API de futebol está configurada
-    if not API_FUTEBOL_KEY:
+    if not current_app.config['API_FUTEBOL_KEY']:
         return jsonify({'matches': [], 'error': 'API de futebol não configurada'})
     
-    # API-Futebol.com.br call
-    headers = {
-        'Authorization': f'Bearer {API_FUTEBOL_KEY}'
+    # Os jogos são atualizados pelo FixturePoller; aqui é só leitura
+    if fixture_poller.enabled:
+        fixture_poller.start(socketio)
+    matches, updated_at = fixture_poller.snapshot()
+    changed_at = fixture_poller.last_changed()
+    
+    if updated_at is None:
+        matches = fixture_poller.matches_from_db()
+    
+    data = {
+        'matches': matches,
+        'updated_at': changed_at.isoformat() if changed_at else None
     }
+    if fixture_poller.last_error:
+        data['error'] = f'Erro: {fixture_poller.last_error}'
+    
+    # ETag do próprio JSON (igual em todos os workers) e Last-Modified da
+    # última mudança nos jogos; o navegador sempre revalida e recebe 304
+    response = jsonify(data)
+    response.add_etag()
+    if changed_at:
+        response.last_modified = changed_at
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def supporting_team_id(interest):
+    """Id do time apoiado, de ``supporting_team_id`` ou do nome em
+    ``supporting_team``; KeyError se faltar, ValueError se não existir"""
+    if interest.get('supporting_team_id') is not None:
+        try:
+            team = teams.get(int(interest['supporting_team_id']))
+        except (TypeError, ValueError):
+            raise ValueError('Time inválido')
+    else:
+        team = teams.resolve(interest['supporting_team'])
+    if team is None:
+        raise ValueError('Time não encontrado')
+    return team.id
+
+def parse_interest(interest):
+    """Interesse do JSON com os ids como int (o dashboard manda strings);
+    KeyError se faltar campo, ValueError se algum valor for inválido"""
+    def optional_int(value):
+        return None if value in (None, '') else int(value)
     
     try:
-        # Get current championship edition
-        championship_url = f"https://api.api-futebol.com.br/v1/campeonatos/{BRASILEIRAO_ID}"
-        championship_response = requests.get(championship_url, headers=headers, timeout=10)
-        championship_data = championship_response.json()
-        
-        if 'edicao_atual' in championship_data:
-            edition_id = championship_data['edicao_atual']['edicao_id']
-            
-            # Get matches for today
-            matches_url = f"https://api.api-futebol.com.br/v1/campeonatos/{BRASILEIRAO_ID}/fases/{edition_id}/jogos"
-            params = {
-                'data': today.strftime('%Y-%m-%d')
-            }
-            
-            matches_response = requests.get(matches_url, headers=headers, params=params, timeout=10)
-            matches_data = matches_response.json()
-            
-            matches = []
-            for match in matches_data:
-                match_datetime = datetime.strptime(match['data_realizacao'], '%Y-%m-%d %H:%M:%S')
-                
-                match_data = {
-                    'id': match['jogo_id'],
-                    'home_team': match['time_mandante']['nome_popular'],
-                    'away_team': match['time_visitante']['nome_popular'],
-                    'date': match_datetime.isoformat(),
-                    'status': match['status'],
-                    'home_score': match.get('placar_mandante', 0),
-                    'away_score': match.get('placar_visitante', 0),
-                    'round': match.get('rodada', 1)
-                }
-                matches.append(match_data)
-                
-                # Save to database
-                existing_match = Match.query.filter_by(api_match_id=match['jogo_id']).first()
-                if not existing_match:
-                    new_match = Match(
-                        api_match_id=match['jogo_id'],
-                        home_team=match['time_mandante']['nome_popular'],
-                        away_team=match['time_visitante']['nome_popular'],
-                        match_date=match_datetime,
-                        status=match['status'],
-                        home_score=match.get('placar_mandante', 0),
-                        away_score=match.get('placar_visitante', 0),
-                        round_number=match.get('rodada', 1)
-                    )
-                    db.session.add(new_match)
-                else:
-                    # Update existing match
-                    existing_match.status = match['status']
-                    existing_match.home_score = match.get('placar_mandante', 0)
-                    existing_match.away_score = match.get('placar_visitante', 0)
-            
-            db.session.commit()
-            return jsonify({'matches': matches})
-        
-        return jsonify({'matches': [], 'error': 'Campeonato não encontrado'})
-        
-    except requests.exceptions.RequestException as e:
-        return jsonify({'matches': [], 'error': f'Erro de rede: {str(e)}'})
-    except Exception as e:
-        print(f"Error fetching matches: {e}")
-        return jsonify({'matches': [], 'error': f'Erro: {str(e)}'})
+        parsed = {
+            'match_id': int(interest['match_id']),
+            'ranking': int(interest.get('ranking', 1)),
+            'establishment_id': optional_int(interest.get('establishment_id'))
+        }
+    except (TypeError, ValueError):
+        raise ValueError('Jogo, estabelecimento ou nível de interesse inválido')
+    parsed['supporting_team_id'] = supporting_team_id(interest)
+    return parsed
+
+def known_matches(api_match_ids):
+    """{id da API: id local} dos jogos cadastrados; as salas ``live:match``
+    usam o id da API e as ``fans:match`` o id local"""
+    return dict(db.session.query(Match.api_match_id, Match.id).filter(
+        Match.api_match_id.in_(list(api_match_ids))))
 
-@app.route('/match/interest', methods=['POST'])
+def with_local_match_ids(interests):
+    """Troca o ``match_id`` dos interesses (o id da API, que o dashboard
+    mostra) pelo id local do jogo, numa só consulta; ValueError se algum
+    jogo não existir"""
+    match_ids = known_matches({interest['match_id'] for interest in interests}) if interests else {}
+    for interest in interests:
+        if interest['match_id'] not in match_ids:
+            raise ValueError('Jogo não encontrado')
+        interest['match_id'] = match_ids[interest['match_id']]
+    return interests
+
+def save_interests(user_id, interests):
+    """Grava os interesses (já passados por ``parse_interest``) e atualiza a
+    contagem de torcedores na mesma transação (sem commit); retorna os ids
+    dos jogos gravados"""
+    rows = interest_rows(user_id, interests)
+    fan_counts.start(socketio)
+    previous = fan_counts.claim_interests(rows)
+    upsert_interests(db, UserMatchInterest, user_id, interests)
+    current = {match_id: (row['establishment_id'], row['supporting_team_id']) for match_id, row in rows.items()}
+    fan_counts.apply(interest_deltas(previous, current))
+    return list(rows)
+
+@main.route('/match/interest', methods=['POST'])
 @login_required
+@rate_limiter.limit('http:interest')
 def add_match_interest():
     data = request.get_json()
     
-    # Remove existing interest for this match
-    existing = UserMatchInterest.query.filter_by(
-        user_id=session['user_id'],
-        match_id=data['match_id']
-    ).first()
-    
-    if existing:
-        db.session.delete(existing)
-    
-    # Add new interest
-    interest = UserMatchInterest(
-        user_id=session['user_id'],
-        match_id=data['match_id'],
-        supporting_team=data['supporting_team'],
-        ranking=data['ranking']
-    )
+    try:
+        interest, = with_local_match_ids([parse_interest(data)])
+    except KeyError as e:
+        return jsonify({'success': False, 'message': f'Campo obrigatório ausente: {e.args[0]}'}), 400
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
-    db.session.add(interest)
+    # Upsert atômico em (user_id, match_id)
+    match_ids = save_interests(session['user_id'], [interest])
     db.session.commit()
+    fan_counts.changed(match_ids)
     
     return jsonify({'success': True})
 
-@app.route('/chat/<room_id>')
+@main.route('/match/interest/batch', methods=['POST'])
+@login_required
+@rate_limiter.limit('http:interest')
+def add_match_interests():
+    data = request.get_json()
+    interests = data.get('interests') or []
+    
+    if len(interests) > MAX_INTEREST_BATCH:
+        return jsonify({'success': False, 'message': f'Máximo de {MAX_INTEREST_BATCH} jogos por envio'}), 400
+    
+    try:
+        interests = with_local_match_ids([parse_interest(interest) for interest in interests])
+    except KeyError as e:
+        return jsonify({'success': False, 'message': f'Campo obrigatório ausente: {e.args[0]}'}), 400
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    match_ids = save_interests(session['user_id'], interests)
+    db.session.commit()
+    fan_counts.changed(match_ids)
+    
+    return jsonify({'success': True, 'count': len(match_ids)})
+
+@main.route('/match/<int:match_id>/fans')
+@login_required
+def match_fans(match_id):
+    """Torcedores do jogo por time e por estabelecimento, dos contadores
+    (?establishment_id= para um só); as mudanças chegam por 'fan_counts'"""
+    establishment_id = request.args.get('establishment_id', type=int)
+    summary = fan_counts.summaries([match_id], establishment_id=establishment_id)[match_id]
+    
+    places = summary['establishments']
+    if places:
+        names = dict(db.session.query(User.id, User.establishment_name).filter(
+            User.id.in_([place['establishment_id'] for place in places])))
+        for place in places:
+            place['name'] = names.get(place['establishment_id'])
+    
+    return jsonify(summary)
+
+@main.route('/chat/<room_id>')
 @login_required
 def chat_room(room_id):
     user = User.query.get(session['user_id'])
-    team_colors = TEAM_COLORS.get(user.favorite_team, {'primary': '#007BFF', 'secondary': '#FFFFFF'})
+    team_colors = teams.colors(user.favorite_team_id)
     
-    # Get chat history
-    messages = ChatMessage.query.filter_by(room_id=room_id)\
-        .order_by(ChatMessage.timestamp.desc())\
-        .limit(50).all()
+    # Histórico recente vem do buffer em memória da sala
+    messages = chat_history.get(room_id)
     
     return render_template('chat.html', 
                          room_id=room_id, 
                          user=user, 
-                         messages=reversed(messages),
+                         messages=messages,
                          team_colors=team_colors)
 
+@main.route('/chat/<room_id>/messages')
+@login_required
+def chat_messages(room_id):
+    """Histórico paginado por cursor: ?before=<cursor> para rolar para trás,
+    ?after=<cursor> para buscar o que chegou depois (ex.: após reconectar)"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), current_app.config['CHAT_PAGE_MAX_SIZE'])
+        before = decode_cursor(request.args['before']) if request.args.get('before') else None
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError:
+        return jsonify({'error': 'Cursor ou limite inválido'}), 400
+    
+    messages, has_more = chat_history.page(room_id, limit=limit, before=before, after=after)
+    for message in messages:
+        timestamp = message['timestamp']
+        message['timestamp'] = timestamp.strftime('%H:%M')
+        message['sent_at'] = timestamp.isoformat()
+    
+    return jsonify({
+        'messages': messages,
+        'has_more': has_more,
+        'before': messages[0]['cursor'] if messages else None,
+        'after': messages[-1]['cursor'] if messages else request.args.get('after')
+    })
+
+@main.route('/ratelimit/stats')
+@login_required
+def ratelimit_stats():
+    return jsonify({
+        'rules': rate_limiter.stats(),
+        'quick_messages_merged': quick_merger.merged
+    })
+
+@main.route('/chat/presence')
+@login_required
+def chat_presence():
+    """Tamanho das salas em memória, sem banco (?rooms=a,b para filtrar)"""
+    rooms = request.args.get('rooms')
+    return jsonify(presence.sizes(rooms.split(',') if rooms else None))
+
+@main.route('/chat/stats')
+@login_required
+def chat_stats():
+    return jsonify(chat_writer.metrics())
+
+@main.route('/cache/stats')
+@login_required
+def cache_stats():
+    return jsonify(all_stats())
+
+@main.route('/upstream/stats')
+@login_required
+def upstream_stats():
+    return jsonify(upstream.stats())
+
+@registry.collector
+def collect_app_metrics():
+    """Estatísticas dos outros módulos, lidas na hora da coleta"""
+    upstream_stats = upstream.stats()
+    endpoints = upstream_stats['endpoints']
+    caches = all_stats()
+    chat = chat_writer.metrics()
+    limits = rate_limiter.stats()
+    passwords = password_hasher.stats()
+    archiver = chat_archiver.stats()
+    
+    return [
+        ('db_queries_total', 'counter', 'Consultas executadas pelo processo', [({}, db_stats['queries'])]),
+        ('upstream_calls_total', 'counter', 'Chamadas às APIs externas',
+         [({'endpoint': name}, stats['calls']) for name, stats in endpoints.items()]),
+        ('upstream_errors_total', 'counter', 'Chamadas às APIs externas que falharam',
+         [({'endpoint': name}, stats['errors']) for name, stats in endpoints.items()]),
+        ('upstream_retries_total', 'counter', 'Novas tentativas às APIs externas',
+         [({'endpoint': name}, stats['retries']) for name, stats in endpoints.items()]),
+        ('upstream_stale_served_total', 'counter', 'Respostas antigas servidas no lugar de erro',
+         [({'endpoint': name}, stats['stale_served']) for name, stats in endpoints.items()]),
+        ('upstream_error_ratio', 'gauge', 'Fração de chamadas com erro',
+         [({'endpoint': name}, stats['error_rate']) for name, stats in endpoints.items()]),
+        ('upstream_circuit_open', 'gauge', 'Circuito aberto (1) ou fechado/meio-aberto (0) por host',
+         [({'host': host}, int(state == 'open')) for host, state in upstream_stats['circuits'].items()]),
+        ('cache_hits_total', 'counter', 'Acertos de cache',
+         [({'cache': name}, stats['hits']) for name, stats in caches.items()]),
+        ('cache_misses_total', 'counter', 'Faltas de cache',
+         [({'cache': name}, stats['misses']) for name, stats in caches.items()]),
+        ('cache_hit_ratio', 'gauge', 'Fração de acertos do cache',
+         [({'cache': name}, stats['hit_ratio']) for name, stats in caches.items()]),
+        ('cache_entries', 'gauge', 'Entradas no cache',
+         [({'cache': name}, stats['size']) for name, stats in caches.items()]),
+        ('chat_write_queue_depth', 'gauge', 'Mensagens aguardando gravação', [({}, chat['queue_depth'])]),
+        ('chat_write_queue_capacity', 'gauge', 'Limite da fila de gravação (CHAT_MAX_PENDING)',
+         [({}, chat['queue_capacity'])]),
+        ('chat_messages_dropped_total', 'counter', 'Mensagens descartadas com a fila de gravação cheia',
+         [({}, chat['dropped'])]),
+        ('chat_messages_persisted_total', 'counter', 'Mensagens gravadas no banco', [({}, chat['persisted'])]),
+        ('chat_failed_flushes_total', 'counter', 'Gravações em lote que falharam', [({}, chat['failed_flushes'])]),
+        ('chat_archived_messages_total', 'counter', 'Mensagens movidas do banco para o arquivo',
+         [({}, archiver['messages'])]),
+        ('chat_archive_batches_total', 'counter', 'Lotes de arquivamento gravados', [({}, archiver['batches'])]),
+        ('chat_archive_failed_runs_total', 'counter', 'Rodadas de arquivamento que falharam',
+         [({}, archiver['failed_runs'])]),
+        ('chat_quick_messages_merged_total', 'counter', 'Mensagens rápidas somadas em vez de enviadas',
+         [({}, quick_merger.merged)]),
+        ('chat_rooms_active', 'gauge', 'Salas de chat com alguém presente', [({}, len(presence.sizes()))]),
+        ('socketio_connections', 'gauge', 'Conexões Socket.IO autenticadas neste worker',
+         [({}, len(connection_contexts))]),
+        ('password_hash_operations_total', 'counter', 'Hashes de senha gerados, conferidos e trocados',
+         [({'operation': operation}, passwords[operation]) for operation in ('hashed', 'verified', 'rehashed')]),
+        ('password_hash_busy_seconds_total', 'counter', 'Tempo gasto calculando hashes de senha',
+         [({}, passwords['busy_ms'] / 1000)]),
+        ('ratelimit_events_total', 'counter', 'Eventos avaliados pelo rate limit',
+         [({'rule': rule, 'result': result}, count)
+          for rule, stats in limits.items() for result, count in stats.items()])
+    ]
+
+@main.route('/metrics')
+def metrics_view():
+    """Métricas no formato Prometheus (com METRICS_TOKEN, exige Bearer)"""
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Não autorizado'}), 401
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@main.route('/db/stats')
+@login_required
+def db_stats_view():
+    return jsonify(db_stats)
+
 # WebSocket events
+def socket_rate_limited(rule, event_name):
+    """Aplica o limite ao evento; avisa só o remetente quando estourar"""
+    allowed, retry_after = rate_limiter.hit_current(rule)
+    if not allowed:
+        emit('rate_limited', {'event': event_name, 'retry_after': round(retry_after, 1)})
+    return not allowed
+
+# Salas usadas só pelo servidor (sincronização entre workers)
+RESERVED_ROOM_PREFIXES = ('sync:',)
+# Salas em que só o servidor publica (placar ao vivo e torcedores por jogo)
+BROADCAST_ROOM_PREFIXES = ('live:', 'fans:')
+
+def joinable_room(room):
+    """Se um cliente pode entrar na sala: nunca nas reservadas nem nas de
+    torcedores (entra-se por ``follow_matches``), e nas ``live:`` só de jogos
+    e times conhecidos; salas de chat são livres"""
+    if not isinstance(room, str) or not room or room.startswith(RESERVED_ROOM_PREFIXES + ('fans:',)):
+        return False
+    if not room.startswith('live:'):
+        return True
+    
+    live = parse_live_room(room)
+    if live is None:
+        return False
+    kind, value = live
+    if kind == 'match':
+        return bool(known_matches([value]))
+    return teams.resolve(value) is not None
+
+def joined_room(data):
+    """Sala do evento se a conexão está nela (entrou por ``join``,
+    ``follow_matches`` ou na conexão); None para sala ausente, que não seja
+    texto, a do próprio sid ou em que o cliente não entrou"""
+    room = data.get('room') if isinstance(data, dict) else None
+    if not isinstance(room, str) or room == request.sid or room not in rooms():
+        return None
+    return room
+
+def socket_context():
+    """Contexto do usuário da conexão atual (None sem login)"""
+    if 'user_id' not in session:
+        return None
+    return connection_contexts.get(request.sid, session['user_id'])
+
+@socketio.on('connect')
+@instrumented('connect')
+def on_connect():
+    if 'user_id' not in session:
+        return
+    
+    # Única leitura do usuário na conexão; os handlers usam o contexto
+    context = connection_contexts.load(request.sid, session['user_id'])
+    
+    # Placar ao vivo dos jogos do time do coração
+    if context and context['favorite_team']:
+        join_room(team_room(context['favorite_team']))
+
+@socketio.on('disconnect')
+@instrumented('disconnect')
+def on_disconnect():
+    presence.leave_all(request.sid)
+    connection_contexts.drop(request.sid)
+
+@socketio.on('follow_matches')
+@instrumented('follow_matches')
+def on_follow_matches(data):
+    """Entra nas salas de placar e de torcedores dos jogos (ids da API);
+    responde {id da API: id local}, que é o ``match_id`` dos ``fan_counts``"""
+    match_ids = {int(match_id) for match_id in data.get('match_ids', [])
+                 if str(match_id).isdigit()}
+    followed = known_matches(match_ids) if match_ids else {}
+    for api_match_id, match_id in followed.items():
+        join_room(match_room(api_match_id))
+        join_room(fan_room(match_id))
+    return followed
+
 @socketio.on('join')
+@instrumented('join')
 def on_join(data):
-    if 'user_id' not in session:
+    context = socket_context()
+    if context is None or socket_rate_limited('socket:join', 'join'):
         return
     
-    room = data['room']
+    room = data.get('room')
+    if not joinable_room(room):
+        emit('join_rejected', {'room': room})
+        return
     join_room(room)
-    user = User.query.get(session['user_id'])
-    emit('status', {'msg': f'{user.username} entrou no chat'}, room=room)
+    
+    # Entradas viram um resumo periódico de presença, não um aviso por pessoa
+    presence.start(socketio)
+    presence.join(room, request.sid, context['favorite_team'])
 
 @socketio.on('leave')
+@instrumented('leave')
 def on_leave(data):
-    if 'user_id' not in session:
+    context = socket_context()
+    if context is None:
         return
         
-    room = data['room']
+    room = joined_room(data)
+    if room is None:
+        return
     leave_room(room)
-    user = User.query.get(session['user_id'])
-    emit('status', {'msg': f'{user.username} saiu do chat'}, room=room)
+    presence.leave(room, request.sid)
 
 @socketio.on('message')
+@instrumented('message')
 def handle_message(data):
-    if 'user_id' not in session:
+    context = socket_context()
+    if context is None or socket_rate_limited('socket:message', 'message'):
         return
-        
-    room = data['room']
-    message_text = data['message']
+    
+    # Só nas salas em que o cliente entrou; as ao vivo, de torcedores e de
+    # sincronização só recebem eventos do servidor
+    room = joined_room(data)
+    if room is None or room.startswith(RESERVED_ROOM_PREFIXES + BROADCAST_ROOM_PREFIXES):
+        return
+    message_text = data.get('message')
     message_type = data.get('type', 'text')
+    if not isinstance(message_text, str) or not message_text:
+        return
     
-    # Save message to database
-    message = ChatMessage(
-        user_id=session['user_id'],
-        room_id=room,
-        message=message_text,
-        message_type=message_type
-    )
-    db.session.add(message)
-    db.session.commit()
+    # "GOOOOL!" repetido por centenas de torcedores vira um só broadcast
+    if message_type == 'quick' and quick_merger.enabled:
+        quick_merger.start(socketio)
+        if not quick_merger.offer(room, message_text, sender=context):
+            return
     
-    user = User.query.get(session['user_id'])
-    team_colors = TEAM_COLORS.get(user.favorite_team, {'primary': '#007BFF', 'secondary': '#FFFFFF'})
+    publish_message(context, room, message_text, message_type)
+
+def publish_message(context, room, message_text, message_type):
+    """Grava (em segundo plano), guarda no histórico e envia à sala uma
+    mensagem do torcedor de ``context``"""
+    # Carregar o histórico antes de enfileirar para não duplicar a mensagem
+    chat_history.warm(room)
+    
+    # Mensagem vai para a fila de gravação; o broadcast não espera o banco
+    chat_writer.start(socketio)
+    timestamp = chat_writer.enqueue(context['user_id'], room, message_text, message_type)
+    
+    entry = chat_history.entry(context['user_id'], context['username'], context['favorite_team_id'],
+                               message_text, message_type, timestamp,
+                               team_colors=context['team_colors'])
     
-    emit('message', {
-        'username': user.username,
+    # Com fila de mensagens o histórico é alimentado pelo listener da fila,
+    # em todos os workers
+    if socketio_queue is None:
+        chat_history.append(room, entry)
+    invalidate(f'chat:{room}')
+    
+    socketio.emit('message', {
+        'user_id': entry['user_id'],
+        'username': entry['username'],
         'message': message_text,
         'type': message_type,
-        'timestamp': message.timestamp.strftime('%H:%M'),
-        'team_colors': team_colors
-    }, room=room)
+        'timestamp': timestamp.strftime('%H:%M'),
+        'sent_at': timestamp.isoformat(),
+        'team_colors': entry['team_colors']
+    }, to=room)
+
+def publish_merged_quick_message(room, message_text, count, sender):
+    """As repetições de uma mensagem rápida viram uma mensagem comum da sala,
+    em nome do último torcedor que a repetiu, sem contar a primeira (já
+    enviada e gravada): 12 "🎉 GOOOOL!" dão o original e "🎉 GOOOOL! x11"
+    """
+    publish_message(sender, room, f'{message_text} x{count - 1}', 'quick')
+
+quick_merger.merge_listeners.append(publish_merged_quick_message)
 
 # Error handlers
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('error.html', 
                          error_code=404, 
                          error_message='Página não encontrada'), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return render_template('error.html', 
                          error_code=500, 
                          error_message='Erro interno do servidor'), 500
 
+# CLI commands
+@main.cli.command('archive-chat')
+@click.option('--max-batches', type=int, default=None, help='Para depois de N lotes (padrão: até acabar)')
+def archive_chat(max_batches):
+    """Move o histórico das salas encerradas para o arquivo do chat"""
+    archived = chat_archiver.run(max_batches=max_batches)
+    print(f"✅ {archived} mensagens arquivadas em {chat_archive.directory}")
+
+@main.cli.command('rebuild-fan-counts')
+@click.option('--check', is_flag=True, help='Só confere; sai com erro se houver diferença')
+def rebuild_fan_counts(check):
+    """Recalcula a contagem de torcedores a partir dos interesses"""
+    drift = fan_counts.drift() if check else fan_counts.rebuild()
+    for (match_id, establishment_id, team_id), (stored, actual) in sorted(drift.items()):
+        print(f"   jogo {match_id}, estabelecimento {establishment_id}, "
+              f"{teams.name(team_id) or team_id}: {stored} -> {actual}")
+    
+    if not drift:
+        print("✅ Contagem de torcedores confere com os interesses")
+    elif check:
+        print(f"❌ {len(drift)} contadores divergentes")
+        raise SystemExit(1)
+    else:
+        print(f"✅ {len(drift)} contadores corrigidos")
+
+@main.cli.command('backfill-matches')
+def backfill_matches():
+    """Carrega todos os jogos da edição atual do Brasileirão"""
+    counts = fixture_poller.backfill()
+    print(f"✅ Jogos: {counts['inserted']} inseridos, {counts['updated']} atualizados, "
+          f"{counts['unchanged']} inalterados")
+
+@main.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Falha se alguma consulta quente fizer full scan"""
+    queries = hot_queries(User, Match, UserMatchInterest, ChatMessage)
+    
+    with db.engine.connect() as connection:
+        results = check_query_plans(connection, queries)
+    
+    for name, (ok, plan) in results.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+        if not ok:
+            for step in plan:
+                print(f"     {step}")
+    
+    if not all(ok for ok, _ in results.values()):
+        raise SystemExit(1)
+
+# Application factory
+def create_app(config_name=None, **overrides):
+    """Cria a aplicação com a configuração de config.py.
+
+    Sem ``config_name`` usa FLASK_CONFIG ou, na falta dela, FLASK_ENV
+    (development/production/testing). ``overrides`` substituem chaves da
+    configuração (ex.: SQLALCHEMY_DATABASE_URI nos testes).
+    """
+    global socketio_queue
+    
+    config_name = config_name or os.environ.get('FLASK_CONFIG') or os.environ.get('FLASK_ENV')
+    settings = config.get(config_name, config['default'])
+    
+    app = Flask(__name__)
+    app.config.from_object(settings)
+    app.config.update(overrides)
+    settings.init_app(app)
+    init_template_caches(app, fragment_cache)
+    
+    db.init_app(app)
+    migrate.init_app(app, db, render_as_batch=True)
+    app.register_blueprint(main)
+    
+    # Com SOCKETIO_MESSAGE_QUEUE (ex.: redis://) vários workers compartilham as salas
+    manager = make_client_manager(app.config['SOCKETIO_MESSAGE_QUEUE'])
+    manager.fanout_listeners.append(emit_recipients.observe)
+    if app.config['SOCKETIO_MESSAGE_QUEUE']:
+        socketio_queue = manager
+        manager.emit_listeners.append(on_queue_emit)
+        presence.shared = True
+    socketio.init_app(app, cors_allowed_origins="*", client_manager=manager,
+                      async_mode=app.config['SOCKETIO_ASYNC_MODE'])
+    password_hasher.init_app(app, green=socketio.async_mode == 'eventlet')
+    
+    # Atrás de proxy (nginx), quantos saltos de X-Forwarded-* são confiáveis
+    proxy_count = app.config['PROXY_COUNT']
+    if proxy_count:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_count, x_proto=proxy_count)
+    
+    upstream.init_app(app)
+    places_cache.backend = make_backend(app.config['PLACES_CACHE_URL'],
+                                        max_entries=app.config['PLACES_CACHE_MAX_ENTRIES'],
+                                        prefix='esportesocial:places:')
+    places_cache.default_ttl = app.config['PLACES_CACHE_TTL']
+    rate_limiter.init_app(app, RATE_LIMIT_SETTINGS)
+    quick_merger.init_app(app)
+    presence.init_app(app)
+    fixture_poller.init_app(app)
+    chat_writer.init_app(app)
+    chat_history.init_app(app)
+    chat_archive.init_app(app)
+    chat_archiver.init_app(app)
+    fan_counts.init_app(app)
+    
+    return app
+
+def warm_up(app):
+    """Deixa pronto o que a primeira requisição faria: mappers do SQLAlchemy,
+    templates compilados e o registro de times. Com gunicorn --preload roda
+    uma vez no master e os workers herdam o resultado; a conexão usada para
+    ler os times é fechada antes do fork."""
+    with app.app_context():
+        configure_mappers()
+        for name in app.jinja_env.list_templates():
+            try:
+                app.jinja_env.get_template(name)
+            except TemplateError as e:
+                logger.warning('Template %s não compilou: %s', name, e)
+        
+        try:
+            logger.info('%d times carregados', len(teams.load()))
+        except SQLAlchemyError as e:
+            # Banco sem as migrações: o registro é lido na primeira requisição
+            logger.warning('Times não carregados: %s', e)
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+
+# Background tasks
+def start_background_tasks(singletons=True):
+    """Inicia os workers em segundo plano; com ``singletons`` False ficam de
+    fora o poller de jogos e o arquivo do chat, que rodam num só processo"""
+    if singletons:
+        if fixture_poller.enabled:
+            fixture_poller.start(socketio)
+        chat_archiver.start(socketio)
+    chat_writer.start(socketio)
+    presence.start(socketio)
+    fan_counts.start(socketio)
+
 # Create tables
-def create_tables():
+def create_tables(app):
+    """Aplica as migrações pendentes do banco"""
+    from flask_migrate import upgrade
+    
     with app.app_context():
         try:
-            db.create_all()
-            print("✅ Tabelas do banco criadas com sucesso!")
+            upgrade()
+            print("✅ Banco de dados atualizado com sucesso!")
         except Exception as e:
-            print(f"❌ Erro ao criar tabelas: {e}")
+            print(f"❌ Erro ao migrar o banco: {e}")
 
 if __name__ == '__main__':
+    app = create_app()
+    
     # Validar configuração
-    validate_api_keys()
+    with app.app_context():
+        validate_api_keys()
     
     # Criar tabelas
-    create_tables()
+    create_tables(app)
+    
+    # Iniciar workers em segundo plano
+    start_background_tasks()
     
     # Executar aplicação
     port = int(os.environ.get('PORT', 5000))
@@ -447,4 +1275,4 @@ if __name__ == '__main__':
                 debug=debug, 
                 host='0.0.0.0', 
                 port=port,
-                allow_unsafe_werkzeug=True)
\ No newline at end of file
+                allow_unsafe_werkzeug=True)
@@ -0,0 +1,355 @@
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, has_app_context
+
+DEFAULT_TIMEOUT = 300
+
+# Caches nomeados do processo, para as estatísticas
+_registry = {}
+
+
+class MemoryBackend:
+    """LRU em memória do processo, O(1), com TTL por entrada.
+
+    Entradas vencidas são removidas ao serem lidas e também por uma
+    varredura periódica (a cada ``sweep_interval`` segundos, durante um
+    ``set``), para não ocuparem espaço até serem lidas de novo.
+    """
+
+    def __init__(self, max_entries=1024, sweep_interval=60):
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.time() + sweep_interval
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Retorna (encontrado, valor)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.expirations += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (value, now + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+            if now >= self._next_sweep:
+                self._sweep(now)
+
+    def _sweep(self, now):
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at < now]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
+        self._next_sweep = now + self.sweep_interval
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def acquire_fill(self, key):
+        """Só um processo usa este backend: a trava por chave do TTLCache basta"""
+        return True
+
+    def release_fill(self, key, token):
+        pass
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Cache compartilhado entre workers via Redis (expiração feita pelo Redis).
+
+    ``acquire_fill`` é uma trava curta (SET NX PX de ``fill_lock_ms``) para
+    que só um worker carregue uma chave fria; ela expira sozinha se o
+    worker morrer no meio da carga.
+    """
+
+    # Apaga a trava só se ainda for a nossa (pode ter expirado e sido pega por outro)
+    RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url, prefix='esportesocial:', fill_lock_ms=5000):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('Instale o pacote "redis" para usar um cache redis://')
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.fill_lock_ms = fill_lock_ms
+        self.evictions = 0
+        self.expirations = 0
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        if data is None:
+            return False, None
+        return True, pickle.loads(data)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + 'counter:' + key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + 'counter:' + key)
+
+    def acquire_fill(self, key):
+        """Token da trava de carga da chave, ou None se outro worker a tem"""
+        token = uuid.uuid4().hex
+        if self.client.set(self.prefix + 'fill:' + key, token, nx=True, px=self.fill_lock_ms):
+            return token
+        return None
+
+    def release_fill(self, key, token):
+        self._release(keys=[self.prefix + 'fill:' + key], args=[token])
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + '*'))
+
+
+def make_backend(url, max_entries=1024, prefix='esportesocial:'):
+    """Cria o backend a partir de uma URL: memory:// ou redis://..."""
+    if not url or url.startswith('memory://'):
+        return MemoryBackend(max_entries=max_entries)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url, prefix=prefix)
+    raise ValueError(f'Backend de cache não suportado: {url}')
+
+
+class TTLCache:
+    """Cache com TTL, invalidação por tag e proteção contra stampede.
+
+    ``get_or_set`` garante que, para uma chave fria, só uma chamada do
+    ``loader`` rode por vez no processo; as demais esperam e reaproveitam
+    o resultado. Com backend Redis a carga também é única entre workers:
+    quem não pega a trava do backend espera o valor aparecer (até
+    ``fill_wait`` segundos) antes de carregar por conta própria.
+
+    Entradas gravadas com ``tags`` deixam de valer quando ``invalidate(tag)``
+    é chamado (a geração da tag entra na chave).
+    """
+
+    def __init__(self, backend, default_ttl=None, name='cache', fill_wait=5.0, sleep=time.sleep):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.name = name
+        self.fill_wait = fill_wait
+        self.sleep = sleep
+
+        # chave -> [trava, chamadas usando a trava]; sai quando ninguém mais usa
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'loads': 0, 'invalidations': 0, 'fill_waits': 0}
+
+        _registry[name] = self
+
+    @property
+    def ttl(self):
+        if self.default_ttl is not None:
+            return self.default_ttl
+        if has_app_context():
+            return current_app.config.get('CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+        return DEFAULT_TIMEOUT
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _key(self, key, tags):
+        if not tags:
+            return key
+        generations = ','.join(f'{tag}={self.backend.counter("tag:" + tag)}' for tag in tags)
+        return f'{key}#{generations}'
+
+    def get(self, key, tags=()):
+        found, value = self.backend.get(self._key(key, tags))
+        self._count('hits' if found else 'misses')
+        return found, value
+
+    def set(self, key, value, ttl=None, tags=()):
+        self.backend.set(self._key(key, tags), value, self.ttl if ttl is None else ttl)
+
+    def delete(self, key, tags=()):
+        self.backend.delete(self._key(key, tags))
+
+    def invalidate(self, tag):
+        """Invalida todas as entradas gravadas com a tag"""
+        self.backend.incr('tag:' + tag)
+        self._count('invalidations')
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_set(self, key, loader, ttl=None, tags=(), cacheable=None):
+        """Lê do cache ou chama ``loader()`` uma única vez para a chave.
+
+        ``cacheable(valor)`` pode recusar guardar um resultado (ex.: erros).
+        """
+        found, value = self.get(key, tags)
+        if found:
+            return value
+
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                # Outra chamada pode ter carregado enquanto esperávamos
+                full_key = self._key(key, tags)
+                found, value = self.backend.get(full_key)
+                if found:
+                    return value
+
+                token = self.backend.acquire_fill(full_key)
+                if token is None:
+                    found, value = self._wait_fill(full_key)
+                    if found:
+                        return value
+
+                try:
+                    self._count('loads')
+                    value = loader()
+                    if cacheable is None or cacheable(value):
+                        self.set(key, value, ttl, tags)
+                finally:
+                    if token is not None:
+                        self.backend.release_fill(full_key, token)
+                return value
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def _wait_fill(self, full_key):
+        """Espera outro worker gravar a chave; (False, None) se não gravar a tempo"""
+        self._count('fill_waits')
+        deadline = time.monotonic() + self.fill_wait
+        while time.monotonic() < deadline:
+            self.sleep(0.05)
+            found, value = self.backend.get(full_key)
+            if found:
+                return found, value
+        return False, None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['evictions'] = self.backend.evictions
+        stats['expirations'] = self.backend.expirations
+        stats['size'] = len(self.backend)
+        return stats
+
+
+def all_stats():
+    """Estatísticas de todos os caches do processo"""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def invalidate(tag):
+    """Invalida a tag em todos os caches do processo"""
+    for cache in _registry.values():
+        cache.invalidate(tag)
+
+
+response_cache = TTLCache(MemoryBackend(max_entries=1024), name='responses')
+
+
+class _CachedResponse:
+    """Cópia imutável de um Response; cada acerto gera um Response novo"""
+
+    def __init__(self, response):
+        self.body = response.get_data()
+        self.status = response.status_code
+        self.headers = [(k, v) for k, v in response.headers if k.lower() != 'set-cookie']
+
+    def build(self):
+        return Response(self.body, status=self.status, headers=self.headers)
+
+
+def _is_cacheable(result):
+    if isinstance(result, Response):
+        return (result.status_code == 200 and not result.is_streamed
+                and not result.direct_passthrough and 'Set-Cookie' not in result.headers)
+    return True
+
+
+def cache_response(timeout=None, tags=(), cache=None):
+    """Decorator de cache para funções e views Flask.
+
+    A chave é o nome da função com os argumentos. Views que retornam um
+    ``Response`` (ou tupla) têm o corpo, status e headers guardados e um
+    ``Response`` novo montado a cada acerto; respostas com erro, streaming
+    ou cookies não são guardadas. O TTL padrão é ``CACHE_TIMEOUT``.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            target = cache or response_cache
+            cache_key = f"{f.__module__}.{f.__qualname__}:{args!r}:{sorted(kwargs.items())!r}"
+
+            def load():
+                result = f(*args, **kwargs)
+                if isinstance(result, (Response, tuple)) and has_app_context():
+                    result = current_app.make_response(result)
+                    return _CachedResponse(result) if _is_cacheable(result) else result
+                return result
+
+            value = target.get_or_set(
+                cache_key, load, ttl=timeout, tags=tags,
+                cacheable=lambda value: not isinstance(value, Response)
+            )
+            return value.build() if isinstance(value, _CachedResponse) else value
+        return decorated_function
+    return decorator
@@ -0,0 +1,324 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from urllib.parse import quote
+
+from sqlalchemy import delete
+
+from chat_history import decode_cursor, encode_cursor
+
+SEGMENT_SUFFIX = '.jsonl.gz'
+
+# Mensagens mais novas que isso ficam no banco: a fila de gravação do chat
+# ainda pode inserir mensagens com timestamp um pouco anterior ao de agora
+WRITE_MARGIN = timedelta(minutes=5)
+
+
+def _key(record):
+    return record['timestamp'], record['id']
+
+
+def _is_before(key, cursor):
+    """``key`` < ``cursor`` em (timestamp, id); cursor sem id compara só o timestamp"""
+    timestamp, message_id = cursor
+    return key[0] < timestamp if message_id is None else key < cursor
+
+
+def _is_after(key, cursor):
+    timestamp, message_id = cursor
+    return key[0] > timestamp if message_id is None else key > cursor
+
+
+@lru_cache(maxsize=64)
+def _read_segment(path):
+    """Mensagens de um segmento; segmentos nunca mudam, então o cache por caminho vale"""
+    records = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            record['timestamp'] = datetime.fromisoformat(record['timestamp'])
+            records.append(record)
+    return tuple(records)
+
+
+class ChatArchive:
+    """Histórico antigo das salas em segmentos comprimidos, só de acréscimo.
+
+    Cada sala tem um diretório com arquivos ``<primeira>_<última>.jsonl.gz``
+    (cursores das mensagens das pontas). Um segmento é escrito num arquivo
+    temporário e renomeado; depois disso nunca muda. ``compact`` junta
+    segmentos pequenos num novo e só então apaga os antigos, e a listagem
+    ignora segmentos contidos em outro, então a leitura nunca vê duplicatas.
+    """
+
+    def __init__(self, directory=None, compact_bytes=256 * 1024):
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = app.config['CHAT_ARCHIVE_DIR'] or os.path.join(app.instance_path, 'chat_archive')
+        # A listagem em cache é do diretório anterior
+        with self._lock:
+            self._segments.clear()
+
+    def _room_dir(self, room_id):
+        return os.path.join(self.directory, quote(room_id, safe=''))
+
+    def segments(self, room_id):
+        """[(primeira chave, última chave, caminho)] da sala, em ordem"""
+        room_dir = self._room_dir(room_id)
+        try:
+            mtime = os.stat(room_dir).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        with self._lock:
+            cached = self._segments.get(room_id)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        found = []
+        for name in os.listdir(room_dir):
+            if name.endswith(SEGMENT_SUFFIX):
+                first, _, last = name[:-len(SEGMENT_SUFFIX)].partition('_')
+                found.append((decode_cursor(first), decode_cursor(last), os.path.join(room_dir, name)))
+
+        # Maior segmento primeiro entre os que começam juntos; os contidos nele somem
+        found.sort(key=lambda segment: segment[1], reverse=True)
+        found.sort(key=lambda segment: segment[0])
+        segments = []
+        for segment in found:
+            if not segments or segment[1] > segments[-1][1]:
+                segments.append(segment)
+
+        with self._lock:
+            self._segments[room_id] = (mtime, segments)
+        return segments
+
+    def last_key(self, room_id):
+        """(timestamp, id) da mensagem arquivada mais nova da sala, ou None"""
+        segments = self.segments(room_id)
+        return segments[-1][1] if segments else None
+
+    def write(self, room_id, records):
+        """Grava ``records`` (em ordem de timestamp e id) num segmento novo"""
+        room_dir = self._room_dir(room_id)
+        os.makedirs(room_dir, exist_ok=True)
+
+        first, last = records[0], records[-1]
+        name = f"{encode_cursor(*_key(first))}_{encode_cursor(*_key(last))}{SEGMENT_SUFFIX}"
+        path = os.path.join(room_dir, name)
+        temporary = f'{path}.tmp'
+
+        with open(temporary, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                for record in records:
+                    line = json.dumps(dict(record, timestamp=record['timestamp'].isoformat()), ensure_ascii=False)
+                    f.write(line.encode('utf-8') + b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temporary, path)
+        return path
+
+    def page(self, room_id, limit, before=None, after=None):
+        """Mesma paginação de ``RoomHistoryCache.page`` sobre o arquivo.
+
+        Retorna (registros da mais antiga para a mais nova, has_more).
+        """
+        try:
+            return self._page(room_id, limit, before, after)
+        except FileNotFoundError:
+            # Segmento removido por uma compactação depois da listagem
+            with self._lock:
+                self._segments.pop(room_id, None)
+            return self._page(room_id, limit, before, after)
+
+    def _page(self, room_id, limit, before, after):
+        found = []
+        segments = self.segments(room_id)
+
+        if after is not None:
+            for _, last, path in segments:
+                if not _is_after(last, after):
+                    continue
+                for record in _read_segment(path):
+                    if _is_after(_key(record), after):
+                        if len(found) == limit:
+                            return found, True
+                        found.append(record)
+            return found, False
+
+        for first, _, path in reversed(segments):
+            if before is not None and not _is_before(first, before):
+                continue
+            for record in reversed(_read_segment(path)):
+                if before is None or _is_before(_key(record), before):
+                    if len(found) == limit:
+                        found.reverse()
+                        return found, True
+                    found.append(record)
+        found.reverse()
+        return found, False
+
+    def compact(self, room_id):
+        """Junta segmentos pequenos vizinhos (até ``compact_bytes`` cada grupo);
+        retorna quantos segmentos foram substituídos"""
+        groups, group, size = [], [], 0
+        for segment in self.segments(room_id):
+            segment_size = os.path.getsize(segment[2])
+            if group and size + segment_size > self.compact_bytes:
+                groups.append(group)
+                group, size = [], 0
+            group.append(segment)
+            size += segment_size
+        groups.append(group)
+
+        replaced = 0
+        for group in groups:
+            if len(group) < 2:
+                continue
+            self.write(room_id, [record for _, _, path in group for record in _read_segment(path)])
+            for _, _, path in group:
+                os.remove(path)
+            replaced += len(group)
+        return replaced
+
+
+class ChatArchiver:
+    """Move do banco para o ChatArchive o histórico das salas encerradas.
+
+    ``due_rooms()`` diz quais salas arquivar e até quando, em pares
+    ``(sala, antes_de)``. Cada sala anda em lotes de ``batch_size`` mensagens
+    pelo índice (room_id, timestamp, id): o lote vira um segmento e só então
+    sai do banco, num DELETE por id e transação curta, com ``pause`` segundos
+    entre lotes. Se um lote falhar depois do segmento gravado, a próxima
+    rodada só apaga do banco o que o arquivo já tem.
+    """
+
+    def __init__(self, db, message_model, archive, due_rooms, batch_size=500, interval=0, pause=0.1):
+        self.app = None
+        self.db = db
+        self.message_model = message_model
+        self.archive = archive
+        self.due_rooms = due_rooms
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+
+        self._lock = threading.Lock()
+        self._started = False
+        self._socketio = None
+        self._stats = {'runs': 0, 'messages': 0, 'batches': 0, 'segments_compacted': 0,
+                       'failed_runs': 0, 'last_run_ms': 0.0}
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config['CHAT_ARCHIVE_BATCH_SIZE']
+        self.interval = app.config['CHAT_ARCHIVE_INTERVAL']
+        self.pause = app.config['CHAT_ARCHIVE_PAUSE']
+
+    def start(self, socketio):
+        """Roda o arquivamento a cada ``interval`` segundos (0 desliga; idempotente)"""
+        if self.interval <= 0:
+            return False
+
+        with self._lock:
+            if self._started:
+                return True
+            self._started = True
+
+        self._socketio = socketio
+        socketio.start_background_task(self._run)
+        return True
+
+    def _run(self):
+        while True:
+            self._socketio.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    self.run(sleep=self._socketio.sleep)
+                except Exception as e:
+                    self.db.session.rollback()
+                    with self._lock:
+                        self._stats['failed_runs'] += 1
+                    print(f"Error archiving chat: {e}")
+
+    def run(self, max_batches=None, sleep=time.sleep):
+        """Uma rodada pelas salas devidas, com no máximo ``max_batches`` lotes;
+        retorna quantas mensagens foram arquivadas"""
+        started = time.perf_counter()
+        archived = batches = 0
+
+        for room_id, cutoff in self.due_rooms():
+            if max_batches is not None and batches >= max_batches:
+                break
+            remaining = None if max_batches is None else max_batches - batches
+            room_archived, room_batches = self.archive_room(room_id, cutoff, max_batches=remaining, sleep=sleep)
+            archived += room_archived
+            batches += room_batches
+            compacted = self.archive.compact(room_id)
+            with self._lock:
+                self._stats['segments_compacted'] += compacted
+
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['last_run_ms'] = (time.perf_counter() - started) * 1000
+        return archived
+
+    def archive_room(self, room_id, cutoff, max_batches=None, sleep=time.sleep):
+        """Arquiva as mensagens da sala anteriores a ``cutoff``, lote a lote;
+        retorna (mensagens arquivadas, lotes)"""
+        ChatMessage = self.message_model
+        User = ChatMessage.user.property.mapper.class_
+        table = ChatMessage.__table__
+        cutoff = min(cutoff, datetime.utcnow() - WRITE_MARGIN)
+        archived_until = self.archive.last_key(room_id)
+        archived = batches = 0
+
+        while max_batches is None or batches < max_batches:
+            rows = self.db.session.query(
+                ChatMessage.id, ChatMessage.user_id, ChatMessage.message, ChatMessage.message_type,
+                ChatMessage.timestamp, User.username, User.favorite_team_id
+            ).join(ChatMessage.user).filter(
+                ChatMessage.room_id == room_id, ChatMessage.timestamp < cutoff
+            ).order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc()).limit(self.batch_size).all()
+            # Não segura a transação de leitura enquanto grava o arquivo
+            self.db.session.commit()
+            if not rows:
+                break
+
+            records = [
+                {'id': row.id, 'user_id': row.user_id, 'username': row.username,
+                 'team_id': row.favorite_team_id, 'message': row.message,
+                 'type': row.message_type, 'timestamp': row.timestamp}
+                for row in rows
+                if archived_until is None or (row.timestamp, row.id) > archived_until
+            ]
+            if records:
+                self.archive.write(room_id, records)
+                archived_until = _key(records[-1])
+
+            self.db.session.execute(delete(table).where(table.c.id.in_([row.id for row in rows])))
+            self.db.session.commit()
+
+            archived += len(records)
+            batches += 1
+            with self._lock:
+                self._stats['messages'] += len(records)
+                self._stats['batches'] += 1
+
+            if len(rows) < self.batch_size:
+                break
+            sleep(self.pause)
+
+        return archived, batches
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
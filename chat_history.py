@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+
+CURSOR_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def encode_cursor(timestamp, message_id=None):
+    """Cursor da paginação: ``<timestamp>.<id>`` (o id é opcional)"""
+    cursor = timestamp.strftime(CURSOR_FORMAT)
+    return cursor if message_id is None else f'{cursor}.{message_id}'
+
+
+def decode_cursor(cursor):
+    """Retorna (timestamp, id ou None); ValueError se o cursor for inválido"""
+    timestamp, _, message_id = cursor.partition('.')
+    return datetime.strptime(timestamp, CURSOR_FORMAT), int(message_id) if message_id else None
+
+
+class RoomHistoryCache:
+    """Últimas ``size`` mensagens de cada sala, já renderizadas, em memória.
+
+    As salas ficam num LRU limitado a ``max_rooms``; uma sala sem acesso há
+    mais de ``idle_ttl`` segundos é descartada. Na primeira leitura a sala é
+    carregada do banco (uma consulta, com o usuário junto) e depois segue
+    sendo alimentada pelo ``append`` do handler de mensagens. Com ``archive``
+    (um ChatArchive), o que já saiu do banco é lido dos segmentos arquivados.
+    """
+
+    def __init__(self, db, message_model, colors_for, size=50, max_rooms=1000, idle_ttl=1800,
+                 archive=None):
+        self.db = db
+        self.message_model = message_model
+        self.colors_for = colors_for
+        self.archive = archive
+        self.size = size
+        self.max_rooms = max_rooms
+        self.idle_ttl = idle_ttl
+
+        self._rooms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.size = app.config['CHAT_HISTORY_SIZE']
+        self.max_rooms = app.config['CHAT_HISTORY_MAX_ROOMS']
+        self.idle_ttl = app.config['CHAT_HISTORY_IDLE_TTL']
+
+    def entry(self, user_id, username, team_id, message, message_type, timestamp, team_colors=None):
+        """Monta uma mensagem no formato guardado no buffer (``team_colors``
+        já resolvidas evitam a consulta às cores do time)"""
+        return {
+            'user_id': user_id,
+            'username': username,
+            'message': message,
+            'type': message_type,
+            'timestamp': timestamp,
+            'team_colors': team_colors if team_colors is not None else self.colors_for(team_id)
+        }
+
+    def _archived_entry(self, record):
+        message = self.entry(record['user_id'], record['username'], record['team_id'],
+                             record['message'], record['type'], record['timestamp'])
+        message['id'] = record['id']
+        message['cursor'] = encode_cursor(record['timestamp'], record['id'])
+        return message
+
+    def _load(self, room_id):
+        ChatMessage = self.message_model
+        messages = ChatMessage.query.options(joinedload(ChatMessage.user))\
+            .filter_by(room_id=room_id)\
+            .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())\
+            .limit(self.size).all()
+
+        history = deque(
+            (self.entry(m.user_id, m.user.username, m.user.favorite_team_id,
+                        m.message, m.message_type, m.timestamp)
+             for m in reversed(messages)),
+            maxlen=self.size
+        )
+
+        # Sala (parcialmente) arquivada: completa com o fim do arquivo
+        if self.archive is not None and len(messages) < self.size:
+            oldest = (messages[-1].timestamp, messages[-1].id) if messages else None
+            archived, _ = self.archive.page(room_id, self.size - len(messages), before=oldest)
+            history.extendleft(self._archived_entry(record) for record in reversed(archived))
+        return history
+
+    def page(self, room_id, limit=50, before=None, after=None):
+        """Página do histórico por cursor (keyset em room_id, timestamp, id).
+
+        ``before`` traz as ``limit`` mensagens anteriores ao cursor e ``after``
+        as seguintes; sem cursor, as mais recentes. As mensagens vêm da mais
+        antiga para a mais nova, com o cursor de cada uma, e ``has_more``
+        indica se há mais na direção pedida. Não passa pelo buffer em memória.
+        As mensagens arquivadas são sempre mais antigas que as do banco, então
+        a página continua no arquivo quando o banco acaba (ou começa nele).
+        """
+        if self.archive is None:
+            return self._page_db(room_id, limit, before, after)
+
+        if after is not None:
+            archived, has_more = self.archive.page(room_id, limit, after=after)
+            messages = [self._archived_entry(record) for record in archived]
+            if has_more:
+                return messages, True
+            if messages:
+                after = (archived[-1]['timestamp'], archived[-1]['id'])
+            recent, has_more = self._page_db(room_id, limit - len(messages), after=after)
+            return messages + recent, has_more
+
+        messages, has_more = self._page_db(room_id, limit, before=before)
+        if has_more:
+            return messages, True
+        oldest = (messages[0]['timestamp'], messages[0]['id']) if messages else before
+        archived, has_more = self.archive.page(room_id, limit - len(messages), before=oldest)
+        return [self._archived_entry(record) for record in archived] + messages, has_more
+
+    def _page_db(self, room_id, limit, before=None, after=None):
+        ChatMessage = self.message_model
+        User = ChatMessage.user.property.mapper.class_
+
+        query = self.db.session.query(
+            ChatMessage.id, ChatMessage.user_id, ChatMessage.message, ChatMessage.message_type,
+            ChatMessage.timestamp, User.username, User.favorite_team_id
+        ).join(ChatMessage.user).filter(ChatMessage.room_id == room_id)
+
+        if after is not None:
+            timestamp, message_id = after
+            if message_id is None:
+                query = query.filter(ChatMessage.timestamp > timestamp)
+            else:
+                query = query.filter(or_(
+                    ChatMessage.timestamp > timestamp,
+                    and_(ChatMessage.timestamp == timestamp, ChatMessage.id > message_id)
+                ))
+            query = query.order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc())
+        else:
+            if before is not None:
+                timestamp, message_id = before
+                if message_id is None:
+                    query = query.filter(ChatMessage.timestamp < timestamp)
+                else:
+                    query = query.filter(or_(
+                        ChatMessage.timestamp < timestamp,
+                        and_(ChatMessage.timestamp == timestamp, ChatMessage.id < message_id)
+                    ))
+            query = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if after is None:
+            rows.reverse()
+
+        messages = []
+        for row in rows:
+            message = self.entry(row.user_id, row.username, row.favorite_team_id,
+                                 row.message, row.message_type, row.timestamp)
+            message['id'] = row.id
+            message['cursor'] = encode_cursor(row.timestamp, row.id)
+            messages.append(message)
+        return messages, has_more
+
+    def _evict(self, now):
+        while self._rooms:
+            room_id, (_, last_access) = next(iter(self._rooms.items()))
+            if len(self._rooms) <= self.max_rooms and now - last_access < self.idle_ttl:
+                break
+            self._rooms.pop(room_id)
+
+    def _room(self, room_id):
+        now = time.time()
+        with self._lock:
+            cached = self._rooms.get(room_id)
+            if cached is not None:
+                cached[1] = now
+                self._rooms.move_to_end(room_id)
+                return cached[0]
+
+        # Carrega fora do lock; se outra thread carregou antes, vale a dela
+        history = self._load(room_id)
+        with self._lock:
+            cached = self._rooms.setdefault(room_id, [history, now])
+            cached[1] = now
+            self._rooms.move_to_end(room_id)
+            self._evict(now)
+            return cached[0]
+
+    def warm(self, room_id):
+        """Garante que a sala está no buffer (carregando do banco se preciso)"""
+        self._room(room_id)
+
+    def get(self, room_id):
+        """Retorna as mensagens recentes da sala, da mais antiga para a mais nova"""
+        history = self._room(room_id)
+        with self._lock:
+            return list(history)
+
+    def append(self, room_id, entry):
+        """Adiciona uma mensagem nova ao buffer da sala"""
+        history = self._room(room_id)
+        with self._lock:
+            history.append(entry)
+
+    def append_if_cached(self, room_id, entry):
+        """Adiciona a mensagem só se a sala já estiver no buffer"""
+        with self._lock:
+            cached = self._rooms.get(room_id)
+            if cached is not None:
+                cached[0].append(entry)
+
+    def invalidate(self, room_id=None):
+        """Descarta uma sala (ou todas)"""
+        with self._lock:
+            if room_id is None:
+                self._rooms.clear()
+            else:
+                self._rooms.pop(room_id, None)
@@ -0,0 +1,169 @@
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class ChatWriteBehind:
+    """Persiste as mensagens do chat em lotes, fora do caminho do broadcast.
+
+    ``enqueue`` só registra a mensagem (com o timestamp de chegada) e volta
+    imediatamente. Um worker grava a fila a cada ``flush_interval`` segundos
+    ou assim que ela atinge ``batch_size`` mensagens, sempre na ordem de
+    chegada e em uma transação por lote.
+
+    Um lote que falha volta para a fila, que guarda no máximo
+    ``max_pending`` mensagens: com o banco fora do ar as mais antigas são
+    descartadas (e contadas em ``dropped``) para a memória não crescer.
+    """
+
+    def __init__(self, db, message_model, batch_size=100, flush_interval=0.5, max_pending=10000):
+        self.app = None
+        self.db = db
+        self.message_model = message_model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._started = False
+        self._flush_scheduled = False
+        self._dropping = False
+        self._socketio = None
+
+        self._stats = {
+            'enqueued': 0,
+            'persisted': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'dropped': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+
+    def init_app(self, app):
+        """Aplicação usada para abrir o contexto nas gravações em segundo plano;
+        lote, intervalo e limite da fila vêm de CHAT_BATCH_SIZE,
+        CHAT_FLUSH_INTERVAL e CHAT_MAX_PENDING"""
+        self.app = app
+        self.batch_size = app.config['CHAT_BATCH_SIZE']
+        self.flush_interval = app.config['CHAT_FLUSH_INTERVAL']
+        self.max_pending = app.config['CHAT_MAX_PENDING']
+
+    def start(self, socketio):
+        """Inicia o worker de gravação (idempotente)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        self._socketio = socketio
+        atexit.register(self.flush)
+        socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self._socketio.sleep(self.flush_interval)
+            self.flush()
+
+    def enqueue(self, user_id, room_id, message, message_type='text'):
+        """Coloca uma mensagem na fila e retorna seu timestamp"""
+        with self._lock:
+            # Dentro da trava: a ordem dos ids (a da fila) segue a dos timestamps
+            timestamp = datetime.utcnow()
+            self._pending.append({
+                'user_id': user_id,
+                'room_id': room_id,
+                'message': message,
+                'message_type': message_type,
+                'timestamp': timestamp
+            })
+            self._stats['enqueued'] += 1
+            self._trim()
+
+            schedule = (len(self._pending) >= self.batch_size
+                        and not self._flush_scheduled and self._socketio is not None)
+            if schedule:
+                self._flush_scheduled = True
+
+        if schedule:
+            self._socketio.start_background_task(self.flush)
+
+        return timestamp
+
+    def flush(self):
+        """Grava tudo o que está na fila; retorna o número de mensagens gravadas"""
+        persisted = 0
+
+        # Um flush por vez para manter a ordem dos ids
+        with self._flush_lock:
+            with self._lock:
+                self._flush_scheduled = False
+
+            while True:
+                with self._lock:
+                    batch = [self._pending.popleft()
+                             for _ in range(min(self.batch_size, len(self._pending)))]
+                if not batch:
+                    break
+
+                if not self._write(batch):
+                    with self._lock:
+                        self._pending.extendleft(reversed(batch))
+                        self._trim()
+                    break
+                persisted += len(batch)
+
+        return persisted
+
+    def _trim(self):
+        """Descarta as mensagens mais antigas acima de ``max_pending`` (com o lock)"""
+        overflow = len(self._pending) - self.max_pending
+        if overflow <= 0:
+            return
+        for _ in range(overflow):
+            self._pending.popleft()
+        self._stats['dropped'] += overflow
+        if not self._dropping:
+            # Um aviso por falta de banco, não um por mensagem
+            self._dropping = True
+            print(f"Chat write queue full ({self.max_pending}); dropping oldest messages")
+
+    def _write(self, batch):
+        started = time.perf_counter()
+
+        with self.app.app_context():
+            try:
+                self.db.session.execute(self.message_model.__table__.insert(), batch)
+                self.db.session.commit()
+            except Exception as e:
+                self.db.session.rollback()
+                print(f"Error persisting chat messages: {e}")
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                return False
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._dropping = False
+            self._stats['persisted'] += len(batch)
+            self._stats['flushes'] += 1
+            self._stats['last_flush_ms'] = elapsed_ms
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+            self._stats['total_flush_ms'] += elapsed_ms
+        return True
+
+    def metrics(self):
+        """Profundidade da fila e latência dos flushes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._pending)
+            stats['queue_capacity'] = self.max_pending
+
+        flushes = stats.pop('total_flush_ms')
+        stats['avg_flush_ms'] = flushes / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
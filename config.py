@@ -10,19 +10,109 @@ class Config:
     # APIs Configuration - Usando variáveis de ambiente
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
     API_FUTEBOL_KEY = os.environ.get('API_FUTEBOL_KEY')
+    API_FUTEBOL_URL = os.environ.get('API_FUTEBOL_URL', 'https://api.api-futebol.com.br/v1')
+    GOOGLE_PLACES_URL = os.environ.get('GOOGLE_PLACES_URL', 'https://maps.googleapis.com/maps/api/place')
+    
+    # Fixture ingestion (seconds); enable the poller on a single worker only
+    FIXTURE_POLLER_ENABLED = os.environ.get('FIXTURE_POLLER_ENABLED', 'true').lower() == 'true'
+    FIXTURE_POLL_INTERVAL = int(os.environ.get('FIXTURE_POLL_INTERVAL', 300))
+    FIXTURE_LIVE_POLL_INTERVAL = int(os.environ.get('FIXTURE_LIVE_POLL_INTERVAL', 30))
+    EDITION_CACHE_TTL = int(os.environ.get('EDITION_CACHE_TTL', 3600))
+    
+    # Chat write-behind
+    CHAT_BATCH_SIZE = int(os.environ.get('CHAT_BATCH_SIZE', 100))
+    CHAT_FLUSH_INTERVAL = float(os.environ.get('CHAT_FLUSH_INTERVAL', 0.5))
+    # Limite da fila de gravação (banco fora do ar): acima dele as mais antigas são descartadas
+    CHAT_MAX_PENDING = int(os.environ.get('CHAT_MAX_PENDING', 10000))
+    
+    # Chat history ring buffer
+    CHAT_HISTORY_SIZE = int(os.environ.get('CHAT_HISTORY_SIZE', 50))
+    CHAT_HISTORY_MAX_ROOMS = int(os.environ.get('CHAT_HISTORY_MAX_ROOMS', 1000))
+    CHAT_HISTORY_IDLE_TTL = int(os.environ.get('CHAT_HISTORY_IDLE_TTL', 1800))
+    CHAT_PAGE_MAX_SIZE = int(os.environ.get('CHAT_PAGE_MAX_SIZE', 100))
+    
+    # Arquivo do chat: salas de jogos encerrados saem do banco para segmentos
+    # .jsonl.gz em CHAT_ARCHIVE_DIR (padrão: instance/chat_archive). Com
+    # CHAT_ARCHIVE_INTERVAL > 0 roda em segundo plano (num só worker do gunicorn);
+    # senão, use "flask archive-chat" (ex.: cron)
+    CHAT_ARCHIVE_DIR = os.environ.get('CHAT_ARCHIVE_DIR', '')
+    CHAT_ARCHIVE_INTERVAL = int(os.environ.get('CHAT_ARCHIVE_INTERVAL', 0))
+    CHAT_ARCHIVE_BATCH_SIZE = int(os.environ.get('CHAT_ARCHIVE_BATCH_SIZE', 500))
+    CHAT_ARCHIVE_PAUSE = float(os.environ.get('CHAT_ARCHIVE_PAUSE', 0.1))
+    CHAT_ARCHIVE_MATCH_GRACE_HOURS = int(os.environ.get('CHAT_ARCHIVE_MATCH_GRACE_HOURS', 6))
+    CHAT_ARCHIVE_MAX_AGE_DAYS = int(os.environ.get('CHAT_ARCHIVE_MAX_AGE_DAYS', 0))
+    
+    # Presença nas salas
+    PRESENCE_INTERVAL = float(os.environ.get('PRESENCE_INTERVAL', 1.0))
+    PRESENCE_HEARTBEAT = int(os.environ.get('PRESENCE_HEARTBEAT', 15))
+    
+    # Contagem de torcedores: envio às salas dos jogos no máximo a cada N segundos
+    FAN_COUNTS_PUSH_INTERVAL = float(os.environ.get('FAN_COUNTS_PUSH_INTERVAL', 1.0))
+    
+    # Google Places cache (memory:// or redis://...)
+    PLACES_CACHE_URL = os.environ.get('PLACES_CACHE_URL', 'memory://')
+    PLACES_CACHE_TTL = int(os.environ.get('PLACES_CACHE_TTL', 900))
+    PLACES_CACHE_MAX_ENTRIES = int(os.environ.get('PLACES_CACHE_MAX_ENTRIES', 2048))
+    PLACES_CELL_KM = float(os.environ.get('PLACES_CELL_KM', 0.5))
+    # Busca de próximos: abaixo deste número de resultados locais consulta o Google
+    NEARBY_MIN_LOCAL_RESULTS = int(os.environ.get('NEARBY_MIN_LOCAL_RESULTS', 3))
+    ESTABLISHMENT_INDEX_TTL = int(os.environ.get('ESTABLISHMENT_INDEX_TTL', 300))
+    
+    # Upstream HTTP client (API-Futebol, Google Places)
+    UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 10))
+    UPSTREAM_MAX_CONCURRENCY = int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 20))
+    UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 2))
+    UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3))
+    UPSTREAM_FAILURE_THRESHOLD = int(os.environ.get('UPSTREAM_FAILURE_THRESHOLD', 5))
+    UPSTREAM_RESET_TIMEOUT = int(os.environ.get('UPSTREAM_RESET_TIMEOUT', 30))
+    
+    # Hash de senha: método/custo do Werkzeug (ex.: pbkdf2:sha256:600000, scrypt:32768:8:1)
+    # e quantos hashes rodam ao mesmo tempo; hashes antigos são trocados no login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    
+    # Cache HTTP: compressão de JSON/HTML acima de COMPRESS_MIN_SIZE bytes e
+    # validade dos estáticos com hash na URL (?v=)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 31536000))
+    
+    # Templates: bytecode compilado em disco (padrão: instance/jinja_bytecode)
+    # e cache em memória dos trechos que só variam por time e idioma
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR', '')
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', 'true').lower() == 'true'
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 86400))
+    TEMPLATE_LOCALE = os.environ.get('TEMPLATE_LOCALE', 'pt-BR')
     
     # Session Configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     SESSION_REFRESH_EACH_REQUEST = True
     
     # SocketIO Configuration
-    SOCKETIO_ASYNC_MODE = 'threading'
+    # Vazio: escolhe sozinho (eventlet quando instalado)
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE') or None
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')  # ex.: redis://redis:6379/0
     
     # Cache Configuration
-    CACHE_TIMEOUT = 300  # 5 minutes
+    CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 300))  # 5 minutes
+    
+    # Rate Limiting (memory:// por worker ou redis:// compartilhado)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')
+    # Limites "usuário,ip" por evento/rota
+    RATELIMIT_CHAT_MESSAGE = os.environ.get('RATELIMIT_CHAT_MESSAGE', '10/10s,200/10s')
+    RATELIMIT_CHAT_JOIN = os.environ.get('RATELIMIT_CHAT_JOIN', '20/minute,300/minute')
+    RATELIMIT_MATCHES = os.environ.get('RATELIMIT_MATCHES', '30/minute,300/minute')
+    RATELIMIT_NEARBY = os.environ.get('RATELIMIT_NEARBY', '20/minute,200/minute')
+    RATELIMIT_LOCATION = os.environ.get('RATELIMIT_LOCATION', '10/minute,200/minute')
+    RATELIMIT_INTEREST = os.environ.get('RATELIMIT_INTEREST', '60/minute,600/minute')
+    QUICK_MESSAGE_MERGE_WINDOW = float(os.environ.get('QUICK_MESSAGE_MERGE_WINDOW', 2.0))
+    PROXY_COUNT = int(os.environ.get('PROXY_COUNT', 0))
     
-    # Rate Limiting
-    RATELIMIT_STORAGE_URL = "memory://"
+    # Métricas (/metrics) e log de consultas lentas
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
     
     @staticmethod
     def init_app(app):
@@ -39,7 +129,8 @@ class ProductionConfig(Config):
     TESTING = False
     
     # Security headers
-    SESSION_COOKIE_SECURE = True
+    # Desligue só atrás de proxy sem TLS (ex.: nginx do docker-compose de exemplo)
+    SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'true').lower() == 'true'
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
@@ -0,0 +1,70 @@
+"""Configuração do gunicorn: gunicorn -c deploy/gunicorn.conf.py wsgi:app
+
+Com ``preload_app`` o master importa e aquece a aplicação uma única vez e
+os workers nascem por fork (copy-on-write): um worker novo ou reiniciado
+fica pronto em milissegundos em vez de repetir todos os imports.
+
+Um worker eventlet por container é o padrão: o long-polling do Socket.IO
+precisa de sticky session, que o gunicorn não faz entre workers. Escale com
+mais containers ligados pela SOCKETIO_MESSAGE_QUEUE (deploy/docker-compose.yml).
+WEB_CONCURRENCY > 1 só serve com clientes só em websocket. O poller de jogos
+e o arquivo do chat rodam só no worker que pegar a trava BACKGROUND_LOCK_FILE
+(o substituto dele a pega se ele morrer); as demais tarefas são por worker.
+"""
+import fcntl
+import os
+import tempfile
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'eventlet')
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+timeout = 60
+graceful_timeout = 30
+background_lock_file = os.environ.get(
+    'BACKGROUND_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'esportesocial-background.lock'))
+
+# Com preload a aplicação é importada no master, antes do fork: os locks e
+# sockets criados nos imports já precisam ser os cooperativos do eventlet
+if preload_app and worker_class == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch(thread=True, os=False, select=False, socket=False, time=False)
+
+
+def pre_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from wsgi import app
+        from app import db
+
+        # Conexões abertas no master não podem ser compartilhadas entre processos
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+def hold_background_lock(worker):
+    """True se este worker ficou com a trava das tarefas únicas; o arquivo
+    fica aberto enquanto o worker viver e o sistema solta a trava quando ele sai"""
+    handle = open(background_lock_file, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    worker.background_lock = handle
+    return True
+
+
+def post_worker_init(worker):
+    from app import start_background_tasks
+
+    singletons = hold_background_lock(worker)
+    start_background_tasks(singletons=singletons)
+    if singletons:
+        worker.log.info('Worker %s roda o poller de jogos e o arquivo do chat', worker.pid)
+    worker.log.info('Worker %s pronto em %.0f ms', worker.pid,
+                    (time.monotonic() - worker.forked_at) * 1000)
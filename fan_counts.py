@@ -0,0 +1,228 @@
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from upserts import increment_statement, insert_ignore_statement
+
+# Interesse sem estabelecimento (ver o jogo em casa) conta com este id
+NO_ESTABLISHMENT = 0
+
+
+def fan_room(match_id):
+    """Sala Socket.IO com a contagem de torcedores de um jogo (id local)"""
+    return f'fans:match:{match_id}'
+
+
+def fan_key(match_id, establishment_id, supporting_team_id):
+    return match_id, establishment_id or NO_ESTABLISHMENT, supporting_team_id
+
+
+def interest_deltas(previous, current):
+    """Variação dos contadores quando os interesses de um torcedor mudam.
+
+    ``previous`` e ``current`` mapeiam match_id -> (establishment_id,
+    supporting_team_id). Trocar de time ou de bar tira 1 da chave antiga e
+    soma 1 na nova. Retorna {chave: delta} só com deltas diferentes de zero.
+    """
+    deltas = {}
+    for match_id, (establishment_id, team_id) in current.items():
+        key = fan_key(match_id, establishment_id, team_id)
+        old = previous.get(match_id)
+        old_key = fan_key(match_id, *old) if old is not None else None
+        if old_key == key:
+            continue
+        if old_key is not None:
+            deltas[old_key] = deltas.get(old_key, 0) - 1
+        deltas[key] = deltas.get(key, 0) + 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+class FanCounts:
+    """Torcedores por (jogo, estabelecimento, time), mantidos pela gravação.
+
+    ``claim_interests`` e ``apply`` rodam na transação que grava os
+    interesses: os contadores mudam junto com eles ou nada muda. Depois do commit,
+    ``changed`` marca os jogos e a cada ``interval`` segundos cada jogo
+    marcado recebe um ``fan_counts`` na sala ``room_for(match_id)``, um só
+    por jogo mesmo com muitas gravações no intervalo.
+    """
+
+    def __init__(self, db, count_model, interest_model, team_name, room_for, interval=1.0):
+        self.app = None
+        self.db = db
+        self.count_model = count_model
+        self.interest_model = interest_model
+        self.team_name = team_name
+        self.room_for = room_for
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._started = False
+        self.socketio = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config['FAN_COUNTS_PUSH_INTERVAL']
+
+    def start(self, socketio):
+        """Inicia o envio das contagens em segundo plano (só uma vez)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.socketio = socketio
+        socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    self.tick()
+            except Exception as e:
+                print(f"Erro ao enviar contagem de torcedores: {e}")
+
+    def claim_interests(self, rows):
+        """Estado anterior dos interesses que serão gravados, sem que duas
+        gravações simultâneas vejam o mesmo estado.
+
+        ``rows`` são as linhas do upsert ({match_id: linha}, ver
+        ``upserts.interest_rows``). Cada uma é inserida antes (ignorando a
+        que já existe), o que trava a chave até o commit (no SQLite, o banco);
+        só então as que já existiam são lidas com FOR UPDATE. Retorna
+        match_id -> (estabelecimento, time) dos jogos que já tinham interesse.
+        """
+        if not rows:
+            return {}
+
+        session = self.db.session
+        table = self.interest_model.__table__
+        dialect = session.get_bind().dialect.name
+        existing = []
+        # Sempre na mesma ordem, para transações concorrentes não se travarem
+        for match_id in sorted(rows):
+            stmt = insert_ignore_statement(dialect, table, [rows[match_id]], ['user_id', 'match_id'])
+            if stmt is not None:
+                inserted = session.execute(stmt).rowcount == 1
+            else:
+                try:
+                    with session.begin_nested():
+                        session.execute(table.insert().values(rows[match_id]))
+                    inserted = True
+                except IntegrityError:
+                    inserted = False
+            if not inserted:
+                existing.append(match_id)
+
+        if not existing:
+            return {}
+        Interest = self.interest_model
+        user_id = next(iter(rows.values()))['user_id']
+        locked = session.query(
+            Interest.match_id, Interest.establishment_id, Interest.supporting_team_id
+        ).filter(Interest.user_id == user_id, Interest.match_id.in_(existing)).with_for_update()
+        return {match_id: (establishment_id, team_id) for match_id, establishment_id, team_id in locked}
+
+    def apply(self, deltas):
+        """Soma os deltas nos contadores (sem commit)"""
+        if not deltas:
+            return
+
+        table = self.count_model.__table__
+        # Sempre na mesma ordem, para transações concorrentes não se travarem
+        values = [
+            {'match_id': match_id, 'establishment_id': establishment_id,
+             'supporting_team_id': team_id, 'fans': delta}
+            for (match_id, establishment_id, team_id), delta in sorted(deltas.items())
+        ]
+        key_columns = ['match_id', 'establishment_id', 'supporting_team_id']
+        stmt = increment_statement(self.db.session.get_bind().dialect.name, table, values, key_columns, 'fans')
+
+        if stmt is not None:
+            self.db.session.execute(stmt)
+            return
+
+        for row in values:
+            where = [table.c[column] == row[column] for column in key_columns]
+            updated = self.db.session.execute(
+                table.update().where(*where).values(fans=table.c.fans + row['fans'])
+            ).rowcount
+            if not updated:
+                self.db.session.execute(table.insert().values(row))
+
+    def changed(self, match_ids):
+        """Jogos com contagem nova, enviados no próximo ``tick``"""
+        with self._lock:
+            self._dirty.update(match_ids)
+
+    def tick(self):
+        with self._lock:
+            match_ids, self._dirty = self._dirty, set()
+        if not match_ids:
+            return
+
+        for summary in self.summaries(match_ids).values():
+            self.socketio.emit('fan_counts', summary, to=self.room_for(summary['match_id']))
+
+    def summaries(self, match_ids, establishment_id=None):
+        """{match_id: resumo} com total, divisão por time e por estabelecimento"""
+        Count = self.count_model
+        query = self.db.session.query(
+            Count.match_id, Count.establishment_id, Count.supporting_team_id, Count.fans
+        ).filter(Count.match_id.in_(list(match_ids)), Count.fans > 0)
+        if establishment_id is not None:
+            query = query.filter(Count.establishment_id == establishment_id)
+
+        summaries = {match_id: {'match_id': match_id, 'total': 0, 'teams': {}, 'establishments': {}}
+                     for match_id in match_ids}
+        for match_id, place_id, team_id, fans in query:
+            summary = summaries[match_id]
+            team = self.team_name(team_id) or str(team_id)
+            summary['total'] += fans
+            summary['teams'][team] = summary['teams'].get(team, 0) + fans
+            if place_id != NO_ESTABLISHMENT:
+                place = summary['establishments'].setdefault(
+                    place_id, {'establishment_id': place_id, 'total': 0, 'teams': {}})
+                place['total'] += fans
+                place['teams'][team] = place['teams'].get(team, 0) + fans
+
+        for summary in summaries.values():
+            summary['establishments'] = sorted(summary['establishments'].values(),
+                                               key=lambda place: -place['total'])
+        return summaries
+
+    def drift(self):
+        """Diferenças entre os contadores e um GROUP BY nos interesses:
+        {chave: (gravado, recalculado)}"""
+        Interest, Count = self.interest_model, self.count_model
+
+        actual = {}
+        for match_id, establishment_id, team_id, fans in self.db.session.query(
+            Interest.match_id, Interest.establishment_id, Interest.supporting_team_id, func.count()
+        ).group_by(Interest.match_id, Interest.establishment_id, Interest.supporting_team_id):
+            key = fan_key(match_id, establishment_id, team_id)
+            actual[key] = actual.get(key, 0) + fans
+
+        stored = {
+            (match_id, establishment_id, team_id): fans
+            for match_id, establishment_id, team_id, fans in self.db.session.query(
+                Count.match_id, Count.establishment_id, Count.supporting_team_id, Count.fans)
+        }
+
+        return {
+            key: (stored.get(key, 0), actual.get(key, 0))
+            for key in set(stored) | set(actual)
+            if stored.get(key, 0) != actual.get(key, 0)
+        }
+
+    def rebuild(self):
+        """Corrige a diferença encontrada por ``drift`` somando o que falta em
+        cada chave (não sobrescreve gravações concorrentes); faz commit e
+        retorna a diferença corrigida"""
+        drift = self.drift()
+        self.apply({key: actual - stored for key, (stored, actual) in drift.items()})
+        self.db.session.commit()
+        self.changed({match_id for match_id, _, _ in drift})
+        return drift
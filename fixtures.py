@@ -0,0 +1,337 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam
+
+from upserts import upsert_statement
+from upstream import get_client
+
+API_FUTEBOL_URL = 'https://api.api-futebol.com.br/v1'
+
+# Colunas atualizadas quando um jogo já existe no banco
+MATCH_UPDATE_COLUMNS = ('status', 'home_score', 'away_score')
+
+# Status da API-Futebol (e equivalentes) que indicam jogo em andamento
+LIVE_STATUSES = {'andamento', 'live', '1H', '2H', 'HT', 'ET', 'P'}
+
+# Status de jogo encerrado
+FINISHED_STATUSES = {'finalizado', 'finished', 'FT'}
+
+
+def parse_api_match(match):
+    """Converte um jogo da API-Futebol para o formato usado pela aplicação
+    (os times ainda com o nome e o id da API; ver ``FixturePoller.resolve_teams``)"""
+    match_datetime = datetime.strptime(match['data_realizacao'], '%Y-%m-%d %H:%M:%S')
+
+    return {
+        'id': match['jogo_id'],
+        'home_team': match['time_mandante']['nome_popular'],
+        'home_team_api_id': match['time_mandante']['time_id'],
+        'away_team': match['time_visitante']['nome_popular'],
+        'away_team_api_id': match['time_visitante']['time_id'],
+        'date': match_datetime,
+        'status': match['status'],
+        'home_score': match.get('placar_mandante', 0),
+        'away_score': match.get('placar_visitante', 0),
+        'round': match.get('rodada', 1)
+    }
+
+
+def match_to_dict(match):
+    """Serializa um Match do banco no mesmo formato do snapshot"""
+    return {
+        'id': match.api_match_id,
+        'home_team': match.home_team,
+        'home_team_id': match.home_team_id,
+        'away_team': match.away_team,
+        'away_team_id': match.away_team_id,
+        'date': match.match_date.isoformat(),
+        'status': match.status,
+        'home_score': match.home_score,
+        'away_score': match.away_score,
+        'round': match.round_number
+    }
+
+
+def _match_values(row):
+    return {
+        'api_match_id': row['id'],
+        'home_team_id': row['home_team_id'],
+        'away_team_id': row['away_team_id'],
+        'match_date': row['date'],
+        'status': row['status'],
+        'home_score': row['home_score'],
+        'away_score': row['away_score'],
+        'round_number': row['round']
+    }
+
+
+def upsert_matches(db, match_model, rows, chunk_size=500):
+    """Grava um lote de jogos com uma leitura e um upsert em massa.
+
+    Os ``api_match_id`` já existentes são carregados numa única consulta e
+    só os jogos novos ou alterados vão para o upsert. Retorna a contagem de
+    linhas inseridas, atualizadas e inalteradas.
+    """
+    Match = match_model
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    # A API pode repetir jogos; vale a última versão
+    rows = list({row['id']: row for row in rows}.values())
+    if not rows:
+        return counts
+
+    existing = {
+        api_match_id: (status, home_score, away_score)
+        for api_match_id, status, home_score, away_score in db.session.query(
+            Match.api_match_id, Match.status, Match.home_score, Match.away_score
+        ).filter(Match.api_match_id.in_([row['id'] for row in rows]))
+    }
+
+    pending = []
+    for row in rows:
+        values = _match_values(row)
+        current = existing.get(row['id'])
+        if current is None:
+            counts['inserted'] += 1
+        elif current != tuple(values[column] for column in MATCH_UPDATE_COLUMNS):
+            counts['updated'] += 1
+        else:
+            counts['unchanged'] += 1
+            continue
+        pending.append(values)
+
+    if not pending:
+        return counts
+
+    table = Match.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    # SQLite limita o número de parâmetros por statement
+    if dialect == 'sqlite':
+        chunk_size = min(chunk_size, 999 // len(table.columns))
+
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        stmt = upsert_statement(dialect, table, chunk, ['api_match_id'], MATCH_UPDATE_COLUMNS)
+
+        if stmt is not None:
+            db.session.execute(stmt)
+        else:
+            db.session.bulk_insert_mappings(
+                Match, [values for values in chunk if values['api_match_id'] not in existing]
+            )
+            updates = [values for values in chunk if values['api_match_id'] in existing]
+            if updates:
+                db.session.execute(
+                    table.update()
+                    .where(table.c.api_match_id == bindparam('b_api_match_id'))
+                    .values({column: bindparam(f'b_{column}') for column in MATCH_UPDATE_COLUMNS}),
+                    [
+                        {f'b_{column}': values[column] for column in ('api_match_id',) + MATCH_UPDATE_COLUMNS}
+                        for values in updates
+                    ]
+                )
+
+    db.session.commit()
+    return counts
+
+
+class FixturePoller:
+    """Atualiza os jogos do dia em segundo plano e mantém um snapshot em memória.
+
+    O intervalo de atualização cai para ``live_interval`` enquanto houver
+    jogos em andamento. A edição atual do campeonato fica em cache por
+    ``edition_ttl`` segundos para não gastar cota da API. Os times da API
+    são trocados pelos do registro ``teams`` (id e nome canônico).
+    """
+
+    def __init__(self, db, match_model, teams, api_key, championship_id,
+                 interval=300, live_interval=30, edition_ttl=3600, timeout=10, http=None,
+                 base_url=API_FUTEBOL_URL):
+        self.app = None
+        self.base_url = base_url.rstrip('/')
+        self.http = http or get_client()
+        self.db = db
+        self.match_model = match_model
+        self.teams = teams
+        self.api_key = api_key
+        self.championship_id = championship_id
+        self.interval = interval
+        self.live_interval = live_interval
+        self.edition_ttl = edition_ttl
+        self.timeout = timeout
+        # Com vários workers, só um deve rodar o poller (os demais leem do banco)
+        self.enabled = True
+
+        self._lock = threading.Lock()
+        self._started = False
+        self._socketio = None
+        self._edition_id = None
+        self._edition_expires = 0
+        self._snapshot = []
+        self._snapshot_date = None
+        self._updated_at = None
+        self._changed_at = None
+        self.last_error = None
+        self.last_counts = None
+        self._listeners = []
+
+    def init_app(self, app):
+        """Aplicação usada para abrir o contexto nos ciclos em segundo plano;
+        chave, URL e intervalos vêm de API_FUTEBOL_* e FIXTURE_* na config"""
+        self.app = app
+        self.enabled = app.config['FIXTURE_POLLER_ENABLED']
+        self.api_key = app.config['API_FUTEBOL_KEY']
+        self.base_url = app.config['API_FUTEBOL_URL'].rstrip('/')
+        self.interval = app.config['FIXTURE_POLL_INTERVAL']
+        self.live_interval = app.config['FIXTURE_LIVE_POLL_INTERVAL']
+        self.edition_ttl = app.config['EDITION_CACHE_TTL']
+
+    @property
+    def headers(self):
+        return {'Authorization': f'Bearer {self.api_key}'}
+
+    def add_listener(self, callback):
+        """Registra uma função chamada com os jogos de cada ciclo"""
+        self._listeners.append(callback)
+
+    def start(self, socketio):
+        """Inicia o worker de ingestão (idempotente)"""
+        if not self.api_key:
+            return False
+
+        with self._lock:
+            if self._started:
+                return True
+            self._started = True
+
+        self._socketio = socketio
+        socketio.start_background_task(self._run)
+        return True
+
+    def _run(self):
+        while True:
+            has_live = False
+            try:
+                has_live = self.refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error refreshing fixtures: {e}")
+
+            self._socketio.sleep(self.live_interval if has_live else self.interval)
+
+    def current_edition(self):
+        """Retorna o id da edição atual, consultando a API só quando o cache expira"""
+        now = time.time()
+        if self._edition_id is not None and now < self._edition_expires:
+            return self._edition_id
+
+        url = f"{self.base_url}/campeonatos/{self.championship_id}"
+        championship_data = self.http.get_json(url, headers=self.headers, timeout=self.timeout,
+                                               endpoint='api_futebol.campeonato')
+
+        if 'edicao_atual' not in championship_data:
+            raise LookupError('Campeonato não encontrado')
+
+        self._edition_id = championship_data['edicao_atual']['edicao_id']
+        self._edition_expires = now + self.edition_ttl
+        return self._edition_id
+
+    def fetch_matches(self, day=None):
+        """Busca os jogos de um dia na API-Futebol"""
+        day = day or datetime.now()
+        edition_id = self.current_edition()
+
+        url = f"{self.base_url}/campeonatos/{self.championship_id}/fases/{edition_id}/jogos"
+        params = {'data': day.strftime('%Y-%m-%d')}
+        matches = self.http.get_json(url, headers=self.headers, params=params, timeout=self.timeout,
+                                     endpoint='api_futebol.jogos')
+        return [parse_api_match(match) for match in matches]
+
+    def refresh(self):
+        """Busca os jogos do dia, grava no banco e troca o snapshot.
+
+        Retorna True se algum jogo estiver em andamento.
+        """
+        today = datetime.now().date()
+        rows = self.fetch_matches()
+
+        with self.app.app_context():
+            rows = self.resolve_teams(rows)
+            self.save_matches(rows)
+
+        snapshot = [dict(row, date=row['date'].isoformat()) for row in rows]
+        with self._lock:
+            if snapshot != self._snapshot or self._snapshot_date != today:
+                self._changed_at = datetime.utcnow()
+            self._snapshot = snapshot
+            self._snapshot_date = today
+            self._updated_at = datetime.utcnow()
+
+        for callback in self._listeners:
+            callback(snapshot)
+
+        return any(row['status'] in LIVE_STATUSES for row in rows)
+
+    def resolve_teams(self, rows):
+        """Troca nome e id da API de cada time pelo id e nome do registro,
+        cadastrando os times que ainda não existem"""
+        api_teams = {}
+        for row in rows:
+            api_teams[row['home_team_api_id']] = row['home_team']
+            api_teams[row['away_team_api_id']] = row['away_team']
+        known = self.teams.ensure(api_teams)
+
+        resolved = []
+        for row in rows:
+            home, away = known[row['home_team_api_id']], known[row['away_team_api_id']]
+            values = {key: value for key, value in row.items()
+                      if key not in ('home_team_api_id', 'away_team_api_id')}
+            values.update(home_team=home.name, home_team_id=home.id,
+                          away_team=away.name, away_team_id=away.id)
+            resolved.append(values)
+        return resolved
+
+    def save_matches(self, rows):
+        """Insere ou atualiza os jogos na tabela Match"""
+        self.last_counts = upsert_matches(self.db, self.match_model, rows)
+        return self.last_counts
+
+    def backfill(self):
+        """Carrega todos os jogos da edição atual (temporada inteira)"""
+        edition_id = self.current_edition()
+
+        url = f"{self.base_url}/campeonatos/{self.championship_id}/fases/{edition_id}/jogos"
+        matches = self.http.get_json(url, headers=self.headers, timeout=self.timeout,
+                                     endpoint='api_futebol.jogos')
+        rows = [parse_api_match(match) for match in matches]
+
+        with self.app.app_context():
+            return self.save_matches(self.resolve_teams(rows))
+
+    def snapshot(self):
+        """Retorna (jogos, updated_at) do último ciclo de hoje, ou ([], None)"""
+        with self._lock:
+            if self._snapshot_date != datetime.now().date():
+                return [], None
+            return list(self._snapshot), self._updated_at
+
+    def last_changed(self):
+        """Quando os jogos de hoje mudaram pela última vez (placar, status...), ou None"""
+        with self._lock:
+            if self._snapshot_date != datetime.now().date():
+                return None
+            return self._changed_at
+
+    def matches_from_db(self, day=None):
+        """Lê os jogos de um dia direto da tabela Match"""
+        Match = self.match_model
+        start = datetime.combine(day or datetime.now().date(), datetime.min.time())
+        end = start + timedelta(days=1)
+
+        matches = Match.query.filter(Match.match_date >= start, Match.match_date < end)\
+            .order_by(Match.match_date).all()
+        return [match_to_dict(match) for match in matches]
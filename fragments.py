@@ -0,0 +1,74 @@
+import hashlib
+import logging
+import os
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.exceptions import TemplateNotFound
+from jinja2.ext import Extension
+
+logger = logging.getLogger(__name__)
+
+
+class FragmentCache(Extension):
+    """``{% cache 'nome', valor, ... %}...{% endcache %}`` guarda o HTML do trecho.
+
+    A chave é (template, nome, valores, idioma): os valores são o que faz o
+    trecho variar (ex.: ``team_colors``) e nunca devem incluir dados do
+    usuário. O hash do fonte do template também entra na chave, então um
+    deploy que muda o template usa chaves novas sem limpar nada. O HTML fica
+    no ``TTLCache`` em ``environment.fragment_cache`` (None renderiza sempre).
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, fragment_locale=lambda: None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        values = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            values.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+
+        prefix = f'{parser.name}@{self._source_hash(parser.name)}'
+        call = self.call_method('_render', [nodes.Const(prefix), nodes.List(values)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _source_hash(self, name):
+        if name is None or self.environment.loader is None:
+            return ''
+        try:
+            source = self.environment.loader.get_source(self.environment, name)[0]
+        except TemplateNotFound:
+            return ''
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+
+    def _render(self, prefix, values, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = f'{prefix}:{self.environment.fragment_locale()}:{values!r}'
+        return cache.get_or_set(key, caller)
+
+
+def init_template_caches(app, cache):
+    """Liga nos templates da aplicação o cache de bytecode em disco e o de
+    fragmentos; precisa rodar antes do primeiro uso de ``app.jinja_env``"""
+    options = dict(app.jinja_options)
+    options['extensions'] = [*options.get('extensions', ()), FragmentCache]
+
+    # O Jinja confere o checksum do fonte: template alterado no deploy é
+    # recompilado e o arquivo antigo substituído
+    directory = app.config['JINJA_BYTECODE_CACHE_DIR'] or os.path.join(app.instance_path, 'jinja_bytecode')
+    try:
+        os.makedirs(directory, exist_ok=True)
+        options['bytecode_cache'] = FileSystemBytecodeCache(directory)
+    except OSError as e:
+        logger.warning('Cache de bytecode dos templates desligado: %s', e)
+
+    app.jinja_options = options
+    cache.default_ttl = app.config['FRAGMENT_CACHE_TTL']
+    app.jinja_env.fragment_cache = cache if app.config['FRAGMENT_CACHE_ENABLED'] else None
+    app.jinja_env.fragment_locale = lambda: app.config['TEMPLATE_LOCALE']
@@ -0,0 +1,95 @@
+import math
+import threading
+import time
+
+from utils import calculate_distance
+
+KM_PER_DEGREE = 111.32
+
+
+class EstablishmentIndex:
+    """Índice espacial em grade dos estabelecimentos cadastrados.
+
+    Cada estabelecimento fica numa célula de ``cell_km`` x ``cell_km``; uma
+    busca por raio só visita as células que cobrem o raio e calcula a
+    distância (haversine) apenas dos estabelecimentos nelas.
+    """
+
+    def __init__(self, cell_km=1.0):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self._cells = {}
+        self._items = {}
+        self._lock = threading.Lock()
+        self.loaded_at = None
+
+    def _cell(self, latitude, longitude):
+        return (math.floor(latitude / self.cell_deg), math.floor(longitude / self.cell_deg))
+
+    def _covering_cells(self, latitude, longitude, radius_km):
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+        min_lat, min_lon = self._cell(latitude - lat_span, longitude - lon_span)
+        max_lat, max_lon = self._cell(latitude + lat_span, longitude + lon_span)
+
+        for cell_lat in range(min_lat, max_lat + 1):
+            for cell_lon in range(min_lon, max_lon + 1):
+                yield (cell_lat, cell_lon)
+
+    def load(self, establishments):
+        """Recria o índice a partir de (id, nome, latitude, longitude)"""
+        with self._lock:
+            self._cells.clear()
+            self._items.clear()
+            for establishment_id, name, latitude, longitude in establishments:
+                self._add(establishment_id, name, latitude, longitude)
+            self.loaded_at = time.time()
+
+    def is_stale(self, ttl):
+        """Indica se o índice nunca foi carregado ou passou de ``ttl`` segundos"""
+        return self.loaded_at is None or time.time() - self.loaded_at > ttl
+
+    def _add(self, establishment_id, name, latitude, longitude):
+        cell = self._cell(latitude, longitude)
+        self._items[establishment_id] = (cell, name, latitude, longitude)
+        self._cells.setdefault(cell, set()).add(establishment_id)
+
+    def _discard(self, establishment_id):
+        item = self._items.pop(establishment_id, None)
+        if item is not None:
+            members = self._cells[item[0]]
+            members.discard(establishment_id)
+            if not members:
+                del self._cells[item[0]]
+
+    def upsert(self, establishment_id, name, latitude, longitude):
+        """Adiciona ou move um estabelecimento"""
+        with self._lock:
+            self._discard(establishment_id)
+            self._add(establishment_id, name, latitude, longitude)
+
+    def remove(self, establishment_id):
+        with self._lock:
+            self._discard(establishment_id)
+
+    def nearby(self, latitude, longitude, radius_km):
+        """Estabelecimentos dentro do raio, do mais próximo para o mais distante"""
+        with self._lock:
+            candidates = [
+                (establishment_id, self._items[establishment_id])
+                for cell in self._covering_cells(latitude, longitude, radius_km)
+                for establishment_id in self._cells.get(cell, ())
+            ]
+
+        results = []
+        for establishment_id, (_, name, item_lat, item_lon) in candidates:
+            distance = calculate_distance(latitude, longitude, item_lat, item_lon)
+            if distance <= radius_km:
+                results.append({
+                    'id': establishment_id,
+                    'name': name,
+                    'distance_km': round(distance, 2)
+                })
+
+        results.sort(key=lambda item: item['distance_km'])
+        return results
@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Tipos que valem a pena comprimir (imagens e fontes já vêm comprimidas)
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/html', 'text/css', 'text/plain', 'image/svg+xml'
+}
+
+
+def accepted_encoding(accept_encodings):
+    """Melhor codificação aceita pelo cliente: br (se instalado), gzip ou None"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def finalize_response(response, request, min_size=500, level=6):
+    """Responde 304 a GETs condicionais e comprime o corpo quando compensa.
+
+    O ETag de uma resposta comprimida ganha o sufixo da codificação
+    (``"abc-gzip"``): cada representação tem o seu ETag forte, e o cliente
+    que recebeu a versão gzip revalida com o mesmo valor.
+    """
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+
+    encoding = None
+    if (response.mimetype in COMPRESSIBLE_TYPES and 'Content-Encoding' not in response.headers
+            and not response.is_streamed and not response.cache_control.no_transform):
+        length = response.calculate_content_length()
+        if length is not None and length >= min_size:
+            response.vary.add('Accept-Encoding')
+            encoding = accepted_encoding(request.accept_encodings)
+
+    etag, weak = response.get_etag()
+    if encoding and etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+
+    if etag or response.last_modified:
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if encoding:
+        response.direct_passthrough = False
+        response.set_data(_compress(response.get_data(), encoding, level))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class StaticFingerprints:
+    """Hash do conteúdo de cada arquivo estático, para URLs ``?v=<hash>``.
+
+    O hash é recalculado só quando o mtime do arquivo muda, então uma URL
+    com ``v`` pode ser guardada pelo navegador para sempre (``immutable``).
+    """
+
+    def __init__(self, length=12):
+        self.length = length
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def get(self, static_folder, filename):
+        path = os.path.join(static_folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:self.length]
+        with self._lock:
+            self._hashes[path] = (mtime, digest)
+        return digest
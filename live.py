@@ -0,0 +1,69 @@
+import threading
+
+
+def match_room(match_id):
+    """Sala Socket.IO com as atualizações de um jogo"""
+    return f'live:match:{match_id}'
+
+
+def team_room(team_name):
+    """Sala Socket.IO com as atualizações dos jogos de um time"""
+    return f'live:team:{team_name}'
+
+
+def parse_live_room(room):
+    """``('match', id)`` ou ``('team', nome)`` de uma sala ``live:``; None se
+    não for uma sala ao vivo bem formada"""
+    kind, _, value = room.partition(':')[2].partition(':')
+    if not room.startswith('live:') or not value:
+        return None
+    if kind == 'match':
+        return ('match', int(value)) if value.isdigit() else None
+    if kind == 'team':
+        return 'team', value
+    return None
+
+
+class LiveMatchTracker:
+    """Guarda o último placar/status de cada jogo e emite só o que mudou.
+
+    Cada ciclo do FixturePoller chama ``publish`` com os jogos recebidos da
+    API; os que mudaram desde o ciclo anterior geram um ``match_update`` para
+    a sala do jogo e para as salas dos dois times.
+    """
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self._lock = threading.Lock()
+        self._state = {}
+
+    @staticmethod
+    def _key(row):
+        return (row['home_score'], row['away_score'], row['status'])
+
+    def diff(self, rows):
+        """Atualiza o estado conhecido e retorna os jogos que mudaram"""
+        changed = []
+        with self._lock:
+            for row in rows:
+                state = self._key(row)
+                if self._state.get(row['id']) != state:
+                    self._state[row['id']] = state
+                    changed.append(row)
+        return changed
+
+    def publish(self, rows):
+        """Emite ``match_update`` para os jogos alterados"""
+        changed = self.diff(rows)
+
+        for row in changed:
+            self.socketio.emit('match_update', {
+                'match_id': row['id'],
+                'home_team': row['home_team'],
+                'away_team': row['away_team'],
+                'home_score': row['home_score'],
+                'away_score': row['away_score'],
+                'status': row['status']
+            }, to=[match_room(row['id']), team_room(row['home_team']), team_room(row['away_team'])])
+
+        return len(changed)
@@ -0,0 +1,28 @@
+"""chat message keyset index
+
+Revision ID: 4d27e8e34185
+Revises: e3a482b70806
+Create Date: 2026-10-18 17:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d27e8e34185'
+down_revision = 'e3a482b70806'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Paginação por cursor ordena e filtra por (timestamp, id) dentro da sala
+    op.create_index('ix_chat_message_room_timestamp_id', 'chat_message',
+                    ['room_id', 'timestamp', 'id'], unique=False)
+    op.drop_index('ix_chat_message_room_timestamp', table_name='chat_message')
+
+
+def downgrade():
+    op.create_index('ix_chat_message_room_timestamp', 'chat_message', ['room_id', 'timestamp'], unique=False)
+    op.drop_index('ix_chat_message_room_timestamp_id', table_name='chat_message')
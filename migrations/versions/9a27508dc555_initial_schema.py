@@ -0,0 +1,86 @@
+"""initial schema
+
+Revision ID: 9a27508dc555
+Revises: 
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a27508dc555'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados antes das migrações (db.create_all) já têm as tabelas
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing:
+        op.create_table('user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.String(length=120), nullable=False),
+            sa.Column('user_type', sa.String(length=20), nullable=False),
+            sa.Column('favorite_team', sa.String(length=50), nullable=True),
+            sa.Column('latitude', sa.Float(), nullable=True),
+            sa.Column('longitude', sa.Float(), nullable=True),
+            sa.Column('establishment_name', sa.String(length=100), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'match' not in existing:
+        op.create_table('match',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('api_match_id', sa.Integer(), nullable=True),
+            sa.Column('home_team', sa.String(length=50), nullable=False),
+            sa.Column('away_team', sa.String(length=50), nullable=False),
+            sa.Column('match_date', sa.DateTime(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('home_score', sa.Integer(), nullable=True),
+            sa.Column('away_score', sa.Integer(), nullable=True),
+            sa.Column('round_number', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('api_match_id')
+        )
+
+    if 'chat_message' not in existing:
+        op.create_table('chat_message',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('room_id', sa.String(length=100), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('message_type', sa.String(length=20), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'user_match_interest' not in existing:
+        op.create_table('user_match_interest',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('match_id', sa.Integer(), nullable=False),
+            sa.Column('supporting_team', sa.String(length=50), nullable=False),
+            sa.Column('ranking', sa.Integer(), nullable=True),
+            sa.Column('establishment_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['establishment_id'], ['user.id'], ),
+            sa.ForeignKeyConstraint(['match_id'], ['match.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('user_match_interest')
+    op.drop_table('chat_message')
+    op.drop_table('match')
+    op.drop_table('user')
@@ -0,0 +1,29 @@
+"""widen password hash
+
+Revision ID: b6f1c2d9a7e3
+Revises: 4d27e8e34185
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f1c2d9a7e3'
+down_revision = '4d27e8e34185'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Hashes scrypt do Werkzeug passam de 160 caracteres
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=120),
+                              type_=sa.String(length=255), existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=255),
+                              type_=sa.String(length=120), existing_nullable=False)
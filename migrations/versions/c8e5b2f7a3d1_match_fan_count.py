@@ -0,0 +1,46 @@
+"""match fan count
+
+Revision ID: c8e5b2f7a3d1
+Revises: f2c7a9d4e1b8
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e5b2f7a3d1'
+down_revision = 'f2c7a9d4e1b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('match_fan_count',
+        sa.Column('match_id', sa.Integer(), nullable=False),
+        sa.Column('establishment_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('supporting_team_id', sa.Integer(), nullable=False),
+        sa.Column('fans', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['match_id'], ['match.id'], name='fk_match_fan_count_match_id_match'),
+        sa.ForeignKeyConstraint(['supporting_team_id'], ['team.id'],
+                                name='fk_match_fan_count_supporting_team_id_team'),
+        sa.PrimaryKeyConstraint('match_id', 'establishment_id', 'supporting_team_id')
+    )
+
+    # Contagem inicial a partir dos interesses já gravados (0 = em casa)
+    interest = sa.table('user_match_interest', sa.column('match_id', sa.Integer),
+                        sa.column('establishment_id', sa.Integer), sa.column('supporting_team_id', sa.Integer))
+    fan_count = sa.table('match_fan_count', sa.column('match_id', sa.Integer),
+                         sa.column('establishment_id', sa.Integer), sa.column('supporting_team_id', sa.Integer),
+                         sa.column('fans', sa.Integer))
+    establishment_id = sa.func.coalesce(interest.c.establishment_id, 0)
+    op.execute(fan_count.insert().from_select(
+        ['match_id', 'establishment_id', 'supporting_team_id', 'fans'],
+        sa.select(interest.c.match_id, establishment_id, interest.c.supporting_team_id, sa.func.count())
+        .group_by(interest.c.match_id, establishment_id, interest.c.supporting_team_id)
+    ))
+
+
+def downgrade():
+    op.drop_table('match_fan_count')
@@ -0,0 +1,40 @@
+"""hot path indexes
+
+Revision ID: e3a482b70806
+Revises: 9a27508dc555
+Create Date: 2026-10-18 16:35:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a482b70806'
+down_revision = '9a27508dc555'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_match_match_date', 'match', ['match_date'], unique=False)
+    op.create_index('ix_chat_message_room_timestamp', 'chat_message', ['room_id', 'timestamp'], unique=False)
+
+    # Interesses duplicados (cliques concorrentes) impediriam a chave única;
+    # fica o mais recente de cada par (user_id, match_id)
+    op.execute(
+        'DELETE FROM user_match_interest WHERE id NOT IN ('
+        'SELECT id FROM (SELECT MAX(id) AS id FROM user_match_interest '
+        'GROUP BY user_id, match_id) AS latest)'
+    )
+
+    with op.batch_alter_table('user_match_interest', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_user_match_interest_user_match', ['user_id', 'match_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('user_match_interest', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_user_match_interest_user_match', type_='unique')
+
+    op.drop_index('ix_chat_message_room_timestamp', table_name='chat_message')
+    op.drop_index('ix_match_match_date', table_name='match')
@@ -0,0 +1,182 @@
+"""team table
+
+Revision ID: f2c7a9d4e1b8
+Revises: b6f1c2d9a7e3
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7a9d4e1b8'
+down_revision = 'b6f1c2d9a7e3'
+branch_labels = None
+depends_on = None
+
+# (nome, cor primária, cor secundária, apelidos)
+TEAMS = [
+    ('Flamengo', '#E60026', '#000000', []),
+    ('Corinthians', '#000000', '#FFFFFF', []),
+    ('Palmeiras', '#006B3F', '#FFFFFF', []),
+    ('São Paulo', '#FF0000', '#000000', ['Sao Paulo']),
+    ('Santos', '#000000', '#FFFFFF', []),
+    ('Vasco', '#000000', '#FFFFFF', ['Vasco da Gama']),
+    ('Botafogo', '#000000', '#FFFFFF', []),
+    ('Fluminense', '#7F0000', '#FFFFFF', []),
+    ('Grêmio', '#0080FF', '#000000', ['Gremio']),
+    ('Internacional', '#FF0000', '#FFFFFF', []),
+    ('Atlético-MG', '#000000', '#FFFFFF', ['Atletico-MG', 'Atlético Mineiro', 'Atletico Mineiro']),
+    ('Cruzeiro', '#0080FF', '#FFFFFF', []),
+    ('Bahia', '#0080FF', '#FF0000', []),
+    ('Sport', '#FF0000', '#000000', ['Sport Recife']),
+    ('Ceará', '#000000', '#FFFFFF', ['Ceara']),
+    ('Fortaleza', '#FF0000', '#0080FF', []),
+    ('Athletico-PR', '#FF0000', '#000000', ['Atletico-PR', 'Athletico Paranaense', 'Atletico Paranaense']),
+    ('Coritiba', '#00FF00', '#FFFFFF', []),
+    ('Bragantino', '#FF0000', '#FFFFFF', ['Red Bull Bragantino', 'RB Bragantino']),
+    ('Cuiabá', '#FFD700', '#00FF00', ['Cuiaba']),
+    ('Atlético-GO', '#FF0000', '#000000', ['Atletico-GO', 'Atlético Goianiense', 'Atletico Goianiense']),
+    ('Vitória', '#FF0000', '#000000', ['Vitoria']),
+    ('Criciúma', '#FFD700', '#000000', ['Criciuma']),
+    ('Juventude', '#00FF00', '#FFFFFF', []),
+]
+
+# (tabela, coluna com o nome, nova coluna com o id)
+TEAM_COLUMNS = [
+    ('user', 'favorite_team', 'favorite_team_id'),
+    ('match', 'home_team', 'home_team_id'),
+    ('match', 'away_team', 'away_team_id'),
+    ('user_match_interest', 'supporting_team', 'supporting_team_id'),
+]
+
+team = sa.table('team',
+    sa.column('id', sa.Integer), sa.column('name', sa.String),
+    sa.column('primary_color', sa.String), sa.column('secondary_color', sa.String),
+    sa.column('aliases', sa.String)
+)
+match = sa.table('match', sa.column('id', sa.Integer),
+                 sa.column('home_team_id', sa.Integer), sa.column('away_team_id', sa.Integer))
+
+
+def _key(name):
+    # Mesma normalização de teams.alias_key
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().replace('-', ' ').split())
+
+
+def _legacy_table(table_name, *columns):
+    return sa.table(table_name, sa.column('id', sa.Integer), *[sa.column(c) for c in columns])
+
+
+def upgrade():
+    op.create_table('team',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('api_team_id', sa.Integer(), nullable=True),
+        sa.Column('primary_color', sa.String(length=7), nullable=False),
+        sa.Column('secondary_color', sa.String(length=7), nullable=False),
+        sa.Column('aliases', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+        sa.UniqueConstraint('api_team_id')
+    )
+    op.bulk_insert(team, [
+        {'name': name, 'primary_color': primary, 'secondary_color': secondary,
+         'aliases': ','.join(aliases) or None}
+        for name, primary, secondary, aliases in TEAMS
+    ])
+
+    bind = op.get_bind()
+    ids = {}
+    for team_id, name, aliases in bind.execute(sa.select(team.c.id, team.c.name, team.c.aliases)):
+        for alias in [name] + (aliases.split(',') if aliases else []):
+            ids.setdefault(_key(alias), team_id)
+
+    # Nomes já gravados que não são de nenhum time do seed viram times novos.
+    # "mandante"/"visitante" em supporting_team apontam para o time do jogo.
+    for table_name, column, _ in TEAM_COLUMNS:
+        legacy = _legacy_table(table_name, column)
+        for (name,) in bind.execute(sa.select(legacy.c[column]).where(legacy.c[column].isnot(None)).distinct()):
+            if column == 'supporting_team' and name in ('mandante', 'visitante'):
+                continue
+            if name.strip() and _key(name) not in ids:
+                bind.execute(team.insert().values(name=name.strip()[:50], primary_color='#007BFF',
+                                                  secondary_color='#FFFFFF'))
+                ids[_key(name)] = bind.execute(
+                    sa.select(team.c.id).where(team.c.name == name.strip()[:50])).scalar()
+
+    for table_name, column, id_column in TEAM_COLUMNS:
+        op.add_column(table_name, sa.Column(id_column, sa.Integer(), nullable=True))
+
+    for table_name, column, id_column in TEAM_COLUMNS:
+        legacy = _legacy_table(table_name, column, id_column)
+        names = [name for (name,) in bind.execute(
+            sa.select(legacy.c[column]).where(legacy.c[column].isnot(None)).distinct())]
+        for name in names:
+            team_id = ids.get(_key(name)) if name.strip() else None
+            if team_id is not None:
+                bind.execute(legacy.update().where(legacy.c[column] == name).values({id_column: team_id}))
+
+    interest = _legacy_table('user_match_interest', 'match_id', 'supporting_team', 'supporting_team_id')
+    for side, id_column in (('mandante', 'home_team_id'), ('visitante', 'away_team_id')):
+        bind.execute(interest.update().where(interest.c.supporting_team == side).values(
+            supporting_team_id=sa.select(match.c[id_column]).where(match.c.id == interest.c.match_id)
+            .scalar_subquery()
+        ))
+    # Interesse sem time identificável (jogo inexistente) não tem como migrar
+    bind.execute(interest.delete().where(interest.c.supporting_team_id.is_(None)))
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('favorite_team')
+        batch_op.create_foreign_key('fk_user_favorite_team_id_team', 'team', ['favorite_team_id'], ['id'])
+
+    with op.batch_alter_table('match') as batch_op:
+        batch_op.drop_column('home_team')
+        batch_op.drop_column('away_team')
+        batch_op.alter_column('home_team_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('away_team_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_match_home_team_id_team', 'team', ['home_team_id'], ['id'])
+        batch_op.create_foreign_key('fk_match_away_team_id_team', 'team', ['away_team_id'], ['id'])
+
+    with op.batch_alter_table('user_match_interest') as batch_op:
+        batch_op.drop_column('supporting_team')
+        batch_op.alter_column('supporting_team_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_user_match_interest_supporting_team_id_team', 'team',
+                                    ['supporting_team_id'], ['id'])
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    for table_name, column, _ in TEAM_COLUMNS:
+        op.add_column(table_name, sa.Column(column, sa.String(length=50), nullable=True))
+
+    for table_name, column, id_column in TEAM_COLUMNS:
+        legacy = _legacy_table(table_name, column, id_column)
+        bind.execute(legacy.update().values({
+            column: sa.select(team.c.name).where(team.c.id == legacy.c[id_column]).scalar_subquery()
+        }))
+
+    with op.batch_alter_table('user_match_interest') as batch_op:
+        batch_op.drop_constraint('fk_user_match_interest_supporting_team_id_team', type_='foreignkey')
+        batch_op.drop_column('supporting_team_id')
+        batch_op.alter_column('supporting_team', existing_type=sa.String(length=50), nullable=False)
+
+    with op.batch_alter_table('match') as batch_op:
+        batch_op.drop_constraint('fk_match_home_team_id_team', type_='foreignkey')
+        batch_op.drop_constraint('fk_match_away_team_id_team', type_='foreignkey')
+        batch_op.drop_column('home_team_id')
+        batch_op.drop_column('away_team_id')
+        batch_op.alter_column('home_team', existing_type=sa.String(length=50), nullable=False)
+        batch_op.alter_column('away_team', existing_type=sa.String(length=50), nullable=False)
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_constraint('fk_user_favorite_team_id_team', type_='foreignkey')
+        batch_op.drop_column('favorite_team_id')
+
+    op.drop_table('team')
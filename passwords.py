@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Parâmetros que o Werkzeug completa quando o método vem sem custo
+_DEFAULT_PARAMS = {
+    'pbkdf2': ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)],
+    'scrypt': ['32768', '8', '1']
+}
+
+
+def normalize_method(method):
+    """``'pbkdf2'`` -> ``'pbkdf2:sha256:600000'``, como aparece no hash gravado"""
+    name, *params = method.split(':')
+    defaults = _DEFAULT_PARAMS.get(name, [])
+    return ':'.join([name] + params + defaults[len(params):])
+
+
+class PasswordHasher:
+    """Gera e confere hashes de senha num pool limitado de threads do sistema.
+
+    O hash é caro de propósito; feito no handler, com eventlet, ele trava o
+    hub e todas as conexões Socket.IO do worker esperam. Aqui cada cálculo
+    roda numa thread real (``eventlet.tpool`` no modo eventlet, um
+    ThreadPoolExecutor nos outros) e no máximo ``workers`` rodam ao mesmo
+    tempo, o que também limita CPU e memória (scrypt) num pico de logins.
+    """
+
+    def __init__(self, method='pbkdf2:sha256', salt_length=16, workers=2):
+        self.configure(method, salt_length, workers)
+        self._lock = threading.Lock()
+        self._stats = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'busy_ms': 0.0}
+
+    def configure(self, method, salt_length, workers, green=False):
+        """Troca os parâmetros; ``green`` usa o pool nativo do eventlet"""
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = workers
+
+        if green:
+            from eventlet import semaphore, tpool
+            self._slots = semaphore.Semaphore(workers)
+            self._execute = tpool.execute
+        else:
+            if getattr(self, '_executor', None):
+                self._executor.shutdown(wait=False)
+            self._slots = None
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hash')
+            self._execute = lambda fn, *args: self._executor.submit(fn, *args).result()
+
+    def init_app(self, app, green=False):
+        self.configure(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_SALT_LENGTH'],
+                       app.config['PASSWORD_HASH_WORKERS'], green=green)
+
+    def _run(self, stat, fn, *args):
+        started = time.perf_counter()
+        if self._slots is None:
+            result = self._execute(fn, *args)
+        else:
+            with self._slots:
+                result = self._execute(fn, *args)
+
+        with self._lock:
+            self._stats[stat] += 1
+            self._stats['busy_ms'] += (time.perf_counter() - started) * 1000
+        return result
+
+    def hash(self, password):
+        return self._run('hashed', generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run('verified', check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True se o hash gravado usa outro método, custo ou tamanho de salt"""
+        method, _, rest = password_hash.partition('$')
+        salt = rest.partition('$')[0]
+        return normalize_method(method) != self.method or len(salt) != self.salt_length
+
+    def verify_and_update(self, password_hash, password):
+        """Confere a senha; retorna (ok, hash novo ou None se não precisar trocar)"""
+        if not self.verify(password_hash, password):
+            return False, None
+        if not self.needs_rehash(password_hash):
+            return True, None
+
+        with self._lock:
+            self._stats['rehashed'] += 1
+        return True, self.hash(password)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        calls = stats['hashed'] + stats['verified']
+        stats['avg_ms'] = stats['busy_ms'] / calls if calls else 0.0
+        stats['method'] = self.method
+        stats['workers'] = self.workers
+        return stats
@@ -0,0 +1,165 @@
+import threading
+import time
+import uuid
+
+# Sala sem clientes por onde os workers trocam as contagens (via fila)
+PRESENCE_SYNC_ROOM = 'sync:presence'
+
+
+class RoomPresence:
+    """Quem está em cada sala de chat, com contagem por time.
+
+    Entradas e saídas só alteram o estado em memória; a cada ``interval``
+    segundos cada sala que mudou recebe um único evento ``presence`` com o
+    total e a divisão por time, em vez de um ``status`` por entrada/saída.
+
+    Com fila de mensagens (``shared=True``) cada worker publica as contagens
+    das suas conexões na sala de sincronização e soma as dos outros; o
+    resumo vai só para os clientes locais (``ignore_queue``). Cada worker
+    republica tudo a cada ``heartbeat`` segundos e as contagens de um worker
+    sem notícias há ``3 * heartbeat`` são descartadas.
+    """
+
+    def __init__(self, interval=1.0, heartbeat=15, shared=False):
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.shared = shared
+        self.worker_id = uuid.uuid4().hex
+
+        # sala -> {sid: nome do time do torcedor ('' sem time)}
+        self._local = {}
+        # sala -> {worker: ({nome do time: conexões}, time.time() da última publicação)}
+        self._remote = {}
+        self._sid_rooms = {}  # sid -> salas
+        self._dirty = set()   # salas com resumo a enviar
+        self._changed = set() # salas com contagem local a publicar
+        self._lock = threading.Lock()
+        self._started = False
+        self._next_heartbeat = 0
+        self.socketio = None
+
+    def init_app(self, app):
+        self.interval = app.config['PRESENCE_INTERVAL']
+        self.heartbeat = app.config['PRESENCE_HEARTBEAT']
+
+    def start(self, socketio):
+        """Inicia o laço de resumos em segundo plano (só uma vez)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.socketio = socketio
+        socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Erro ao enviar presença: {e}")
+
+    def join(self, room, sid, team=None):
+        with self._lock:
+            self._local.setdefault(room, {})[sid] = team or ''
+            self._sid_rooms.setdefault(sid, set()).add(room)
+            self._dirty.add(room)
+            self._changed.add(room)
+
+    def leave(self, room, sid):
+        with self._lock:
+            self._discard(room, sid)
+
+    def leave_all(self, sid):
+        """Tira a conexão de todas as salas (disconnect)"""
+        with self._lock:
+            for room in list(self._sid_rooms.get(sid, ())):
+                self._discard(room, sid)
+
+    def _discard(self, room, sid):
+        members = self._local.get(room)
+        if members is None or members.pop(sid, None) is None:
+            return
+        if not members:
+            del self._local[room]
+
+        rooms = self._sid_rooms.get(sid)
+        if rooms is not None:
+            rooms.discard(room)
+            if not rooms:
+                del self._sid_rooms[sid]
+
+        self._dirty.add(room)
+        self._changed.add(room)
+
+    def _local_teams(self, room):
+        teams = {}
+        for team in self._local.get(room, {}).values():
+            teams[team] = teams.get(team, 0) + 1
+        return teams
+
+    def merge(self, worker_id, room, teams):
+        """Contagens publicadas por outro worker"""
+        if worker_id == self.worker_id:
+            return
+        with self._lock:
+            workers = self._remote.setdefault(room, {})
+            previous = workers.get(worker_id, (None, 0))[0]
+            if teams:
+                workers[worker_id] = (teams, time.time())
+            else:
+                workers.pop(worker_id, None)
+                if not workers:
+                    del self._remote[room]
+            if previous != (teams or None):
+                self._dirty.add(room)
+
+    def _summary(self, room):
+        teams = self._local_teams(room)
+        for remote_teams, _ in self._remote.get(room, {}).values():
+            for team, count in remote_teams.items():
+                teams[team] = teams.get(team, 0) + count
+        return {
+            'room': room,
+            'count': sum(teams.values()),
+            'teams': {team or 'sem time': count for team, count in teams.items()}
+        }
+
+    def _expire(self, now):
+        limit = now - 3 * self.heartbeat
+        for room in list(self._remote):
+            workers = self._remote[room]
+            for worker_id in [w for w, (_, seen) in workers.items() if seen < limit]:
+                del workers[worker_id]
+                self._dirty.add(room)
+            if not workers:
+                del self._remote[room]
+
+    def tick(self):
+        """Publica as contagens locais e envia um resumo por sala alterada"""
+        now = time.time()
+        with self._lock:
+            if self.shared and now >= self._next_heartbeat:
+                self._changed.update(self._local)
+                self._next_heartbeat = now + self.heartbeat
+                self._expire(now)
+
+            changed = [(room, self._local_teams(room)) for room in self._changed]
+            self._changed.clear()
+            summaries = [self._summary(room) for room in self._dirty]
+            self._dirty.clear()
+
+        if self.shared:
+            for room, teams in changed:
+                self.socketio.emit('presence_sync', {
+                    'worker': self.worker_id, 'room': room, 'teams': teams
+                }, to=PRESENCE_SYNC_ROOM)
+
+        for summary in summaries:
+            self.socketio.emit('presence', summary, to=summary['room'], ignore_queue=True)
+
+    def sizes(self, rooms=None):
+        """Total e divisão por time das salas (todas, se ``rooms`` for None)"""
+        with self._lock:
+            names = set(self._local) | set(self._remote) if rooms is None else rooms
+            return {room: self._summary(room) for room in names}
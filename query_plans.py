@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select
+
+
+def hot_queries(user_model, match_model, interest_model, message_model):
+    """Consultas dos caminhos quentes que precisam usar índice"""
+    User, Match, UserMatchInterest, ChatMessage = user_model, match_model, interest_model, message_model
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+
+    return {
+        'chat_history': select(ChatMessage)
+            .where(ChatMessage.room_id == 'match-1')
+            .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+            .limit(50),
+        'chat_history_page': select(ChatMessage.id, User.username)
+            .join(User, User.id == ChatMessage.user_id)
+            .where(ChatMessage.room_id == 'match-1',
+                   or_(ChatMessage.timestamp < today,
+                       and_(ChatMessage.timestamp == today, ChatMessage.id < 1000)))
+            .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+            .limit(51),
+        'match_interest': select(UserMatchInterest)
+            .where(UserMatchInterest.user_id == 1, UserMatchInterest.match_id == 1),
+        'matches_today': select(Match)
+            .where(Match.match_date >= today, Match.match_date < today + timedelta(days=1)),
+        'matches_by_api_id': select(Match.api_match_id)
+            .where(Match.api_match_id.in_([1, 2, 3])),
+        'user_by_email': select(User).where(User.email == 'torcedor@esportesocial.com')
+    }
+
+
+def explain(connection, stmt):
+    """Roda o EXPLAIN do banco e retorna o plano como lista de dicts"""
+    dialect = connection.dialect
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    result = connection.exec_driver_sql(prefix + sql)
+    return [dict(row._mapping) for row in result]
+
+
+def is_full_scan(dialect_name, plan):
+    """Indica se algum passo do plano lê a tabela inteira"""
+    for step in plan:
+        if dialect_name == 'sqlite':
+            detail = step.get('detail', '')
+            # "SCAN tabela" sem índice; "SEARCH ... USING INDEX" é o esperado
+            if detail.startswith('SCAN') and 'INDEX' not in detail:
+                return True
+        elif dialect_name == 'mysql':
+            if str(step.get('type', '')).upper() == 'ALL':
+                return True
+        elif dialect_name == 'postgresql':
+            if 'Seq Scan' in str(step.get('QUERY PLAN', '')):
+                return True
+    return False
+
+
+def check_query_plans(connection, queries):
+    """Retorna {nome: (ok, plano)} para cada consulta quente"""
+    results = {}
+    for name, stmt in queries.items():
+        plan = explain(connection, stmt)
+        results[name] = (not is_full_scan(connection.dialect.name, plan), plan)
+    return results
@@ -0,0 +1,256 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request, session
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(limit):
+    """``'20/minute'`` ou ``'5/10s'`` -> (capacidade, tokens por segundo)"""
+    count, _, period = limit.partition('/')
+    period = period.strip().lower()
+    if period.endswith('s') and period[:-1].isdigit():
+        seconds = int(period[:-1])
+    else:
+        seconds = PERIODS[period.rstrip('s')]
+    capacity = int(count)
+    return capacity, capacity / seconds
+
+
+def user_ip_limits(value):
+    """``'10/10s,200/10s'`` -> {'user': '10/10s', 'ip': '200/10s'} (vazio = sem limite)"""
+    user, _, ip = value.partition(',')
+    return {'user': user.strip() or None, 'ip': ip.strip() or None}
+
+
+class MemoryBucketStore:
+    """Baldes em memória do processo (LRU limitado a ``max_entries``)"""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        """Tira ``cost`` tokens do balde; retorna (permitido, segundos para liberar)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+# Balde atômico no Redis: lê, recarrega pelo tempo decorrido e desconta
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Baldes compartilhados entre workers via Redis"""
+
+    def __init__(self, url, prefix='esportesocial:ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('Instale o pacote "redis" para usar RATELIMIT_STORAGE_URL redis://')
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[capacity, rate, time.time(), cost])
+        allowed = bool(allowed)
+        return allowed, 0.0 if allowed else (cost - float(tokens)) / rate
+
+
+def make_store(url):
+    """Cria o armazenamento dos baldes a partir da URL: memory:// ou redis://..."""
+    if not url or url.startswith('memory://'):
+        return MemoryBucketStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBucketStore(url)
+    raise ValueError(f'Armazenamento de rate limit não suportado: {url}')
+
+
+class RateLimiter:
+    """Token bucket por usuário e por IP, com limites por regra.
+
+    Cada regra (um evento Socket.IO ou uma rota) tem um limite por usuário
+    logado e outro por IP, no formato de ``parse_limit``; a chamada passa
+    só se houver token nos dois baldes. O limite por IP é mais folgado
+    porque vários torcedores num bar saem pelo mesmo IP.
+    """
+
+    def __init__(self, store=None, rules=None, enabled=True):
+        self.store = store or MemoryBucketStore()
+        self.enabled = enabled
+        self.rules = self._parse_rules(rules or {})
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    @staticmethod
+    def _parse_rules(rules):
+        return {
+            name: {scope: parse_limit(limit) for scope, limit in limits.items() if limit}
+            for name, limits in rules.items()
+        }
+
+    def init_app(self, app, rule_settings):
+        """Limites de ``{regra: chave da config}`` (cada valor "usuário,ip"),
+        com o armazenamento de RATELIMIT_STORAGE_URL"""
+        self.store = make_store(app.config['RATELIMIT_STORAGE_URL'])
+        self.enabled = app.config['RATELIMIT_ENABLED']
+        self.rules = self._parse_rules({name: user_ip_limits(app.config[key])
+                                        for name, key in rule_settings.items()})
+
+    def _count(self, rule, stat):
+        with self._lock:
+            stats = self._stats.setdefault(rule, {'allowed': 0, 'limited': 0})
+            stats[stat] += 1
+
+    def hit(self, rule, user_id=None, ip=None):
+        """Consome um token da regra; retorna (permitido, segundos para liberar)"""
+        limits = self.rules.get(rule)
+        if not self.enabled or not limits:
+            return True, 0.0
+
+        retry_after = 0.0
+        for scope, identity in (('user', user_id), ('ip', ip)):
+            if identity is None or scope not in limits:
+                continue
+            capacity, rate = limits[scope]
+            allowed, wait = self.store.take(f'{rule}:{scope}:{identity}', capacity, rate)
+            if not allowed:
+                retry_after = max(retry_after, wait)
+
+        self._count(rule, 'limited' if retry_after else 'allowed')
+        return not retry_after, retry_after
+
+    def hit_current(self, rule):
+        """``hit`` com o usuário da sessão e o IP da requisição atual"""
+        return self.hit(rule, session.get('user_id'), request.remote_addr)
+
+    def limit(self, rule):
+        """Decorator de rota: responde 429 com Retry-After quando estourar"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                allowed, retry_after = self.hit_current(rule)
+                if not allowed:
+                    response = jsonify({'error': 'Muitas requisições, tente novamente em instantes'})
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(max(1, round(retry_after)))
+                    return response
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            return {rule: dict(stats) for rule, stats in self._stats.items()}
+
+
+class QuickMessageMerger:
+    """Junta mensagens rápidas iguais na mesma sala dentro de ``window`` segundos.
+
+    A primeira mensagem da janela segue normalmente; as repetições só
+    incrementam um contador, e ao fim da janela cada função de
+    ``merge_listeners`` recebe (sala, mensagem, total, remetente) das que
+    tiveram repetições, com o remetente da última (ex.: "🎉 GOOOOL!" x 500).
+    """
+
+    def __init__(self, window=2.0):
+        self.app = None
+        self.window = window
+        self.merge_listeners = []
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self.merged = 0
+        self.socketio = None
+
+    def init_app(self, app):
+        self.app = app
+        self.window = app.config['QUICK_MESSAGE_MERGE_WINDOW']
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def start(self, socketio):
+        """Inicia o laço que fecha as janelas (só uma vez)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.socketio = socketio
+        socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.window / 2)
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"Erro ao juntar mensagens rápidas: {e}")
+
+    def offer(self, room, message, sender=None):
+        """True se a mensagem deve ser enviada; False se entrou na contagem"""
+        key = (room, message)
+        now = time.monotonic()
+        with self._lock:
+            current = self._windows.get(key)
+            if current is None or now - current[0] >= self.window:
+                self._windows[key] = [now, 1, sender]
+                return True
+            current[1] += 1
+            current[2] = sender
+            self.merged += 1
+            return False
+
+    def flush(self, force=False):
+        """Fecha as janelas vencidas e envia o total das que tiveram repetições"""
+        now = time.monotonic()
+        with self._lock:
+            closed = [key for key, (opened_at, _, _) in self._windows.items()
+                      if force or now - opened_at >= self.window]
+            totals = [(key, *self._windows.pop(key)[1:]) for key in closed]
+
+        for (room, message), count, sender in totals:
+            if count > 1:
+                for listener in self.merge_listeners:
+                    listener(room, message, count, sender)
@@ -1,10 +1,16 @@
 import os
 from dotenv import load_dotenv
-from app import app, socketio
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
+# Com fila de mensagens o eventlet precisa de sockets cooperativos
+if os.environ.get('SOCKETIO_MESSAGE_QUEUE'):
+    import eventlet
+    eventlet.monkey_patch()
+
+from app import create_app, socketio, start_background_tasks
+
 def validate_environment():
     """Valida se as variáveis essenciais estão configuradas"""
     required_vars = {
@@ -54,6 +60,10 @@ def main():
         print("   Email: torcedor@esportesocial.com | Senha: 123456")
     
     print("\n⚽ Iniciando aplicação...")
+    app = create_app()
+    
+    # Iniciar workers em segundo plano
+    start_background_tasks()
     
     try:
         # Executar aplicação
@@ -0,0 +1,413 @@
+"""Benchmark da aplicação com as APIs externas substituídas por stubs.
+
+Sobe o ``run.py`` contra SQLite (padrão) ou outro banco (``--database-url``,
+ex.: MySQL), com a API-Futebol e o Google Places servidos pelas gravações de
+scripts/recordings/, e roda os cenários:
+
+- dashboard_storm: /dashboard + /matches/today em paralelo
+- chat_burst: clientes entrando juntos numa sala e mandando mensagens
+- interest_writes: POST /match/interest em paralelo
+- matches_polling: /matches/today repetido por cada torcedor como o
+  dashboard faz, revalidando com If-None-Match; mede bytes por resposta
+- login_storm: logins em paralelo enquanto um cliente Socket.IO mede a
+  latência dos eventos (o hash de senha não pode travar o chat)
+
+Para cada cenário mede vazão, latência p50/p95/p99 e consultas ao banco
+(via /db/stats) e grava um JSON para comparar entre commits:
+
+    python scripts/benchmark.py --output bench-antes.json
+    python scripts/benchmark.py --output bench-depois.json --compare bench-antes.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+import socketio
+from engineio import payload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_upstreams import StubUpstreams  # noqa: E402
+
+# O cliente de polling recusa respostas com mais de 16 pacotes
+payload.Payload.max_decode_packets = 100000
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 2)
+
+
+def summarize(latencies_ms, errors, elapsed, queries, **extra):
+    requests_done = len(latencies_ms) + errors
+    result = {
+        'requests': requests_done,
+        'errors': errors,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(requests_done / elapsed, 1) if elapsed else None,
+        'p50_ms': percentile(latencies_ms, 50),
+        'p95_ms': percentile(latencies_ms, 95),
+        'p99_ms': percentile(latencies_ms, 99),
+        'db_queries': queries,
+        'db_queries_per_request': round(queries / requests_done, 2) if requests_done else None
+    }
+    result.update(extra)
+    return result
+
+
+class Bench:
+    def __init__(self, base_url, users, concurrency):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.sessions = []
+        self._register(users)
+        self.admin = self.sessions[0]
+
+    def _register(self, users):
+        def register(index):
+            http = requests.Session()
+            http.post(f'{self.base_url}/register', json={
+                'username': f'bench{index}', 'email': f'bench{index}@example.com',
+                'password': 'bench', 'user_type': 'torcedor',
+                'favorite_team': random.choice(['Flamengo', 'Palmeiras', 'Corinthians', 'Vasco'])
+            }).raise_for_status()
+            return http
+
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            self.sessions = list(pool.map(register, range(users)))
+
+    def db_queries(self):
+        return self.admin.get(f'{self.base_url}/db/stats').json()['queries']
+
+    def _timed(self, call):
+        started = time.perf_counter()
+        try:
+            ok = call()
+        except Exception:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    def run_http(self, calls):
+        """Roda as chamadas em paralelo; retorna (latências ok, erros, duração)"""
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            for elapsed_ms, ok in pool.map(self._timed, calls):
+                if ok:
+                    latencies.append(elapsed_ms)
+                else:
+                    errors += 1
+        return latencies, errors, time.perf_counter() - started
+
+    def scenario(self, name, run):
+        queries_before = self.db_queries()
+        result = run()
+        # Dá tempo para gravações em segundo plano (fila do chat) entrarem na conta
+        time.sleep(1)
+        queries = self.db_queries() - queries_before
+        latencies, errors, elapsed = result[:3]
+        extra = result[3] if len(result) > 3 else {}
+        return name, summarize(latencies, errors, elapsed, queries, **extra)
+
+    def dashboard_storm(self, count):
+        def call(http, path):
+            return lambda: http.get(f'{self.base_url}{path}').status_code == 200
+
+        calls = []
+        for index in range(count):
+            http = self.sessions[index % len(self.sessions)]
+            calls.append(call(http, '/dashboard'))
+            calls.append(call(http, '/matches/today'))
+        return self.run_http(calls)
+
+    def interest_writes(self, count, matches):
+        def call(http, match):
+            return lambda: http.post(f'{self.base_url}/match/interest', json={
+                'match_id': match['id'],
+                'supporting_team': random.choice([match['home_team'], match['away_team']]),
+                'ranking': random.randint(1, 5)
+            }).status_code == 200
+
+        return self.run_http([
+            call(self.sessions[index % len(self.sessions)], random.choice(matches))
+            for index in range(count)
+        ])
+
+    def matches_polling(self, count):
+        """Cada sessão guarda o último ETag, como o navegador, e revalida"""
+        etags = {}
+        wire_bytes = []
+        lock = threading.Lock()
+
+        def call(http):
+            def poll():
+                headers = {'If-None-Match': etags[id(http)]} if id(http) in etags else {}
+                response = http.get(f'{self.base_url}/matches/today', headers=headers)
+                # Content-Length é o tamanho já comprimido, o que passa na rede
+                size = int(response.headers.get('Content-Length', len(response.content)))
+                with lock:
+                    wire_bytes.append(size)
+                    if response.headers.get('ETag'):
+                        etags[id(http)] = response.headers['ETag']
+                return response.status_code in (200, 304)
+            return poll
+
+        latencies, errors, elapsed = self.run_http([
+            call(self.sessions[index % len(self.sessions)]) for index in range(count)
+        ])
+        return latencies, errors, elapsed, {
+            'bytes_total': sum(wire_bytes),
+            'bytes_per_request': round(sum(wire_bytes) / len(wire_bytes), 1) if wire_bytes else None
+        }
+
+    def socket_client(self, http, timeout):
+        client = socketio.Client()
+        cookie = '; '.join(f'{k}={v}' for k, v in http.cookies.items())
+        client.connect(self.base_url, headers={'Cookie': cookie}, wait_timeout=timeout)
+        return client
+
+    def socket_probe(self, client, room, stop, timeout):
+        """Latências de ``join`` em sequência até ``stop`` ser marcado; um
+        evento sem resposta em ``timeout`` conta como ``timeout`` ms"""
+        latencies = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                client.call('join', {'room': room}, timeout=timeout)
+            except socketio.exceptions.TimeoutError:
+                pass
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.02)
+        return latencies
+
+    def login_storm(self, count, timeout, idle_s=1.0):
+        client = self.socket_client(self.admin, timeout)
+        room = f'probe-{int(time.time())}'
+
+        def probe(duration=None):
+            stop = threading.Event()
+            if duration:
+                threading.Timer(duration, stop.set).start()
+            return stop, ThreadPoolExecutor(1).submit(self.socket_probe, client, room, stop, timeout)
+
+        _, idle = probe(idle_s)
+        idle_latencies = idle.result()
+
+        def call(index):
+            def login():
+                http = requests.Session()
+                return http.post(f'{self.base_url}/login', json={
+                    'email': f'bench{index}@example.com', 'password': 'bench'
+                }).json().get('success', False)
+            return login
+
+        stop, during = probe()
+        latencies, errors, elapsed = self.run_http([call(index % len(self.sessions)) for index in range(count)])
+        stop.set()
+        during_latencies = during.result()
+        client.disconnect()
+
+        return latencies, errors, elapsed, {
+            'logins_per_s': round(len(latencies) / elapsed, 1),
+            'socket_p50_idle_ms': percentile(idle_latencies, 50),
+            'socket_p95_idle_ms': percentile(idle_latencies, 95),
+            'socket_p50_during_ms': percentile(during_latencies, 50),
+            'socket_p95_during_ms': percentile(during_latencies, 95),
+            'socket_max_during_ms': round(max(during_latencies), 2) if during_latencies else None
+        }
+
+    def chat_burst(self, clients_count, messages, timeout):
+        room = f'bench-{int(time.time())}'
+        clients = []
+        lock = threading.Lock()
+        received = [0]
+
+        def on_message(data):
+            with lock:
+                received[0] += 1
+
+        def connect(http):
+            client = self.socket_client(http, timeout)
+            client.on('message', on_message)
+            client.call('join', {'room': room}, timeout=timeout)
+            return client
+
+        join_started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            clients = list(pool.map(connect, self.sessions[:clients_count]))
+        join_elapsed = time.perf_counter() - join_started
+
+        def send(args):
+            sender, client = args
+            latencies, errors = [], 0
+            for seq in range(messages):
+                started = time.perf_counter()
+                try:
+                    client.call('message', {'room': room, 'message': f'{sender}:{seq}'}, timeout=timeout)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                except socketio.exceptions.TimeoutError:
+                    errors += 1
+            return latencies, errors
+
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(len(clients)) as pool:
+            for sent, failed in pool.map(send, enumerate(clients)):
+                latencies.extend(sent)
+                errors += failed
+
+        expected = len(clients) * len(clients) * messages
+        deadline = time.time() + timeout
+        while received[0] < expected and time.time() < deadline:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+
+        for client in clients:
+            client.disconnect()
+
+        return latencies, errors, elapsed, {
+            'clients': len(clients),
+            'join_s': round(join_elapsed, 3),
+            'deliveries': received[0],
+            'deliveries_expected': expected,
+            'deliveries_per_s': round(received[0] / elapsed, 1)
+        }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Variação percentual de vazão e p95 em relação a um resultado anterior"""
+    diff = {}
+    for name, result in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        diff[name] = {}
+        for metric in ('throughput_rps', 'p95_ms', 'db_queries_per_request', 'socket_p95_during_ms',
+                       'bytes_per_request'):
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None:
+                diff[name][metric] = f'{(new - old) / old * 100:+.1f}%'
+    return {'against': previous.get('commit'), 'scenarios': diff}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='padrão: SQLite temporário')
+    parser.add_argument('--port', type=int, default=5200)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--dashboard-loads', type=int, default=300)
+    parser.add_argument('--chat-clients', type=int, default=20)
+    parser.add_argument('--chat-messages', type=int, default=10)
+    parser.add_argument('--interest-writes', type=int, default=300)
+    parser.add_argument('--match-polls', type=int, default=500)
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--upstream-latency', type=float, default=50, help='latência dos stubs (ms)')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--compare', help='JSON de uma execução anterior')
+    args = parser.parse_args()
+
+    random.seed(42)
+    workdir = tempfile.mkdtemp(prefix='esportesocial-bench-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    stub = StubUpstreams(latency_ms=args.upstream_latency).start()
+    env = dict(
+        os.environ,
+        **stub.env(),
+        DATABASE_URL=database_url,
+        SECRET_KEY='benchmark',
+        FLASK_ENV='production',
+        SESSION_COOKIE_SECURE='false',
+        PORT=str(args.port),
+        RATELIMIT_ENABLED='false',
+        FIXTURE_POLL_INTERVAL='3600',
+        FIXTURE_LIVE_POLL_INTERVAL='3600'
+    )
+    env.pop('SOCKETIO_MESSAGE_QUEUE', None)
+
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade'],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    server = subprocess.Popen([sys.executable, 'run.py'], cwd=ROOT, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{args.port}'
+
+    try:
+        deadline = time.time() + args.timeout
+        while True:
+            try:
+                requests.get(base_url, timeout=1)
+                break
+            except requests.exceptions.RequestException:
+                if time.time() > deadline or server.poll() is not None:
+                    raise SystemExit(f'Servidor não subiu; veja {log.name}')
+                time.sleep(0.2)
+
+        bench = Bench(base_url, args.users, args.concurrency)
+
+        # Espera o poller gravar os jogos do stub
+        matches = []
+        while not matches and time.time() < deadline:
+            matches = bench.admin.get(f'{base_url}/matches/today').json().get('matches', [])
+            time.sleep(0.2)
+        matches = matches or [{'id': 1, 'home_team': 'Flamengo', 'away_team': 'Palmeiras'}]
+
+        scenarios = dict([
+            bench.scenario('dashboard_storm', lambda: bench.dashboard_storm(args.dashboard_loads)),
+            bench.scenario('chat_burst', lambda: bench.chat_burst(
+                min(args.chat_clients, args.users), args.chat_messages, args.timeout)),
+            bench.scenario('matches_polling', lambda: bench.matches_polling(args.match_polls)),
+            bench.scenario('interest_writes', lambda: bench.interest_writes(args.interest_writes, matches)),
+            bench.scenario('login_storm', lambda: bench.login_storm(args.logins, args.timeout))
+        ])
+    finally:
+        server.terminate()
+        server.wait()
+        stub.shutdown()
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'database': database_url.split(':', 1)[0],
+        'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'database_url')},
+        'upstream_hits': stub.hits,
+        'scenarios': scenarios
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
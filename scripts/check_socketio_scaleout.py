@@ -0,0 +1,172 @@
+"""Verifica a entrega entre workers do Socket.IO através da fila de mensagens.
+
+Sobe N processos ``run.py`` apontando para a mesma fila (``local://`` por
+padrão, que usa o broker local de socket_queue.py; ou um ``redis://``),
+conecta clientes em workers diferentes na mesma sala e confere que todos
+recebem todas as mensagens, na ordem em que cada remetente enviou, e que
+a presença da sala é a mesma em todos os workers.
+
+Uso: python scripts/check_socketio_scaleout.py --workers 3 --messages 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+import socketio
+from engineio import payload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from socket_queue import LocalBroker  # noqa: E402
+
+# O cliente de polling recusa respostas com mais de 16 pacotes; as rajadas
+# do teste passam disso
+payload.Payload.max_decode_packets = 10000
+
+
+def wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return True
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--clients-per-worker', type=int, default=2)
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--queue', default='local://127.0.0.1:6390')
+    parser.add_argument('--base-port', type=int, default=5100)
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='esportesocial-scaleout-')
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'scaleout.db')}",
+        SECRET_KEY='scaleout-check',
+        GOOGLE_MAPS_API_KEY='unused',
+        API_FUTEBOL_KEY='unused',
+        FLASK_ENV='production',
+        SESSION_COOKIE_SECURE='false',
+        FIXTURE_POLLER_ENABLED='false',
+        SOCKETIO_MESSAGE_QUEUE=args.queue,
+        CHAT_FLUSH_INTERVAL='0.2',
+        RATELIMIT_ENABLED='false'
+    )
+
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade'],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+
+    if args.queue.startswith('local://'):
+        address = urlsplit(args.queue)
+        broker = LocalBroker((address.hostname, address.port))
+        threading.Thread(target=broker.serve_forever, daemon=True).start()
+
+    workers = []
+    urls = []
+    for index in range(args.workers):
+        port = args.base_port + index
+        workers.append(subprocess.Popen(
+            [sys.executable, 'run.py'], cwd=ROOT, env=dict(env, PORT=str(port)),
+            stdout=open(os.path.join(workdir, f"worker{index}.log"), "w"), stderr=subprocess.STDOUT
+        ))
+        urls.append(f'http://127.0.0.1:{port}')
+
+    try:
+        if not all(wait_for(url) for url in urls):
+            print(json.dumps({'ok': False, 'error': 'workers não subiram'}))
+            return 1
+
+        room = 'scaleout-check'
+        clients = []
+        sessions = {}
+        for index in range(args.workers * args.clients_per_worker):
+            url = urls[index % args.workers]
+            http = requests.Session()
+            http.post(f'{url}/register', json={
+                'username': f'fan{index}', 'email': f'fan{index}@example.com',
+                'password': 'scaleout', 'user_type': 'torcedor'
+            }).raise_for_status()
+            sessions.setdefault(url, http)
+
+            received = []
+            client = socketio.Client()
+            client.on('message', lambda data, received=received: received.append(data['message']))
+            client.connect(url, transports=['polling'],
+                           headers={'Cookie': '; '.join(f'{k}={v}' for k, v in http.cookies.items())})
+            client.emit('join', {'room': room})
+            clients.append((client, received))
+
+        # Dá tempo para todos entrarem na sala e a presença sincronizar
+        time.sleep(2.5)
+
+        presence = {
+            url: http.get(f'{url}/chat/presence', params={'rooms': room}).json()[room]['count']
+            for url, http in sessions.items()
+        }
+
+        started = time.perf_counter()
+        # call() espera o ack de cada mensagem; com emit() em rajada o POST de
+        # polling passa do limite de pacotes do servidor
+        for seq in range(args.messages):
+            for sender, (client, _) in enumerate(clients):
+                client.call('message', {'room': room, 'message': f'{sender}:{seq}'}, timeout=10)
+
+        expected = len(clients) * args.messages
+        deadline = time.time() + args.timeout
+        while time.time() < deadline and any(len(received) < expected for _, received in clients):
+            time.sleep(0.1)
+        elapsed = time.perf_counter() - started
+
+        failures = [
+            f'{url}: presença {count}/{len(clients)}'
+            for url, count in presence.items() if count != len(clients)
+        ]
+        for index, (_, received) in enumerate(clients):
+            if len(received) != expected:
+                failures.append(f'cliente {index}: {len(received)}/{expected} mensagens')
+                continue
+            by_sender = {}
+            for message in received:
+                sender, seq = message.split(':')
+                by_sender.setdefault(sender, []).append(int(seq))
+            if any(seqs != sorted(seqs) for seqs in by_sender.values()):
+                failures.append(f'cliente {index}: ordem trocada')
+
+        for client, _ in clients:
+            client.disconnect()
+
+        print(json.dumps({
+            'ok': not failures,
+            'workers': args.workers,
+            'clients': len(clients),
+            'messages_sent': expected,
+            'deliveries': sum(len(received) for _, received in clients),
+            'presence': presence,
+            'elapsed_s': round(elapsed, 3),
+            'failures': failures
+        }, indent=2))
+        return 0 if not failures else 1
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
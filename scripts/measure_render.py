@@ -0,0 +1,121 @@
+"""Mede o custo de renderizar as páginas da aplicação.
+
+- render: latência p50/p95/p99 e CPU por view de /dashboard e /chat/<sala>,
+  com torcedores de vários times, com e sem o cache de fragmentos
+  (FRAGMENT_CACHE_ENABLED); cada modo roda num processo novo
+- compile: tempo para compilar todos os templates num processo novo, com o
+  diretório de bytecode vazio (primeiro deploy) e já preenchido
+
+    python scripts/measure_render.py --views 2000 --output render.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_RENDER = """
+import json, sys, time
+import app as application
+
+flask_app = application.create_app()
+views, teams_count = int(sys.argv[1]), int(sys.argv[2])
+
+with flask_app.app_context():
+    User = application.User
+    team_ids = [team.id for team in application.teams.registry][:teams_count]
+    if not User.query.count():
+        for index in range(teams_count * 5):
+            application.db.session.add(User(
+                username=f'fan{index}', email=f'fan{index}@example.com', password_hash='-',
+                user_type='torcedor', favorite_team_id=team_ids[index % len(team_ids)]))
+        application.db.session.commit()
+    user_ids = [user_id for (user_id,) in application.db.session.query(User.id)]
+
+client = flask_app.test_client()
+result = {}
+for name, path in (('dashboard', '/dashboard'), ('chat', '/chat/match-1')):
+    latencies, cpu = [], 0.0
+    for index in range(views):
+        with client.session_transaction() as session:
+            session['user_id'] = user_ids[index % len(user_ids)]
+        started, started_cpu = time.perf_counter(), time.process_time()
+        response = client.get(path)
+        latencies.append((time.perf_counter() - started) * 1000)
+        cpu += time.process_time() - started_cpu
+        assert response.status_code == 200, response.status_code
+    latencies.sort()
+    pick = lambda pct: round(latencies[max(0, round(pct / 100 * len(latencies)) - 1)], 3)
+    result[name] = {'p50_ms': pick(50), 'p95_ms': pick(95), 'p99_ms': pick(99),
+                    'cpu_ms_per_view': round(cpu * 1000 / views, 3)}
+result['fragments'] = application.fragment_cache.stats()
+print(json.dumps(result))
+"""
+
+_COMPILE = """
+import json, time
+from jinja2 import TemplateError
+import app as application
+
+flask_app = application.create_app()
+started = time.perf_counter()
+for name in flask_app.jinja_env.list_templates():
+    try:
+        flask_app.jinja_env.get_template(name)
+    except TemplateError:
+        pass
+print(json.dumps({'compile_ms': round((time.perf_counter() - started) * 1000, 2)}))
+"""
+
+
+def run(code, env, *args):
+    output = subprocess.run([sys.executable, '-c', code, *map(str, args)], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--views', type=int, default=2000, help='views por página e modo')
+    parser.add_argument('--teams', type=int, default=20, help='times diferentes entre os torcedores')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='esportesocial-render-')
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'render.db')}",
+        SECRET_KEY='render',
+        FLASK_ENV='production',
+        SESSION_COOKIE_SECURE='false',
+        FIXTURE_POLLER_ENABLED='false',
+        JINJA_BYTECODE_CACHE_DIR=os.path.join(workdir, 'jinja_bytecode')
+    )
+    env.pop('SOCKETIO_MESSAGE_QUEUE', None)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade'],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+
+    report = {
+        'compile': {
+            'bytecode_cold': run(_COMPILE, env),
+            'bytecode_warm': run(_COMPILE, env)
+        },
+        'render': {
+            'fragment_cache_off': run(_RENDER, dict(env, FRAGMENT_CACHE_ENABLED='false'), args.views, args.teams),
+            'fragment_cache_on': run(_RENDER, dict(env, FRAGMENT_CACHE_ENABLED='true'), args.views, args.teams)
+        }
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
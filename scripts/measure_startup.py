@@ -0,0 +1,142 @@
+"""Mede o tempo de partida da aplicação.
+
+- cold_start: em processos novos, quanto custam o import de app.py, o
+  create_app, o warm_up e a primeira requisição (mediana de ``--runs``)
+- gunicorn: com e sem ``--preload``, o tempo até a primeira resposta, o
+  tempo de boot de cada worker (do fork até pronto) e o de um worker que
+  morreu e foi recriado pelo master
+
+    python scripts/measure_startup.py --workers 2 --output startup.json
+"""
+import argparse
+import json
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_COLD_START = """
+import json, time
+started = time.perf_counter()
+import app as application
+imported = time.perf_counter()
+flask_app = application.create_app()
+created = time.perf_counter()
+application.warm_up(flask_app)
+warmed = time.perf_counter()
+flask_app.test_client().get('/login')
+answered = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'warm_up_ms': (warmed - created) * 1000,
+    'first_request_ms': (answered - warmed) * 1000,
+    'total_ms': (answered - started) * 1000
+}))
+"""
+
+_READY = re.compile(r'Worker (\d+) pronto em (\d+) ms')
+
+
+def cold_start(env, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _COLD_START], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: round(statistics.median(sample[key] for sample in samples), 1) for key in samples[0]}
+
+
+def wait_ready(log_path, count, timeout):
+    """Espera ``count`` linhas de worker pronto no log; retorna [(pid, ms)]"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with open(log_path) as f:
+            ready = [(int(pid), int(ms)) for pid, ms in _READY.findall(f.read())]
+        if len(ready) >= count:
+            return ready
+        time.sleep(0.02)
+    raise SystemExit(f'Workers não ficaram prontos; veja {log_path}')
+
+
+def gunicorn(env, port, workers, preload, timeout):
+    log_path = tempfile.mktemp(prefix='esportesocial-gunicorn-', suffix='.log')
+    env = dict(env, PORT=str(port), WEB_CONCURRENCY=str(workers),
+               GUNICORN_PRELOAD='true' if preload else 'false')
+    started = time.perf_counter()
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(['gunicorn', '-c', 'deploy/gunicorn.conf.py', 'wsgi:app'],
+                                  cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        url = f'http://127.0.0.1:{port}/login'
+        while True:
+            try:
+                requests.get(url, timeout=1).raise_for_status()
+                break
+            except requests.exceptions.RequestException:
+                if time.perf_counter() - started > timeout or server.poll() is not None:
+                    raise SystemExit(f'gunicorn não subiu; veja {log_path}')
+                time.sleep(0.02)
+        first_response = time.perf_counter() - started
+
+        ready = wait_ready(log_path, workers, timeout)
+
+        # Derruba um worker e mede quanto o master leva para repor
+        os.kill(ready[0][0], signal.SIGKILL)
+        respawned = wait_ready(log_path, workers + 1, timeout)[-1]
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        'first_response_ms': round(first_response * 1000, 1),
+        'worker_boot_ms': [ms for _, ms in ready[:workers]],
+        'worker_respawn_ms': respawned[1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=5400)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='esportesocial-startup-')
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        SECRET_KEY='startup',
+        FLASK_ENV='production',
+        FIXTURE_POLLER_ENABLED='false'
+    )
+    env.pop('SOCKETIO_MESSAGE_QUEUE', None)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade'],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+
+    report = {
+        'cold_start': cold_start(env, args.runs),
+        'gunicorn_preload': gunicorn(env, args.port, args.workers, True, args.timeout),
+        'gunicorn_no_preload': gunicorn(env, args.port + 1, args.workers, False, args.timeout)
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
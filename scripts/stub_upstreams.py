@@ -0,0 +1,101 @@
+"""Stubs locais da API-Futebol e do Google Places para o benchmark.
+
+Respondem com as respostas gravadas em scripts/recordings/ (``{date}`` vira
+a data pedida, ou a de hoje), com uma latência opcional para simular a API
+real. Sozinho: python scripts/stub_upstreams.py --port 8900 --latency 80
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+
+# Prefixo do caminho -> (regra do resto do caminho, gravação)
+ROUTES = [
+    ('/api-futebol/v1/campeonatos/', lambda rest: '/' not in rest, 'api_futebol_campeonato.json'),
+    ('/api-futebol/v1/campeonatos/', lambda rest: rest.endswith('/jogos'), 'api_futebol_jogos.json'),
+    ('/google/maps/api/place/nearbysearch/json', lambda rest: rest == '', 'google_places_nearbysearch.json'),
+]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        stub = self.server
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+
+        for prefix, matches, recording in ROUTES:
+            if parts.path.startswith(prefix) and matches(parts.path[len(prefix):]):
+                break
+        else:
+            self.send_error(404)
+            return
+
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        day = params.get('data', [date.today().isoformat()])[0]
+        body = stub.recordings[recording].replace('{date}', day).encode('utf-8')
+        with stub.lock:
+            stub.hits[recording] = stub.hits.get(recording, 0) + 1
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubUpstreams(ThreadingHTTPServer):
+    """Servidor HTTP com as duas APIs; ``hits`` conta as chamadas por gravação"""
+
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency_ms=0):
+        super().__init__(address, _StubHandler)
+        self.latency = latency_ms / 1000
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.recordings = {}
+        for name in os.listdir(RECORDINGS_DIR):
+            with open(os.path.join(RECORDINGS_DIR, name), encoding='utf-8') as f:
+                self.recordings[name] = json.dumps(json.load(f), ensure_ascii=False)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def env(self):
+        """Variáveis de ambiente que apontam a aplicação para os stubs"""
+        return {
+            'API_FUTEBOL_URL': f'{self.base_url}/api-futebol/v1',
+            'GOOGLE_PLACES_URL': f'{self.base_url}/google/maps/api/place',
+            'API_FUTEBOL_KEY': 'stub',
+            'GOOGLE_MAPS_API_KEY': 'stub'
+        }
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0, help='latência por resposta (ms)')
+    args = parser.parse_args()
+
+    stub = StubUpstreams((args.host, args.port), latency_ms=args.latency)
+    for name, value in stub.env().items():
+        print(f'{name}={value}')
+    stub.serve_forever()
@@ -0,0 +1,72 @@
+import threading
+
+# Sala sem clientes usada só para avisar os outros workers (via fila)
+PROFILE_SYNC_ROOM = 'sync:profiles'
+
+
+class ConnectionContexts:
+    """Dados do usuário de cada conexão Socket.IO, carregados no ``connect``.
+
+    Guarda id, nome, time e cores já resolvidas por ``sid``, para que os
+    handlers de chat não consultem o banco a cada evento. ``invalidate_user``
+    descarta os contextos de um usuário (ex.: perfil alterado); a próxima
+    leitura recarrega do banco com ``loader(user_id)``.
+    """
+
+    def __init__(self, loader, colors_for):
+        self.loader = loader
+        self.colors_for = colors_for
+        self._contexts = {}
+        self._user_sids = {}
+        self._stale = set()
+        self._lock = threading.Lock()
+
+    def build(self, user):
+        return {
+            'user_id': user.id,
+            'username': user.username,
+            'favorite_team_id': user.favorite_team_id,
+            'favorite_team': user.favorite_team,
+            'team_colors': self.colors_for(user.favorite_team_id)
+        }
+
+    def load(self, sid, user_id):
+        """Carrega o contexto da conexão; retorna None se o usuário não existe"""
+        user = self.loader(user_id)
+        if user is None:
+            self.drop(sid)
+            return None
+
+        context = self.build(user)
+        with self._lock:
+            self._contexts[sid] = context
+            self._user_sids.setdefault(user_id, set()).add(sid)
+            self._stale.discard(sid)
+        return context
+
+    def get(self, sid, user_id):
+        """Contexto da conexão, recarregado só se faltar ou tiver sido invalidado"""
+        with self._lock:
+            context = self._contexts.get(sid)
+            if context is not None and sid not in self._stale and context['user_id'] == user_id:
+                return context
+        return self.load(sid, user_id)
+
+    def drop(self, sid):
+        with self._lock:
+            context = self._contexts.pop(sid, None)
+            self._stale.discard(sid)
+            if context is not None:
+                sids = self._user_sids.get(context['user_id'])
+                if sids is not None:
+                    sids.discard(sid)
+                    if not sids:
+                        del self._user_sids[context['user_id']]
+
+    def invalidate_user(self, user_id):
+        """Marca as conexões do usuário para recarregar no próximo evento"""
+        with self._lock:
+            self._stale.update(self._user_sids.get(user_id, ()))
+
+    def __len__(self):
+        return len(self._contexts)
@@ -0,0 +1,172 @@
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+from urllib.parse import urlsplit
+
+import socketio
+
+_HEADER = struct.Struct('!I')
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Conexão com o broker encerrada')
+        data += chunk
+    return data
+
+
+def _recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+class LocalBrokerManager(socketio.PubSubManager):
+    """Fila de mensagens do Socket.IO via broker TCP local (``local://host:porta``).
+
+    Substituto do Redis para testes e desenvolvimento com vários workers na
+    mesma máquina; o broker é iniciado com ``python socket_queue.py``.
+    """
+
+    name = 'localbroker'
+
+    def __init__(self, url='local://127.0.0.1:6390', channel='flask-socketio',
+                 write_only=False, logger=None):
+        parts = urlsplit(url)
+        self.address = (parts.hostname or '127.0.0.1', parts.port or 6390)
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _publish(self, data):
+        payload = pickle.dumps(data)
+        with self._publish_lock:
+            for retry in (False, True):
+                try:
+                    if self._publisher is None:
+                        self._publisher = socket.create_connection(self.address)
+                        _send_frame(self._publisher, b'PUB')
+                    _send_frame(self._publisher, payload)
+                    return
+                except OSError:
+                    self._publisher = None
+                    if retry:
+                        raise
+
+    def _listen(self):
+        while True:
+            try:
+                subscriber = socket.create_connection(self.address)
+                _send_frame(subscriber, b'SUB')
+                while True:
+                    yield _recv_frame(subscriber)
+            except OSError:
+                self._get_logger().error('Conexão com o broker perdida; reconectando')
+                self.server.sleep(1)
+
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        broker = self.server
+        role = _recv_frame(self.request)
+
+        if role == b'SUB':
+            with broker.lock:
+                broker.subscribers.append(self.request)
+            # Mantém a conexão aberta até o assinante sair
+            try:
+                while self.request.recv(1):
+                    pass
+            finally:
+                with broker.lock:
+                    broker.subscribers.remove(self.request)
+            return
+
+        try:
+            while True:
+                payload = _recv_frame(self.request)
+                # Entrega na ordem de chegada para todos os assinantes
+                with broker.lock:
+                    for subscriber in list(broker.subscribers):
+                        try:
+                            _send_frame(subscriber, payload)
+                        except OSError:
+                            pass
+        except ConnectionError:
+            pass
+
+
+class LocalBroker(socketserver.ThreadingTCPServer):
+    """Broker pub/sub mínimo usado pelo LocalBrokerManager"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _BrokerHandler)
+        self.lock = threading.Lock()
+        self.subscribers = []
+
+
+def make_client_manager(url=None, channel='flask-socketio'):
+    """Cria o gerenciador de clientes do Socket.IO a partir da URL da fila.
+
+    Suporta ``redis://``/``rediss://`` (produção), ``kafka://``, ``zmq+tcp://``
+    e ``local://`` (broker local para testes); sem URL, o gerenciador é o de
+    um único processo. O gerenciador devolvido chama ``emit_listeners`` para
+    cada emit recebido da fila, em todos os workers, e ``fanout_listeners``
+    com o número de clientes locais de cada emit.
+    """
+    if not url:
+        base = socketio.BaseManager
+    elif url.startswith(('redis://', 'rediss://')):
+        base = socketio.RedisManager
+    elif url.startswith('kafka://'):
+        base = socketio.KafkaManager
+    elif url.startswith('zmq'):
+        base = socketio.ZmqManager
+    elif url.startswith('local://'):
+        base = LocalBrokerManager
+    else:
+        base = socketio.KombuManager
+
+    class ClientManager(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.emit_listeners = []
+            self.fanout_listeners = []
+
+        def get_participants(self, namespace, room):
+            count = 0
+            for participant in super().get_participants(namespace, room):
+                count += 1
+                yield participant
+            for listener in self.fanout_listeners:
+                listener(count)
+
+        def _handle_emit(self, message):
+            for listener in self.emit_listeners:
+                try:
+                    listener(message)
+                except Exception:
+                    self._get_logger().exception('Erro em listener da fila')
+            return super()._handle_emit(message)
+
+    return ClientManager(url, channel=channel) if url else ClientManager()
+
+
+if __name__ == '__main__':
+    import os
+
+    address = urlsplit(os.environ.get('SOCKETIO_MESSAGE_QUEUE', 'local://127.0.0.1:6390'))
+    broker = LocalBroker((address.hostname or '127.0.0.1', address.port or 6390))
+    print(f"📡 Broker local em {broker.server_address[0]}:{broker.server_address[1]}")
+    broker.serve_forever()
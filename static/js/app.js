@@ -269,7 +269,14 @@ function setButtonLoading(button, loading = true) {
 // Service Worker para PWA (básico)
 if ('serviceWorker' in navigator) {
     window.addEventListener('load', () => {
-        navigator.serviceWorker.register('/static/js/sw.js')
+        // A versão antiga era registrada em /static/js/ e servia tudo do cache
+        navigator.serviceWorker.getRegistrations().then(registrations => {
+            registrations
+                .filter(registration => new URL(registration.scope).pathname !== '/')
+                .forEach(registration => registration.unregister());
+        });
+
+        navigator.serviceWorker.register('/sw.js')
             .then(registration => {
                 console.log('SW registrado com sucesso:', registration);
             })
@@ -1,27 +1,86 @@
-const CACHE_NAME = 'esporte-social-v1';
-const urlsToCache = [
-    '/',
-    '/static/css/custom.css',
-    '/static/js/app.js',
+// Servido em /sw.js (escopo: o site todo)
+const STATIC_CACHE = 'esporte-social-static-v2';
+const API_CACHE = 'esporte-social-api-v2';
+const CDN_ASSETS = [
     'https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/css/bootstrap.min.css',
     'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css'
 ];
+// APIs servidas do cache enquanto revalidam em segundo plano
+const STALE_WHILE_REVALIDATE = ['/matches/today'];
 
 self.addEventListener('install', event => {
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then(cache => cache.addAll(urlsToCache))
+        caches.open(STATIC_CACHE)
+            .then(cache => cache.addAll(CDN_ASSETS))
+            .then(() => self.skipWaiting())
     );
 });
 
-self.addEventListener('fetch', event => {
-    event.respondWith(
-        caches.match(event.request)
-            .then(response => {
-                if (response) {
-                    return response;
+self.addEventListener('activate', event => {
+    // Remove os caches antigos (a v1 guardava até as páginas)
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(
+                names.filter(name => name !== STATIC_CACHE && name !== API_CACHE)
+                    .map(name => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Estáticos com hash na URL (?v=) e CDNs nunca mudam: cache primeiro
+function cacheFirst(request) {
+    return caches.open(STATIC_CACHE).then(cache =>
+        cache.match(request).then(cached => cached || fetch(request).then(response => {
+            if (response.ok) {
+                cache.put(request, response.clone());
+            }
+            return response;
+        }))
+    );
+}
+
+// Responde com o que tiver no cache e busca a versão nova em paralelo
+// (revalidação com ETag: 304 quando nada mudou). Se mudou, avisa as abas.
+function staleWhileRevalidate(event) {
+    const request = event.request;
+
+    return caches.open(API_CACHE).then(cache =>
+        cache.match(request).then(cached => {
+            const network = fetch(request).then(response => {
+                if (response.ok) {
+                    const changed = cached && cached.headers.get('ETag') !== response.headers.get('ETag');
+                    cache.put(request, response.clone());
+                    if (changed) {
+                        self.clients.matchAll().then(clients => clients.forEach(client =>
+                            client.postMessage({type: 'api-updated', url: request.url})
+                        ));
+                    }
                 }
-                return fetch(event.request);
-            })
+                return response;
+            });
+
+            if (cached) {
+                event.waitUntil(network.catch(() => undefined));
+                return cached;
+            }
+            return network;
+        })
     );
-});
\ No newline at end of file
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    const url = new URL(request.url);
+    if (url.origin === self.location.origin && STALE_WHILE_REVALIDATE.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event));
+    } else if ((url.origin === self.location.origin && url.pathname.startsWith('/static/') && url.searchParams.has('v'))
+               || CDN_ASSETS.includes(request.url)) {
+        event.respondWith(cacheFirst(request));
+    }
+    // Páginas e demais APIs vão direto para a rede
+});
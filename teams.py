@@ -0,0 +1,171 @@
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+from sqlalchemy.exc import IntegrityError
+
+DEFAULT_TEAM_COLORS = {'primary': '#007BFF', 'secondary': '#FFFFFF'}
+
+# ``colors`` é compartilhado por todas as leituras: não alterar
+TeamInfo = namedtuple('TeamInfo', 'id name api_team_id colors aliases')
+
+
+def alias_key(name):
+    """Chave para comparar nomes de times: sem acento, minúscula e sem hífen"""
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().replace('-', ' ').split())
+
+
+def split_aliases(aliases):
+    return tuple(alias.strip() for alias in aliases.split(',') if alias.strip()) if aliases else ()
+
+
+class TeamRegistry:
+    """Times do banco indexados por id, id da API-Futebol e nome/apelido.
+
+    Imutável: cada busca é um acesso a dicionário montado uma vez. Nomes e
+    apelidos gravados acham o time sem alocar nada; grafias diferentes caem
+    na comparação por ``alias_key``.
+    """
+
+    __slots__ = ('_by_id', '_by_api_id', '_by_name', '_by_key', '_names')
+
+    def __init__(self, teams=()):
+        by_id, by_api_id, by_name, by_key = {}, {}, {}, {}
+        for team in teams:
+            by_id[team.id] = team
+            if team.api_team_id is not None:
+                by_api_id[team.api_team_id] = team
+            for name in (team.name,) + team.aliases:
+                by_name.setdefault(name, team)
+                by_key.setdefault(alias_key(name), team)
+
+        self._by_id = by_id
+        self._by_api_id = by_api_id
+        self._by_name = by_name
+        self._by_key = by_key
+        self._names = tuple(sorted((team.name for team in by_id.values()), key=alias_key))
+
+    def get(self, team_id):
+        return self._by_id.get(team_id)
+
+    def by_api_id(self, api_team_id):
+        return self._by_api_id.get(api_team_id)
+
+    def resolve(self, name):
+        """Time de um nome ou apelido, ou None"""
+        team = self._by_name.get(name)
+        if team is None and name:
+            team = self._by_key.get(alias_key(name))
+        return team
+
+    def names(self):
+        """Nomes canônicos em ordem alfabética"""
+        return self._names
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __len__(self):
+        return len(self._by_id)
+
+
+class Teams:
+    """Registro de times do processo, lido da tabela Team na primeira vez.
+
+    Times novos (vindos da API) são gravados por ``ensure``, que monta outro
+    ``TeamRegistry`` e troca a referência. Um id desconhecido (time criado
+    por outro worker) recarrega o registro, no máximo a cada
+    ``reload_interval`` segundos.
+    """
+
+    def __init__(self, db, team_model, reload_interval=5):
+        self.db = db
+        self.team_model = team_model
+        self.reload_interval = reload_interval
+        self._registry = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def registry(self):
+        registry = self._registry
+        return registry if registry is not None else self.load()
+
+    def load(self):
+        """Lê a tabela Team e troca o registro (precisa de app context)"""
+        Team = self.team_model
+        rows = self.db.session.query(
+            Team.id, Team.name, Team.api_team_id, Team.primary_color, Team.secondary_color, Team.aliases
+        ).all()
+        registry = TeamRegistry(
+            TeamInfo(row.id, row.name, row.api_team_id,
+                     {'primary': row.primary_color, 'secondary': row.secondary_color},
+                     split_aliases(row.aliases))
+            for row in rows
+        )
+        with self._lock:
+            self._registry = registry
+            self._loaded_at = time.monotonic()
+        return registry
+
+    def get(self, team_id):
+        if team_id is None:
+            return None
+        team = self.registry.get(team_id)
+        if team is None and time.monotonic() - self._loaded_at >= self.reload_interval:
+            team = self.load().get(team_id)
+        return team
+
+    def name(self, team_id):
+        team = self.get(team_id)
+        return team.name if team else None
+
+    def colors(self, team_id):
+        team = self.get(team_id)
+        return team.colors if team else DEFAULT_TEAM_COLORS
+
+    def resolve(self, name):
+        return self.registry.resolve(name)
+
+    def names(self):
+        return self.registry.names()
+
+    def ensure(self, api_teams):
+        """Times de ``{api_team_id: nome}`` vindos da API, criando os que faltam.
+
+        Um time já cadastrado pelo nome ou apelido ganha o id da API; os
+        demais são criados com as cores padrão. Retorna
+        ``{api_team_id: TeamInfo}``. Faz commit se gravar algo.
+        """
+        registry = self.registry
+        if all(registry.by_api_id(api_team_id) for api_team_id in api_teams):
+            return {api_team_id: registry.by_api_id(api_team_id) for api_team_id in api_teams}
+
+        # Outro worker pode já ter gravado: confere com o banco antes
+        registry = self.load()
+        Team = self.team_model
+        for api_team_id, name in api_teams.items():
+            if registry.by_api_id(api_team_id):
+                continue
+            team = registry.resolve(name)
+            if team is not None:
+                Team.query.filter_by(id=team.id).update({'api_team_id': api_team_id})
+            else:
+                self.db.session.add(Team(name=name, api_team_id=api_team_id,
+                                         primary_color=DEFAULT_TEAM_COLORS['primary'],
+                                         secondary_color=DEFAULT_TEAM_COLORS['secondary']))
+
+        try:
+            self.db.session.commit()
+        except IntegrityError:
+            # Gravado ao mesmo tempo por outro processo; o que ele gravou vale
+            self.db.session.rollback()
+
+        registry = self.load()
+        missing = [api_team_id for api_team_id in api_teams if registry.by_api_id(api_team_id) is None]
+        if missing:
+            raise LookupError(f'Times sem cadastro: {missing}')
+        return {api_team_id: registry.by_api_id(api_team_id) for api_team_id in api_teams}
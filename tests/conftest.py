@@ -0,0 +1,105 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as application  # noqa: E402
+
+
+@pytest.fixture
+def app_config():
+    """Chaves da configuração trocadas no ``app``; um módulo de teste
+    sobrescreve este fixture para mudar alguma"""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    """Aplicação de teste com SQLite em arquivo (aceita conexões concorrentes)"""
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'SOCKETIO_MESSAGE_QUEUE': None,
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'RATELIMIT_ENABLED': False,
+        'FIXTURE_POLLER_ENABLED': False,
+        'FRAGMENT_CACHE_ENABLED': False,
+        'CHAT_ARCHIVE_DIR': str(tmp_path / 'chat_archive'),
+        'JINJA_BYTECODE_CACHE_DIR': str(tmp_path / 'jinja_bytecode'),
+        **app_config
+    }
+    flask_app = application.create_app('testing', **settings)
+    with flask_app.app_context():
+        application.db.create_all()
+    application.chat_history.invalidate()
+
+    yield flask_app
+
+    with flask_app.app_context():
+        application.db.session.remove()
+        application.db.engine.dispose()
+
+
+@pytest.fixture
+def seed(app):
+    """Dois times, dois jogos, um bar e dois torcedores; retorna os ids
+    (dos jogos, o local em ``matches`` e o da API em ``api_matches``)"""
+    db = application.db
+    with app.app_context():
+        flamengo = application.Team(name='Flamengo', aliases='Fla')
+        vasco = application.Team(name='Vasco')
+        db.session.add_all([flamengo, vasco])
+        db.session.flush()
+
+        matches = [
+            application.Match(api_match_id=9000 + index, home_team_id=flamengo.id, away_team_id=vasco.id,
+                              match_date=datetime(2026, 5, 10 + index, 16))
+            for index in range(2)
+        ]
+        fans = [
+            application.User(username=f'fan{index}', email=f'fan{index}@example.com', password_hash='-',
+                             user_type='torcedor', favorite_team_id=flamengo.id)
+            for index in range(2)
+        ]
+        bar = application.User(username='bar', email='bar@example.com', password_hash='-',
+                               user_type='estabelecimento', establishment_name='Bar do Zé')
+        db.session.add_all(matches + fans + [bar])
+        db.session.commit()
+        application.teams.load()
+
+        return {
+            'flamengo': flamengo.id,
+            'vasco': vasco.id,
+            'matches': [match.id for match in matches],
+            'api_matches': [match.api_match_id for match in matches],
+            'fans': [fan.id for fan in fans],
+            'bar': bar.id
+        }
+
+
+@pytest.fixture
+def client_for(app):
+    """Cliente HTTP já logado como ``user_id``"""
+    def make(user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        return client
+    return make
+
+
+@pytest.fixture
+def add_messages(app):
+    """Grava ``count`` mensagens na sala, duas por segundo a partir de
+    ``start`` (timestamps repetidos de propósito)"""
+    def add(user_id, count, room='match-1', start=datetime(2024, 3, 1, 20, 0)):
+        with app.app_context():
+            application.db.session.add_all(
+                application.ChatMessage(user_id=user_id, room_id=room, message=f'msg {index}',
+                                        timestamp=start + timedelta(seconds=index // 2))
+                for index in range(count)
+            )
+            application.db.session.commit()
+    return add
@@ -0,0 +1,206 @@
+import fnmatch
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+import cache
+from cache import MemoryBackend, RedisBackend, TTLCache, cache_response
+
+
+class FakeRedis:
+    """O pouco de Redis que o RedisBackend usa (SET NX PX, GET, script de liberação)"""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        with self._lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, pattern)]
+
+    def register_script(self, source):
+        def release(keys, args):
+            with self._lock:
+                if self.data.get(keys[0]) == args[0]:
+                    del self.data[keys[0]]
+                    return 1
+                return 0
+        return release
+
+
+def redis_backend(client):
+    """RedisBackend sobre o FakeRedis (sem o pacote redis instalado)"""
+    backend = RedisBackend.__new__(RedisBackend)
+    backend.client = client
+    backend.prefix = 'test:'
+    backend.fill_lock_ms = 5000
+    backend.evictions = backend.expirations = 0
+    backend._release = client.register_script(RedisBackend.RELEASE_SCRIPT)
+    return backend
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """Os caches criados no teste não ficam no registro do processo"""
+    monkeypatch.setattr(cache, '_registry', dict(cache._registry))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    return now
+
+
+def run_concurrently(target, count):
+    results = []
+    barrier = threading.Barrier(count)
+
+    def run():
+        barrier.wait()
+        results.append(target())
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_memory_backend_is_lru_with_ttl(clock):
+    backend = MemoryBackend(max_entries=2)
+    backend.set('a', 1, ttl=10)
+    backend.set('b', 2, ttl=10)
+    backend.get('a')
+    backend.set('c', 3, ttl=10)
+
+    assert backend.get('b') == (False, None)
+    assert backend.get('a') == (True, 1)
+    assert backend.evictions == 1
+
+    clock[0] += 11
+    assert backend.get('a') == (False, None)
+    assert backend.expirations == 1
+
+
+def test_tags_invalidate_entries():
+    ttl_cache = TTLCache(MemoryBackend(), default_ttl=60, name='test-tags')
+    ttl_cache.set('matches:today', ['Fla x Vasco'], tags=('matches',))
+
+    assert ttl_cache.get('matches:today', tags=('matches',)) == (True, ['Fla x Vasco'])
+    ttl_cache.invalidate('matches')
+    assert ttl_cache.get('matches:today', tags=('matches',)) == (False, None)
+
+
+def test_get_or_set_loads_once_per_process():
+    ttl_cache = TTLCache(MemoryBackend(), default_ttl=60, name='test-single-flight')
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'bares'
+
+    assert run_concurrently(lambda: ttl_cache.get_or_set('places:cell', loader), 10) == ['bares'] * 10
+    assert len(calls) == 1
+    assert ttl_cache.stats()['loads'] == 1
+    assert ttl_cache._key_locks == {}
+
+
+def test_uncached_loads_never_overlap():
+    ttl_cache = TTLCache(MemoryBackend(), default_ttl=60, name='test-key-locks')
+    running, overlaps = [0], []
+
+    def loader():
+        running[0] += 1
+        overlaps.append(running[0] > 1)
+        time.sleep(0.001)
+        running[0] -= 1
+        return None
+
+    # Sem nada guardado cada chamada carrega, sempre uma de cada vez
+    for _ in range(50):
+        run_concurrently(lambda: ttl_cache.get_or_set('k', loader, cacheable=lambda value: False), 8)
+    assert len(overlaps) == 400 and not any(overlaps)
+    assert ttl_cache._key_locks == {}
+
+
+def test_uncacheable_results_are_not_stored():
+    ttl_cache = TTLCache(MemoryBackend(), default_ttl=60, name='test-cacheable')
+
+    ttl_cache.get_or_set('k', lambda: {'error': 'timeout'}, cacheable=lambda value: 'error' not in value)
+    assert ttl_cache.get('k') == (False, None)
+
+
+def test_redis_fill_is_single_flight_across_workers():
+    client = FakeRedis()
+    workers = [TTLCache(redis_backend(client), default_ttl=60, name=f'test-worker-{index}')
+               for index in range(4)]
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'bares'
+
+    workers = iter(workers)
+    results = run_concurrently(lambda: next(workers).get_or_set('places:cell', loader), 4)
+
+    assert results == ['bares'] * 4
+    assert len(calls) == 1
+    assert not any(key.startswith('test:fill:') for key in client.data)
+
+
+def test_redis_waiter_loads_itself_when_holder_never_fills():
+    client = FakeRedis()
+    holder = redis_backend(client)
+    assert holder.acquire_fill('places:cell')
+
+    worker = TTLCache(redis_backend(client), default_ttl=60, name='test-waiter', fill_wait=0.1)
+    assert worker.get_or_set('places:cell', lambda: 'bares') == 'bares'
+    assert worker.stats()['fill_waits'] == 1
+
+
+def test_redis_release_keeps_a_lock_taken_by_another_worker():
+    client = FakeRedis()
+    backend = redis_backend(client)
+    token = backend.acquire_fill('k')
+    assert backend.acquire_fill('k') is None
+
+    # A trava expirou e outro worker a pegou: a liberação atrasada não a apaga
+    client.data['test:fill:k'] = 'outro'
+    backend.release_fill('k', token)
+    assert client.data['test:fill:k'] == 'outro'
+
+
+def test_cache_response_rebuilds_each_hit_and_skips_errors():
+    flask_app = Flask(__name__)
+    ttl_cache = TTLCache(MemoryBackend(), default_ttl=60, name='test-responses')
+    calls = []
+
+    @cache_response(cache=ttl_cache)
+    def view(status):
+        calls.append(status)
+        return jsonify({'status': status}), status
+
+    with flask_app.app_context():
+        first, second = view(200), view(200)
+        assert first is not second
+        assert first.get_json() == second.get_json() == {'status': 200}
+
+        view(500)
+        view(500)
+
+    assert calls == [200, 500, 500]
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import app as application
+from chat_history import decode_cursor
+
+ROOM = 'match-1'
+CUTOFF = datetime(2024, 3, 1, 20, 0, 5)
+
+
+def messages_of(page):
+    return [message['message'] for message in page]
+
+
+def walk_back(limit):
+    pages, before = [], None
+    while True:
+        messages, has_more = application.chat_history.page(ROOM, limit=limit, before=before)
+        pages.append(messages)
+        if not has_more:
+            return [text for page in reversed(pages) for text in messages_of(page)]
+        before = decode_cursor(messages[0]['cursor'])
+
+
+def walk_forward(limit):
+    found, after = [], (datetime(2000, 1, 1), None)
+    while True:
+        messages, has_more = application.chat_history.page(ROOM, limit=limit, after=after)
+        found += messages_of(messages)
+        if not has_more:
+            return found
+        after = decode_cursor(messages[-1]['cursor'])
+
+
+def archive(app, batch_size=3):
+    application.chat_archiver.batch_size = batch_size
+    with app.app_context():
+        return application.chat_archiver.archive_room(ROOM, CUTOFF, sleep=lambda seconds: None)
+
+
+def test_archive_moves_old_messages_out_of_the_database(app, seed, add_messages):
+    add_messages(seed['fans'][0], 14)
+
+    archived, batches = archive(app)
+
+    assert (archived, batches) == (10, 4)
+    assert len(application.chat_archive.segments(ROOM)) == 4
+    with app.app_context():
+        assert application.ChatMessage.query.filter_by(room_id=ROOM).count() == 4
+
+
+def test_cursors_cross_from_database_into_archive(app, seed, add_messages):
+    add_messages(seed['fans'][0], 14)
+    archive(app)
+    expected = [f'msg {index}' for index in range(14)]
+
+    with app.app_context():
+        assert walk_back(limit=3) == expected
+        assert walk_forward(limit=3) == expected
+
+        application.chat_history.invalidate()
+        history = application.chat_history.get(ROOM)
+        assert [message['message'] for message in history] == expected
+
+
+def test_compaction_keeps_pages_identical(app, seed, add_messages):
+    add_messages(seed['fans'][0], 14)
+    archive(app)
+
+    with app.app_context():
+        before = walk_back(limit=4)
+        assert application.chat_archive.compact(ROOM) == 4
+        assert len(application.chat_archive.segments(ROOM)) == 1
+        assert walk_back(limit=4) == before
+
+
+def test_rerun_after_crash_does_not_duplicate(app, seed, add_messages):
+    add_messages(seed['fans'][0], 14)
+    archive(app)
+
+    # Segmento gravado mas o DELETE não chegou ao banco: as mensagens voltam
+    with app.app_context():
+        application.db.session.add_all(
+            application.ChatMessage(id=record['id'], user_id=record['user_id'], room_id=ROOM,
+                                    message=record['message'], timestamp=record['timestamp'])
+            for record in application.chat_archive.page(ROOM, 2)[0]
+        )
+        application.db.session.commit()
+
+    archived, _ = archive(app)
+
+    assert archived == 0
+    with app.app_context():
+        assert walk_back(limit=5) == [f'msg {index}' for index in range(14)]
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+
+import app as application
+from chat_history import decode_cursor, encode_cursor
+
+ROOM = 'match-1'
+
+
+def walk_back(limit):
+    """Todas as mensagens da sala, página a página com ``before``"""
+    pages, before = [], None
+    while True:
+        messages, has_more = application.chat_history.page(ROOM, limit=limit, before=before)
+        pages.append(messages)
+        if not has_more:
+            return [message['message'] for page in reversed(pages) for message in page]
+        before = decode_cursor(messages[0]['cursor'])
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 3, 1, 20, 0, 5, 123456)
+
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+    assert decode_cursor(encode_cursor(timestamp)) == (timestamp, None)
+    with pytest.raises(ValueError):
+        decode_cursor('ontem.1')
+
+
+def test_pages_walk_back_through_equal_timestamps(app, seed, add_messages):
+    add_messages(seed['fans'][0], 11)
+
+    with app.app_context():
+        latest, has_more = application.chat_history.page(ROOM, limit=4)
+        assert [message['message'] for message in latest] == ['msg 7', 'msg 8', 'msg 9', 'msg 10']
+        assert has_more
+
+        assert walk_back(limit=3) == [f'msg {index}' for index in range(11)]
+
+
+def test_after_cursor_returns_newer_messages(app, seed, add_messages):
+    add_messages(seed['fans'][0], 6)
+
+    with app.app_context():
+        everything, _ = application.chat_history.page(ROOM, limit=6)
+        newer, has_more = application.chat_history.page(
+            ROOM, limit=10, after=decode_cursor(everything[1]['cursor']))
+
+    assert [message['message'] for message in newer] == ['msg 2', 'msg 3', 'msg 4', 'msg 5']
+    assert not has_more
+
+
+def test_messages_endpoint_rejects_bad_cursor(app, seed, client_for, add_messages):
+    add_messages(seed['fans'][0], 3)
+    client = client_for(seed['fans'][0])
+
+    assert client.get(f'/chat/{ROOM}/messages?before=xyz').status_code == 400
+
+    body = client.get(f'/chat/{ROOM}/messages?limit=2').get_json()
+    assert [message['message'] for message in body['messages']] == ['msg 1', 'msg 2']
+    assert body['has_more']
@@ -0,0 +1,81 @@
+import threading
+import time
+from datetime import datetime
+
+import app as application
+import chat_queue
+from chat_queue import ChatWriteBehind
+
+
+class FailingWriter(ChatWriteBehind):
+    """Write-behind com o banco fora do ar"""
+
+    def _write(self, batch):
+        with self._lock:
+            self._stats['failed_flushes'] += 1
+        return False
+
+
+def test_messages_are_written_in_batches_in_order(app, seed):
+    writer = application.chat_writer
+    writer.batch_size = 2
+    for index in range(5):
+        writer.enqueue(seed['fans'][0], 'match-1', f'msg {index}')
+
+    assert writer.flush() == 5
+    with app.app_context():
+        stored = [message.message for message in application.ChatMessage.query.order_by('id')]
+    assert stored == [f'msg {index}' for index in range(5)]
+    assert writer.metrics()['queue_depth'] == 0
+
+
+def test_failed_batches_are_requeued_up_to_the_limit(capsys):
+    writer = FailingWriter(None, None, batch_size=3, max_pending=5)
+    for index in range(4):
+        writer.enqueue(1, 'match-1', f'msg {index}')
+
+    assert writer.flush() == 0
+    assert [message['message'] for message in writer._pending] == [f'msg {index}' for index in range(4)]
+
+    for index in range(4, 8):
+        writer.enqueue(1, 'match-1', f'msg {index}')
+    writer.flush()
+
+    metrics = writer.metrics()
+    assert [message['message'] for message in writer._pending] == [f'msg {index}' for index in range(3, 8)]
+    assert (metrics['queue_depth'], metrics['queue_capacity'], metrics['dropped']) == (5, 5, 3)
+    assert capsys.readouterr().out.count('dropping oldest') == 1
+
+
+def test_metrics_expose_dropped_messages(app, seed):
+    body = app.test_client().get('/metrics').get_data(as_text=True)
+
+    assert 'chat_messages_dropped_total 0' in body
+    assert f"chat_write_queue_capacity {app.config['CHAT_MAX_PENDING']}" in body
+
+
+def test_queue_order_follows_timestamps(monkeypatch):
+    class SlowClock(datetime):
+        """Cede a vez a outra thread logo depois de ler o relógio"""
+
+        @classmethod
+        def utcnow(cls):
+            now = datetime.utcnow()
+            time.sleep(0.0001)
+            return now
+
+    monkeypatch.setattr(chat_queue, 'datetime', SlowClock)
+    writer = FailingWriter(None, None, batch_size=100000, max_pending=100000)
+
+    def enqueue_many():
+        for index in range(300):
+            writer.enqueue(1, 'match-1', f'msg {index}')
+
+    threads = [threading.Thread(target=enqueue_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timestamps = [message['timestamp'] for message in writer._pending]
+    assert len(timestamps) == 1200 and timestamps == sorted(timestamps)
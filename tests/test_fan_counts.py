@@ -0,0 +1,128 @@
+import threading
+
+import app as application
+from fan_counts import NO_ESTABLISHMENT, interest_deltas
+
+
+def counts(app):
+    """{(jogo, estabelecimento, time): torcedores} com contagem positiva"""
+    with app.app_context():
+        Count = application.MatchFanCount
+        return {
+            (row.match_id, row.establishment_id, row.supporting_team_id): row.fans
+            for row in Count.query.filter(Count.fans > 0)
+        }
+
+
+def drift(app):
+    with app.app_context():
+        return application.fan_counts.drift()
+
+
+def test_interest_deltas_moves_fan_between_keys():
+    previous = {1: (None, 10), 2: (5, 10)}
+    current = {1: (None, 20), 2: (5, 10), 3: (7, 10)}
+
+    assert interest_deltas(previous, current) == {
+        (1, NO_ESTABLISHMENT, 10): -1,
+        (1, NO_ESTABLISHMENT, 20): 1,
+        (3, 7, 10): 1
+    }
+
+
+def test_string_ids_from_dashboard_move_the_count(app, seed, client_for):
+    client = client_for(seed['fans'][0])
+    match_id, api_match_id = seed['matches'][0], seed['api_matches'][0]
+
+    # Como o dashboard.html envia: o id da API do card, em string, e o nome do time
+    response = client.post('/match/interest', json={
+        'match_id': str(api_match_id), 'supporting_team': 'Flamengo', 'ranking': '2'
+    })
+    assert response.status_code == 200
+    assert counts(app) == {(match_id, NO_ESTABLISHMENT, seed['flamengo']): 1}
+    with app.app_context():
+        interest = application.UserMatchInterest.query.one()
+        assert (interest.match_id, interest.ranking) == (match_id, 2)
+
+    response = client.post('/match/interest', json={
+        'match_id': str(api_match_id), 'supporting_team_id': str(seed['vasco'])
+    })
+    assert response.status_code == 200
+    assert counts(app) == {(match_id, NO_ESTABLISHMENT, seed['vasco']): 1}
+    assert drift(app) == {}
+
+
+def test_team_and_establishment_changes_keep_counts_exact(app, seed, client_for):
+    client = client_for(seed['fans'][0])
+    first, second = seed['matches']
+    api_first, api_second = seed['api_matches']
+
+    client.post('/match/interest/batch', json={'interests': [
+        {'match_id': api_first, 'supporting_team': 'Fla'},
+        {'match_id': api_second, 'supporting_team_id': seed['vasco'], 'establishment_id': str(seed['bar'])}
+    ]})
+    client.post('/match/interest/batch', json={'interests': [
+        {'match_id': api_first, 'supporting_team_id': seed['flamengo'], 'establishment_id': seed['bar']},
+        {'match_id': api_second, 'supporting_team_id': seed['flamengo'], 'establishment_id': ''}
+    ]})
+
+    assert counts(app) == {
+        (first, seed['bar'], seed['flamengo']): 1,
+        (second, NO_ESTABLISHMENT, seed['flamengo']): 1
+    }
+    assert drift(app) == {}
+
+
+def test_invalid_ids_are_rejected(app, seed, client_for):
+    client = client_for(seed['fans'][0])
+    api_match_id = seed['api_matches'][0]
+
+    # O id local não é um id da API: jogo desconhecido, como o 4242
+    for interest in ({'match_id': 'abc', 'supporting_team_id': seed['flamengo']},
+                     {'match_id': seed['matches'][0], 'supporting_team_id': seed['flamengo']},
+                     {'match_id': 4242, 'supporting_team_id': seed['flamengo']},
+                     {'match_id': api_match_id, 'supporting_team_id': 'x'},
+                     {'match_id': api_match_id, 'supporting_team_id': seed['flamengo'],
+                      'establishment_id': 'bar'},
+                     {'supporting_team_id': seed['flamengo']}):
+        assert client.post('/match/interest', json=interest).status_code == 400
+
+    for unknown in ('abc', 4242):
+        response = client.post('/match/interest/batch', json={'interests': [
+            {'match_id': api_match_id, 'supporting_team_id': seed['flamengo']},
+            {'match_id': unknown, 'supporting_team_id': seed['flamengo']}
+        ]})
+        assert response.status_code == 400
+    assert counts(app) == {}
+
+
+def test_concurrent_first_saves_count_once(app, seed, client_for):
+    user_id, match_id = seed['fans'][0], seed['matches'][0]
+    api_match_id = seed['api_matches'][0]
+
+    # O mesmo torcedor, de duas abas, grava ao mesmo tempo o primeiro
+    # interesse no jogo; repetido algumas vezes para pegar a corrida
+    for _ in range(5):
+        clients = [client_for(user_id), client_for(user_id)]
+        barrier = threading.Barrier(len(clients))
+        statuses = []
+
+        def save(client):
+            barrier.wait()
+            statuses.append(client.post('/match/interest', json={
+                'match_id': api_match_id, 'supporting_team_id': seed['flamengo']
+            }).status_code)
+
+        threads = [threading.Thread(target=save, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert statuses == [200, 200]
+        assert counts(app) == {(match_id, NO_ESTABLISHMENT, seed['flamengo']): 1}
+
+        with app.app_context():
+            application.UserMatchInterest.query.delete()
+            application.MatchFanCount.query.delete()
+            application.db.session.commit()
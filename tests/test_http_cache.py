@@ -0,0 +1,90 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask, jsonify, request, url_for
+
+from http_cache import StaticFingerprints, finalize_response
+
+
+@pytest.fixture
+def plain_app():
+    """Aplicação mínima só com o ``finalize_response``"""
+    flask_app = Flask(__name__)
+
+    @flask_app.route('/data')
+    def data():
+        response = jsonify({'matches': ['Flamengo x Vasco'] * int(request.args.get('size', 100))})
+        response.add_etag()
+        return response
+
+    @flask_app.route('/data', methods=['POST'])
+    def post_data():
+        return jsonify({'matches': ['Flamengo x Vasco'] * 100})
+
+    flask_app.after_request(lambda response: finalize_response(response, request, min_size=500))
+    return flask_app
+
+
+def test_large_json_is_gzipped_with_its_own_etag(plain_app):
+    client = plain_app.test_client()
+
+    plain = client.get('/data')
+    zipped = client.get('/data', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+    assert zipped.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+
+
+def test_revalidation_answers_304_per_representation(plain_app):
+    client = plain_app.test_client()
+    plain_etag = client.get('/data').headers['ETag']
+    gzip_etag = client.get('/data', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    assert client.get('/data', headers={'If-None-Match': plain_etag}).status_code == 304
+    response = client.get('/data', headers={'If-None-Match': gzip_etag, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    # O ETag de uma representação não vale para a outra
+    assert client.get('/data', headers={'If-None-Match': gzip_etag}).status_code == 200
+
+
+def test_small_bodies_and_posts_are_left_alone(plain_app):
+    client = plain_app.test_client()
+
+    small = client.get('/data?size=1', headers={'Accept-Encoding': 'gzip'})
+    posted = client.post('/data', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in small.headers
+    assert 'Content-Encoding' not in posted.headers
+
+
+def test_fingerprint_follows_file_content(tmp_path):
+    fingerprints = StaticFingerprints()
+    path = tmp_path / 'app.js'
+    path.write_text('console.log(1);')
+    first = fingerprints.get(str(tmp_path), 'app.js')
+
+    assert fingerprints.get(str(tmp_path), 'app.js') == first
+    path.write_text('console.log(2);')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert fingerprints.get(str(tmp_path), 'app.js') not in (None, first)
+    assert fingerprints.get(str(tmp_path), 'missing.js') is None
+
+
+def test_fingerprinted_static_is_immutable(app):
+    with app.test_request_context():
+        url = url_for('static', filename='js/app.js')
+    assert '?v=' in url
+
+    client = app.test_client()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == app.config['STATIC_MAX_AGE']
+
+    etag = response.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,128 @@
+import pytest
+
+import app as application
+import ratelimit
+from ratelimit import MemoryBucketStore, QuickMessageMerger, RateLimiter, parse_limit, user_ip_limits
+
+
+@pytest.fixture
+def app_config():
+    return {'RATELIMIT_ENABLED': True, 'RATELIMIT_INTEREST': '2/minute,10/minute',
+            'QUICK_MESSAGE_MERGE_WINDOW': 60}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste para ``time.monotonic`` do módulo"""
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_parse_limit():
+    assert parse_limit('20/minute') == (20, 20 / 60)
+    assert parse_limit('5/10s') == (5, 0.5)
+    assert parse_limit('100/hours') == (100, 100 / 3600)
+    assert user_ip_limits('10/10s, 200/10s') == {'user': '10/10s', 'ip': '200/10s'}
+    assert user_ip_limits('10/10s') == {'user': '10/10s', 'ip': None}
+
+
+def test_bucket_refills_with_time(clock):
+    store = MemoryBucketStore()
+
+    assert store.take('k', 2, 1.0) == (True, 0.0)
+    assert store.take('k', 2, 1.0) == (True, 0.0)
+    allowed, retry_after = store.take('k', 2, 1.0)
+    assert not allowed and retry_after == pytest.approx(1.0)
+
+    clock[0] += 1
+    assert store.take('k', 2, 1.0)[0]
+
+
+def test_user_and_ip_buckets_are_separate(clock):
+    limiter = RateLimiter(rules={'socket:message': {'user': '1/minute', 'ip': '3/minute'}})
+
+    assert limiter.hit('socket:message', user_id=1, ip='10.0.0.1')[0]
+    assert not limiter.hit('socket:message', user_id=1, ip='10.0.0.1')[0]
+    # Outros torcedores no mesmo bar (IP) ainda passam até o limite do IP
+    assert limiter.hit('socket:message', user_id=2, ip='10.0.0.1')[0]
+    assert not limiter.hit('socket:message', user_id=3, ip='10.0.0.1')[0]
+    assert limiter.stats() == {'socket:message': {'allowed': 2, 'limited': 2}}
+
+
+def test_disabled_or_unknown_rule_always_allows(clock):
+    limiter = RateLimiter(rules={'http:matches': {'user': '1/minute'}}, enabled=False)
+
+    assert all(limiter.hit('http:matches', user_id=1)[0] for _ in range(5))
+    limiter.enabled = True
+    assert all(limiter.hit('http:other', user_id=1)[0] for _ in range(5))
+
+
+def test_route_answers_429_with_retry_after(app, seed, client_for):
+    client = client_for(seed['fans'][0])
+    interest = {'match_id': seed['api_matches'][0], 'supporting_team_id': seed['flamengo']}
+
+    assert [client.post('/match/interest', json=interest).status_code for _ in range(2)] == [200, 200]
+    response = client.post('/match/interest', json=interest)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+    # O limite é por torcedor: outro no mesmo IP segue passando
+    other = client_for(seed['fans'][1])
+    assert other.post('/match/interest', json=interest).status_code == 200
+
+
+def test_quick_messages_merge_into_one_total(clock):
+    merger = QuickMessageMerger(window=2.0)
+    merged = []
+    merger.merge_listeners.append(lambda *args: merged.append(args))
+
+    assert merger.offer('match-1', 'GOL', sender='ana')
+    assert not merger.offer('match-1', 'GOL', sender='bia')
+    assert not merger.offer('match-1', 'GOL', sender='caio')
+    assert merger.offer('match-1', 'Uhh', sender='ana')
+    merger.flush()
+    assert merged == []
+
+    clock[0] += 2
+    merger.flush()
+    assert merged == [('match-1', 'GOL', 3, 'caio')]
+    assert merger.merged == 2
+    assert merger.offer('match-1', 'GOL', sender='ana')
+
+
+def test_merged_total_is_persisted_and_broadcast(app, seed, client_for):
+    sockets = []
+    for user_id in seed['fans']:
+        client = client_for(user_id)
+        socket = application.socketio.test_client(app, flask_test_client=client)
+        socket.emit('join', {'room': 'match-1'})
+        sockets.append(socket)
+
+    for socket in sockets * 3:
+        socket.emit('message', {'room': 'match-1', 'message': '🎉 GOOOOL!', 'type': 'quick'})
+    with app.app_context():
+        application.quick_merger.flush(force=True)
+        application.chat_writer.flush()
+        stored = [(message.user_id, message.message) for message in application.ChatMessage.query]
+        history = [entry['message'] for entry in application.chat_history.get('match-1')]
+
+    # Seis envios: o primeiro, já gravado, e as cinco repetições
+    assert stored == [(seed['fans'][0], '🎉 GOOOOL!'), (seed['fans'][1], '🎉 GOOOOL! x5')]
+    assert history == ['🎉 GOOOOL!', '🎉 GOOOOL! x5']
+    received = [event['args']['message'] for event in sockets[0].get_received() if event['name'] == 'message']
+    assert received == ['🎉 GOOOOL!', '🎉 GOOOOL! x5']
+
+
+def test_single_repeat_is_not_counted_twice(app, seed, client_for):
+    socket = application.socketio.test_client(app, flask_test_client=client_for(seed['fans'][0]))
+    socket.emit('join', {'room': 'match-1'})
+
+    for _ in range(2):
+        socket.emit('message', {'room': 'match-1', 'message': 'Uhhh', 'type': 'quick'})
+    with app.app_context():
+        application.quick_merger.flush(force=True)
+        application.chat_writer.flush()
+        stored = [message.message for message in application.ChatMessage.query]
+
+    assert stored == ['Uhhh', 'Uhhh x1']
@@ -0,0 +1,82 @@
+import pytest
+
+import app as application
+
+
+@pytest.fixture
+def socket(app, seed, client_for):
+    return application.socketio.test_client(app, flask_test_client=client_for(seed['fans'][0]))
+
+
+def joined(socket, room):
+    socket.emit('join', {'room': room})
+    return 'join_rejected' not in [event['name'] for event in socket.get_received()]
+
+
+@pytest.mark.parametrize('room', ['sync:profiles', 'sync:presence', 'live:match:999', 'live:match:abc',
+                                  'live:team:Palmeiras', 'live:outro:1', 'live:', 'fans:match:1', ''])
+def test_reserved_and_unknown_rooms_are_rejected(socket, room):
+    assert not joined(socket, room)
+
+
+def test_known_live_rooms_and_chat_rooms_are_accepted(socket):
+    assert joined(socket, 'live:match:9001')
+    assert joined(socket, 'live:team:Flamengo')
+    assert joined(socket, 'match-1')
+
+
+def test_live_match_rooms_use_the_api_id(socket, seed):
+    # O id local 1 não é o jogo 1 da API: a sala dele não existe
+    assert not joined(socket, f"live:match:{seed['matches'][0]}")
+
+
+def test_follow_matches_only_joins_known_matches(app, seed, socket):
+    followed = socket.emit('follow_matches', {'match_ids': [9000, '9001', 'x', 4242, seed['matches'][0]]},
+                           callback=True)
+
+    local_ids = seed['matches']
+    assert followed == {'9000': local_ids[0], '9001': local_ids[1]}
+    manager = application.socketio.server.manager
+    sid = manager.sid_from_eio_sid(socket.eio_sid, '/')
+    rooms = {room for room in manager.get_rooms(sid, '/') if room.startswith(('live:match:', 'fans:match:'))}
+    assert rooms == {'live:match:9000', 'live:match:9001',
+                     f'fans:match:{local_ids[0]}', f'fans:match:{local_ids[1]}'}
+
+
+def test_messages_to_server_rooms_are_dropped(app, socket):
+    socket.emit('message', {'room': 'sync:profiles', 'message': 'oi'})
+    socket.emit('message', {'room': 'live:team:Flamengo', 'message': 'oi'})
+    socket.emit('message', {'room': 'fans:match:1', 'message': 'oi'})
+
+    with app.app_context():
+        application.chat_writer.flush()
+        assert application.ChatMessage.query.count() == 0
+
+
+def test_messages_need_a_joined_room(app, socket):
+    manager = application.socketio.server.manager
+    sid = manager.sid_from_eio_sid(socket.eio_sid, '/')
+
+    for data in ({'message': 'oi'}, {'room': 123, 'message': 'oi'}, {'room': 'match-1'},
+                 {'room': 'match-2', 'message': 'oi'}, {'room': sid, 'message': 'oi'}, ['match-1']):
+        socket.emit('message', data)
+    socket.emit('join', {'room': 'match-1'})
+    socket.emit('message', {'room': 'match-1', 'message': 'oi'})
+
+    with app.app_context():
+        application.chat_writer.flush()
+        assert [(message.room_id, message.message) for message in application.ChatMessage.query] == [
+            ('match-1', 'oi')]
+
+
+def test_leave_only_rooms_the_client_is_in(socket):
+    manager = application.socketio.server.manager
+    sid = manager.sid_from_eio_sid(socket.eio_sid, '/')
+    socket.emit('join', {'room': 'match-1'})
+
+    for data in ({}, {'room': None}, {'room': sid}, {'room': 'match-2'}):
+        socket.emit('leave', data)
+    assert {sid, 'match-1'} <= set(manager.get_rooms(sid, '/'))
+
+    socket.emit('leave', {'room': 'match-1'})
+    assert 'match-1' not in set(manager.get_rooms(sid, '/'))
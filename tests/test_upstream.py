@@ -0,0 +1,176 @@
+import threading
+
+import pytest
+import requests
+
+import upstream
+from upstream import CircuitBreaker, CircuitOpenError, UpstreamClient
+
+URL = 'https://api.example.com/v1/jogos'
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code), response=self)
+
+
+class HTMLResponse(FakeResponse):
+    """200 com uma página de erro no lugar do JSON"""
+
+    def json(self):
+        raise ValueError('Expecting value: line 1 column 1 (char 0)')
+
+
+class FakeSession:
+    """Devolve as respostas (ou exceções) de ``script`` em ordem"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(upstream.time, 'time', lambda: now[0])
+    return now
+
+
+def make_client(session, **options):
+    client = UpstreamClient(sleep=lambda seconds: None, **options)
+    client._session = lambda host: session
+    return client
+
+
+def test_breaker_opens_and_allows_one_trial_when_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock[0] += 30
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(breaker.allow())) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+
+    # A tentativa falhou: reabre e espera de novo
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow() and breaker.allow()
+
+
+def test_half_open_trial_that_never_reports_frees_the_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    clock[0] += 30
+    assert breaker.allow()
+
+
+def test_retries_then_succeeds():
+    session = FakeSession(requests.exceptions.ConnectionError(), FakeResponse(503), FakeResponse(200, {'ok': 1}))
+    client = make_client(session, retries=2)
+
+    assert client.get_json(URL) == {'ok': 1}
+    assert session.calls == 3
+    stats = client.stats()['endpoints'][URL]
+    assert (stats['calls'], stats['retries'], stats['errors']) == (1, 2, 0)
+
+
+def test_client_error_is_not_retried():
+    session = FakeSession(FakeResponse(404))
+    client = make_client(session, retries=2)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(URL)
+    assert session.calls == 1
+
+
+def test_open_circuit_serves_last_good_response(clock):
+    session = FakeSession(FakeResponse(200, {'jogos': [1]}), FakeResponse(500), FakeResponse(500))
+    client = make_client(session, retries=0, failure_threshold=2, reset_timeout=30)
+
+    assert client.get_json(URL, params={'key': 'secreta', 'data': 'hoje'}) == {'jogos': [1]}
+    # As falhas devolvem a resposta anterior (a chave da API não entra na chave)
+    for _ in range(2):
+        assert client.get_json(URL, params={'key': 'outra', 'data': 'hoje'}) == {'jogos': [1]}
+    assert client.stats()['circuits'] == {'https://api.example.com': 'open'}
+
+    calls = session.calls
+    assert client.get_json(URL, params={'data': 'hoje'}) == {'jogos': [1]}
+    assert session.calls == calls
+    with pytest.raises(CircuitOpenError):
+        client.get_json(URL, params={'data': 'amanhã'})
+    assert client.stats()['endpoints'][URL]['short_circuited'] == 2
+
+
+def test_invalid_json_counts_as_failure(clock):
+    session = FakeSession(HTMLResponse(), HTMLResponse(), FakeResponse(200, {'ok': 1}))
+    client = make_client(session, retries=2, failure_threshold=2, reset_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            client.get_json(URL)
+    assert session.calls == 2
+    assert client.stats()['circuits'] == {'https://api.example.com': 'open'}
+
+    # A chamada de teste em half-open também resolve com o corpo inválido
+    clock[0] += 30
+    assert client.get_json(URL) == {'ok': 1}
+    assert client.stats()['circuits'] == {'https://api.example.com': 'closed'}
+
+
+def test_client_errors_and_saturation_do_not_open_the_circuit(clock):
+    session = FakeSession(*[FakeResponse(404) for _ in range(3)])
+    client = make_client(session, retries=0, failure_threshold=2, max_concurrency=1)
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.get_json(URL)
+
+    client._semaphore.acquire()
+    for _ in range(2):
+        with pytest.raises(upstream.UpstreamBusyError):
+            client.get_json(URL, timeout=0)
+    assert client.stats()['circuits'] == {'https://api.example.com': 'closed'}
+
+
+def test_client_error_frees_the_half_open_trial(clock):
+    session = FakeSession(FakeResponse(500), FakeResponse(404), FakeResponse(200, {'ok': 1}))
+    client = make_client(session, retries=0, failure_threshold=1, reset_timeout=30)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(URL)
+    clock[0] += 30
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(URL)
+    # O 404 não fechou nem reabriu o circuito, mas a próxima tentativa passa
+    assert client.get_json(URL) == {'ok': 1}
+    assert client.stats()['circuits'] == {'https://api.example.com': 'closed'}
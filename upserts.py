@@ -0,0 +1,106 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+
+def upsert_statement(dialect, table, values, index_elements, update_columns):
+    """Monta o upsert nativo do banco, ou None se o dialeto não tiver um.
+
+    ``index_elements`` é a chave única usada no conflito e ``update_columns``
+    as colunas sobrescritas quando a linha já existe.
+    """
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(values)
+        return stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in update_columns}
+        )
+
+    if dialect in ('sqlite', 'postgresql'):
+        module = sqlite if dialect == 'sqlite' else postgresql
+        stmt = module.insert(table).values(values)
+        return stmt.on_conflict_do_update(
+            index_elements=list(index_elements),
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+
+    return None
+
+
+def increment_statement(dialect, table, values, index_elements, column):
+    """Como ``upsert_statement``, mas soma ``column`` ao valor já gravado
+    em vez de sobrescrever (contadores); None se o dialeto não tiver upsert."""
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(values)
+        return stmt.on_duplicate_key_update({column: table.c[column] + stmt.inserted[column]})
+
+    if dialect in ('sqlite', 'postgresql'):
+        module = sqlite if dialect == 'sqlite' else postgresql
+        stmt = module.insert(table).values(values)
+        return stmt.on_conflict_do_update(
+            index_elements=list(index_elements),
+            set_={column: table.c[column] + stmt.excluded[column]}
+        )
+
+    return None
+
+
+def insert_ignore_statement(dialect, table, values, index_elements):
+    """INSERT que não faz nada quando a chave única já existe (rowcount 0),
+    ou None se o dialeto não tiver um."""
+    if dialect == 'mysql':
+        return mysql.insert(table).values(values).prefix_with('IGNORE')
+
+    if dialect in ('sqlite', 'postgresql'):
+        module = sqlite if dialect == 'sqlite' else postgresql
+        return module.insert(table).values(values).on_conflict_do_nothing(index_elements=list(index_elements))
+
+    return None
+
+
+# Colunas sobrescritas quando o torcedor muda o interesse em um jogo
+INTEREST_UPDATE_COLUMNS = ('supporting_team_id', 'ranking', 'establishment_id')
+
+
+def interest_rows(user_id, interests):
+    """Linhas de UserMatchInterest por match_id; um mesmo jogo repetido no
+    lote fica com o último"""
+    return {
+        interest['match_id']: {
+            'user_id': user_id,
+            'match_id': interest['match_id'],
+            'supporting_team_id': interest['supporting_team_id'],
+            'ranking': interest.get('ranking', 1),
+            'establishment_id': interest.get('establishment_id')
+        }
+        for interest in interests
+    }
+
+
+def upsert_interests(db, interest_model, user_id, interests):
+    """Grava os interesses de um torcedor com um único upsert por (user_id, match_id).
+
+    ``interests`` é uma lista de dicts com ``match_id``, ``supporting_team_id``,
+    ``ranking`` e, opcionalmente, ``establishment_id``. Não faz commit.
+    """
+    values = list(interest_rows(user_id, interests).values())
+
+    if not values:
+        return 0
+
+    table = interest_model.__table__
+    dialect = db.session.get_bind().dialect.name
+    stmt = upsert_statement(dialect, table, values, ['user_id', 'match_id'], INTEREST_UPDATE_COLUMNS)
+
+    if stmt is not None:
+        db.session.execute(stmt)
+        return len(values)
+
+    for row in values:
+        existing = interest_model.query.filter_by(
+            user_id=row['user_id'], match_id=row['match_id']
+        ).with_for_update().first()
+        if existing:
+            for column in INTEREST_UPDATE_COLUMNS:
+                setattr(existing, column, row[column])
+        else:
+            db.session.add(interest_model(**row))
+
+    return len(values)
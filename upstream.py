@@ -0,0 +1,272 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status HTTP que valem nova tentativa
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Circuito aberto para o host e sem resposta anterior para servir"""
+
+
+class UpstreamBusyError(requests.exceptions.RequestException):
+    """Limite de chamadas simultâneas ao upstream atingido"""
+
+
+class CircuitBreaker:
+    """Abre após ``failure_threshold`` falhas seguidas; tenta de novo após ``reset_timeout``.
+
+    Em half-open só uma chamada de teste passa por vez; as demais são
+    recusadas até ela registrar sucesso (fecha) ou falha (reabre), ou ser
+    liberada por ``release``. Um teste que não registra nada em
+    ``reset_timeout`` deixa passar outro.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Closed deixa passar; half-open só a chamada de teste"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'open':
+                return False
+            now = time.time()
+            if self.trial_started_at is not None and now - self.trial_started_at < self.reset_timeout:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.time()
+            self.trial_started_at = None
+
+    def release(self):
+        """Libera a chamada de teste sem mudar o estado (o resultado não diz
+        nada da saúde do host)"""
+        with self._lock:
+            self.trial_started_at = None
+
+
+class UpstreamClient:
+    """Cliente HTTP compartilhado para as APIs externas (API-Futebol, Google Places).
+
+    Mantém um pool keep-alive por host, limita as chamadas simultâneas,
+    repete GETs com backoff exponencial com jitter e abre um circuito por
+    host após falhas seguidas. Com o circuito aberto, ou quando todas as
+    tentativas falham, devolve a última resposta boa da mesma URL.
+    """
+
+    def __init__(self, pool_size=10, max_concurrency=20, retries=2, backoff=0.3,
+                 connect_timeout=3, failure_threshold=5, reset_timeout=30,
+                 max_stale_entries=256, sleep=time.sleep, observer=None):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.connect_timeout = connect_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_stale_entries = max_stale_entries
+        self.sleep = sleep
+        # observer(endpoint, segundos, 'ok' | 'error') a cada tentativa, para métricas
+        self.observer = observer
+
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._breakers = {}
+        self._last_good = OrderedDict()
+        self._stats = {}
+
+    def init_app(self, app):
+        """Pool, concorrência, retries e circuito vêm de UPSTREAM_* na config
+        (antes da primeira chamada: sessões e circuitos já criados não mudam)"""
+        self.pool_size = app.config['UPSTREAM_POOL_SIZE']
+        self.retries = app.config['UPSTREAM_RETRIES']
+        self.connect_timeout = app.config['UPSTREAM_CONNECT_TIMEOUT']
+        self.failure_threshold = app.config['UPSTREAM_FAILURE_THRESHOLD']
+        self.reset_timeout = app.config['UPSTREAM_RESET_TIMEOUT']
+        self._semaphore = threading.BoundedSemaphore(app.config['UPSTREAM_MAX_CONCURRENCY'])
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        return f'{parts.scheme}://{parts.netloc}'
+
+    def _session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(host, adapter)
+                self._sessions[host] = session
+            return session
+
+    def breaker(self, host):
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _record(self, endpoint, stat, elapsed_ms=None):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                'calls': 0, 'errors': 0, 'retries': 0, 'stale_served': 0, 'short_circuited': 0,
+                'latency_count': 0, 'latency_total_ms': 0.0, 'latency_max_ms': 0.0
+            })
+            if stat:
+                stats[stat] += 1
+            if elapsed_ms is not None:
+                stats['latency_count'] += 1
+                stats['latency_total_ms'] += elapsed_ms
+                stats['latency_max_ms'] = max(stats['latency_max_ms'], elapsed_ms)
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._last_good[key] = data
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self.max_stale_entries:
+                self._last_good.popitem(last=False)
+
+    def _stale(self, key, endpoint):
+        with self._lock:
+            if key not in self._last_good:
+                return False, None
+            data = self._last_good[key]
+        self._record(endpoint, 'stale_served')
+        return True, data
+
+    @staticmethod
+    def _client_error(error):
+        """4xx fora de RETRY_STATUSES: o host respondeu, o erro é do pedido"""
+        return isinstance(error, requests.exceptions.HTTPError) and error.response is not None \
+            and error.response.status_code not in RETRY_STATUSES
+
+    def get_json(self, url, headers=None, params=None, timeout=10, endpoint=None):
+        """GET com retry/backoff e circuit breaker; retorna o JSON da resposta"""
+        host = self._host(url)
+        endpoint = endpoint or host + urlsplit(url).path
+        key = url + '?' + '&'.join(f'{k}={v}' for k, v in sorted((params or {}).items()) if k != 'key')
+        breaker = self.breaker(host)
+
+        self._record(endpoint, 'calls')
+
+        if not breaker.allow():
+            self._record(endpoint, 'short_circuited')
+            found, data = self._stale(key, endpoint)
+            if found:
+                return data
+            raise CircuitOpenError(f'Circuito aberto para {host}')
+
+        session = self._session(host)
+        error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._record(endpoint, 'retries')
+                self.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+            if not self._semaphore.acquire(timeout=timeout):
+                error = UpstreamBusyError(f'Muitas chamadas simultâneas para {host}')
+                break
+
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                response = session.get(url, headers=headers, params=params,
+                                       timeout=(self.connect_timeout, timeout))
+                if response.status_code in RETRY_STATUSES:
+                    raise requests.exceptions.HTTPError(
+                        f'{response.status_code} em {endpoint}', response=response)
+                response.raise_for_status()
+                data = response.json()
+                outcome = 'ok'
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.HTTPError, ValueError) as e:
+                # ValueError: corpo que não é JSON; conta como falha, sem repetir
+                error = e
+                if isinstance(e, ValueError) or self._client_error(e):
+                    break
+                continue
+            finally:
+                self._semaphore.release()
+                elapsed = time.perf_counter() - started
+                self._record(endpoint, None, elapsed * 1000)
+                if self.observer:
+                    self.observer(endpoint, elapsed, outcome)
+
+            breaker.record_success()
+            self._remember(key, data)
+            return data
+
+        self._record(endpoint, 'errors')
+        # Pedido recusado (4xx) e fila local cheia não contam para abrir o circuito
+        if isinstance(error, UpstreamBusyError) or self._client_error(error):
+            breaker.release()
+        else:
+            breaker.record_failure()
+
+        found, data = self._stale(key, endpoint)
+        if found:
+            return data
+        raise error
+
+    def stats(self):
+        """Latência e erros por endpoint, e o estado do circuito por host"""
+        with self._lock:
+            endpoints = {name: dict(stats) for name, stats in self._stats.items()}
+            breakers = {host: breaker.state for host, breaker in self._breakers.items()}
+
+        for stats in endpoints.values():
+            count = stats['latency_count']
+            stats['latency_avg_ms'] = stats['latency_total_ms'] / count if count else 0.0
+            stats['error_rate'] = stats['errors'] / stats['calls'] if stats['calls'] else 0.0
+
+        return {'endpoints': endpoints, 'circuits': breakers}
+
+
+_client = None
+
+
+def get_client():
+    """Cliente compartilhado do processo (criado com os padrões se preciso)"""
+    global _client
+    if _client is None:
+        _client = UpstreamClient()
+    return _client
+
+
+def set_client(client):
+    global _client
+    _client = client
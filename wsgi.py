@@ -0,0 +1,16 @@
+"""Entrada WSGI para o gunicorn (veja deploy/gunicorn.conf.py).
+
+    gunicorn -c deploy/gunicorn.conf.py wsgi:app
+
+Com ``--preload`` este módulo é importado uma vez no master: imports,
+configuração e templates compilados ficam na memória compartilhada
+(copy-on-write) e cada worker novo só precisa do fork.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app, warm_up  # noqa: E402
+
+app = create_app()
+warm_up(app)